@@ -1,9 +1,27 @@
-from utilities.exceptions import JobException
-from utilities.job_handler import JobHandler
-
-JOB_HANDLER = JobHandler()
-try:
-    JOB_HANDLER.start_scheduler()
-except JobException as e:
-    # LOG INFOS
-    pass
+import threading
+
+JOB_HANDLER = None
+_JOB_HANDLER_LOCK = threading.Lock()
+
+
+def get_job_handler():
+    """Returns the job handler of the backend, creating it and starting its scheduler on first use.
+
+    Starting the scheduler connects to the database: it is done on the first request rather than when
+    the backend is imported. If it fails, the next call tries again.
+
+    Returns:
+        JobHandler: The running job handler.
+    """
+    global JOB_HANDLER
+    if JOB_HANDLER is None:
+        with _JOB_HANDLER_LOCK:
+            if JOB_HANDLER is None:
+                # APScheduler and SQLAlchemy are only loaded with the scheduler
+                from utilities.job_handler import JobHandler
+
+                job_handler = JobHandler()
+                job_handler.start_scheduler()
+                JOB_HANDLER = job_handler
+
+    return JOB_HANDLER
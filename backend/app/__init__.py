@@ -1,9 +1,22 @@
+import psycopg2
 from flask import Flask
 from flask_restful import Api
 
+from backend import get_job_handler
 from backend.app.endpoints import bp as bp_api
+from lib.utilities.exceptions import JobException, PoolException
 
 app = Flask(__name__)
 api = Api(bp_api)
 
 app.register_blueprint(bp_api)
+
+
+@app.before_request
+def start_job_handler():
+    # Scheduled jobs resume as soon as the backend serves its first request
+    try:
+        get_job_handler()
+    except (JobException, PoolException, psycopg2.OperationalError) as e:
+        # The request is served all the same, the job handler being left unset for the next request to retry
+        app.logger.error(f"Unable to start the job handler: {str(e)}")
@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint("api", __name__)
 
-from backend.app.endpoints import jobs, indicators
+from backend.app.endpoints import jobs, indicators, positions, airports
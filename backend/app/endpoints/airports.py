@@ -0,0 +1,41 @@
+from flask import jsonify, request
+
+from backend.app.endpoints import bp
+from db_toolkits.exalt_handler.get import ExaltGetHandler
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.exalt_handler.aggregate import ExaltAggregateHandler
+
+AIRPORT_FIELDS = ["iata", "name", "icao", "country", "nb_departures", "nb_arrivals", "flights_difference"]
+
+
+@bp.route("/airports", methods=["GET"])
+def airports():
+    try:
+        limit = request.args.get("limit", type=int)
+        if limit is not None and limit < 0:
+            return jsonify({"message": "limit must not be negative", "status": "error"}), 400
+
+        with ADMIN_POOL.connection() as connection:
+            # Airports with live flights, the largest difference between departures and arrivals first
+            result = ExaltAggregateHandler(connection, connection.cursor()).get_airports(AIRPORT_FIELDS, limit)
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({"message": str(e), "status": "error"}), 500
+
+
+@bp.route("/airports/<string:iata>", methods=["GET"])
+def airport(iata: str):
+    try:
+        with ADMIN_POOL.connection() as connection:
+            result = ExaltGetHandler(connection, connection.cursor()).get_properties(
+                "airport", AIRPORT_FIELDS, {"iata": {"eq": iata.upper()}}
+            )
+        if not result:
+            return jsonify({"message": "Unknown airport", "status": "error"}), 404
+
+        return jsonify(result[0]), 200
+
+    except Exception as e:
+        return jsonify({"message": str(e), "status": "error"}), 500
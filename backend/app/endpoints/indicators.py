@@ -1,21 +1,82 @@
-from flask import jsonify
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+from flask import jsonify, request
+from werkzeug.http import http_date
 
 from backend.app.endpoints import bp
 from backend.app.endpoints.utilities import INDICATORS_TO_COMPUTE
-from db_toolkits.exalt_handler import ADMIN_CREDENTIAL
 from db_toolkits.exalt_handler.get import ExaltGetHandler
-from db_toolkits.utilities import create_connection
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.exalt_handler.rollup import ExaltRollupHandler
+from lib.db_toolkits.exalt_handler.view import ExaltViewHandler
+from lib.indicators import INDICATOR_SOURCE
+from lib.indicators.processor import IndicatorProcessor
+from lib.utilities.exceptions import ProcessingException
 
 
 @bp.route("/indicators/<string:indicator>", methods=["GET"])
 def compute(indicator: str):
     try:
         if INDICATORS_TO_COMPUTE.get(indicator):
-            connection = create_connection(ADMIN_CREDENTIAL)
-            result = ExaltGetHandler(connection, connection.cursor()).get_last_indicator_result(
-                indicator_name=INDICATORS_TO_COMPUTE.get(indicator)
-            )
-            connection.close()
+            headers = {}
+            with ADMIN_POOL.connection() as connection:
+                if request.args.get("live", "false").lower() == "true":
+                    if INDICATOR_SOURCE != "views":
+                        # The materialized views only exist, and are only refreshed, with the "views" source
+                        return jsonify({
+                            "message": "Live results need the materialized views of the indicators",
+                            "status": "error"
+                        }), 400
+                    # The view is read as last refreshed by the indicator job, without writing to the database
+                    result = getattr(
+                        IndicatorProcessor(connection, source="views"), f"get_{INDICATORS_TO_COMPUTE.get(indicator)}"
+                    )()
+                    refresh_timestamp = ExaltViewHandler(connection, connection.cursor()).get_refresh_timestamp(
+                        INDICATORS_TO_COMPUTE.get(indicator)
+                    )
+                    if refresh_timestamp is not None:
+                        headers["Last-Modified"] = http_date(refresh_timestamp)
+                else:
+                    result = ExaltGetHandler(connection, connection.cursor()).get_last_indicator_result(
+                        indicator_name=INDICATORS_TO_COMPUTE.get(indicator)
+                    )
+
+            return jsonify(result), 200, headers
+
+        else:
+            return jsonify({"message": "Unknown indicator", "status": "error"}), 501
+
+    except ProcessingException as e:
+        return jsonify({"message": str(e), "status": "error"}), 404
+
+    except Exception as e:
+        return jsonify({"message": str(e), "status": "error"}), 500
+
+
+def _parse_date(value: str):
+    """Parses a date of the query string, dates without time zone being UTC."""
+    if value is None:
+        return None
+    date = parser.parse(value)
+
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+
+@bp.route("/indicators/<string:indicator>/history", methods=["GET"])
+def history(indicator: str):
+    try:
+        if INDICATORS_TO_COMPUTE.get(indicator):
+            start = _parse_date(request.args.get("start")) or datetime.now(timezone.utc) - timedelta(days=1)
+            end = _parse_date(request.args.get("end"))
+            resolution = request.args.get("resolution", type=int)
+            with ADMIN_POOL.connection() as connection:
+                result = ExaltRollupHandler(connection, connection.cursor()).get_history(
+                    INDICATORS_TO_COMPUTE.get(indicator), start, end, resolution
+                )
+            for entry in result["history"]:
+                entry["timestamp"] = entry["timestamp"].isoformat()
+                entry["last_computation_timestamp"] = entry["last_computation_timestamp"].isoformat()
 
             return jsonify(result), 200
 
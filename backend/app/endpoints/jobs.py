@@ -3,7 +3,7 @@ from datetime import datetime, timedelta, timezone
 from dateutil import parser
 from flask import jsonify, request
 
-from backend import JOB_HANDLER
+from backend import get_job_handler
 from backend.app.endpoints import bp
 from db_toolkits.exalt_handler.create import ExaltCreateHandler
 
@@ -11,7 +11,8 @@ from db_toolkits.exalt_handler.create import ExaltCreateHandler
 @bp.route("/start", methods=["POST"])
 def start():
     try:
-        if JOB_HANDLER.get_jobs():
+        job_handler = get_job_handler()
+        if job_handler.get_jobs():
             return jsonify({"message": "Job already started", "status": "success"}), 200
         else:
             body = request.json
@@ -24,8 +25,12 @@ def start():
             indicator_job_initial_date = indicator_job_initial_date.isoformat(timespec='seconds')
             flight_job_frequency = body.get("upload_frequency", 1800)
             indicator_job_frequency = body.get("computation_frequency", 1800)
+            maintenance_job_frequency = body.get("maintenance_frequency", 86400)
+            aggregate_check_job_frequency = body.get("aggregate_check_frequency", 86400)
+            rollup_job_frequency = body.get("rollup_frequency", 3600)
+            position_job_frequency = body.get("position_frequency", 60)
 
-            flight_job_result = JOB_HANDLER.add_job(
+            flight_job_result = job_handler.add_job(
                 parameters={
                     "value": flight_job_frequency,
                     "initial_date": flight_job_initial_date,
@@ -34,7 +39,7 @@ def start():
                 job_name="data_upload"
             )
             if flight_job_result.get("status") == "success":
-                indicator_job_result = JOB_HANDLER.add_job(
+                indicator_job_result = job_handler.add_job(
                     parameters={
                         "value": indicator_job_frequency,
                         "initial_date": indicator_job_initial_date,
@@ -42,10 +47,48 @@ def start():
                     },
                     job_name="indicator"
                 )
-                if indicator_job_result.get("status") == "success":
+                maintenance_job_result = job_handler.add_job(
+                    parameters={
+                        "value": maintenance_job_frequency,
+                        "initial_date": flight_job_initial_date,
+                        "description": "Partitions maintenance"
+                    },
+                    job_name="partition_maintenance"
+                )
+                aggregate_check_job_result = job_handler.add_job(
+                    parameters={
+                        "value": aggregate_check_job_frequency,
+                        "initial_date": flight_job_initial_date,
+                        "description": "Aggregates consistency check"
+                    },
+                    job_name="aggregate_check"
+                )
+                rollup_job_result = job_handler.add_job(
+                    parameters={
+                        "value": rollup_job_frequency,
+                        "initial_date": indicator_job_initial_date,
+                        "description": "Indicators history rollup"
+                    },
+                    job_name="indicator_rollup"
+                )
+                position_job_result = job_handler.add_job(
+                    parameters={
+                        "value": position_job_frequency,
+                        "initial_date": flight_job_initial_date,
+                        "description": "Flight positions upload"
+                    },
+                    job_name="position_upload"
+                )
+                if (
+                        indicator_job_result.get("status") == "success"
+                        and maintenance_job_result.get("status") == "success"
+                        and aggregate_check_job_result.get("status") == "success"
+                        and rollup_job_result.get("status") == "success"
+                        and position_job_result.get("status") == "success"
+                ):
                     return jsonify({"message": "Job successfully started.", "status": "success"}), 201
                 else:
-                    JOB_HANDLER.remove_all_jobs()
+                    job_handler.remove_all_jobs()
                     return jsonify({"message": "Internal error occurred, try again.", "status": "error"}), 500
 
             else:
@@ -58,7 +101,8 @@ def start():
 @bp.route("/stop", methods=["PUT"])
 def stop():
     try:
-        result = JOB_HANDLER.remove_all_jobs()
+        job_handler = get_job_handler()
+        result = job_handler.remove_all_jobs()
         if result.get("status") == "success":
             return jsonify({"message": "Job successfully stopped.", "status": "success"}), 200
         else:
@@ -70,6 +114,7 @@ def stop():
 @bp.route("/jobs", methods=["GET"])
 def retrieve():
     try:
-        return jsonify(JOB_HANDLER.get_jobs()), 200
+        job_handler = get_job_handler()
+        return jsonify(job_handler.get_jobs()), 200
     except Exception as e:
         return jsonify({"message": "Internal error occurred, try again.", "status": "error"}), 500
@@ -0,0 +1,77 @@
+from flask import jsonify, request
+
+from backend.app.endpoints import bp
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.exalt_handler.position import ExaltPositionHandler
+
+
+def _serialize(positions: list) -> list:
+    for position in positions:
+        for field in ["latest_update", "position_timestamp"]:
+            if position.get(field) is not None:
+                position[field] = position[field].isoformat()
+
+    return positions
+
+
+def _invalid_coordinates(latitudes: list, longitudes: list):
+    """Returns why coordinates of the query string are invalid, None if they are within range."""
+    if not all(-90 <= latitude <= 90 for latitude in latitudes):
+        return "Latitudes must be between -90 and 90"
+    if not all(-180 <= longitude <= 180 for longitude in longitudes):
+        return "Longitudes must be between -180 and 180"
+
+    return None
+
+
+@bp.route("/positions", methods=["GET"])
+def positions():
+    try:
+        zone = request.args.get("zone")
+        bounds = [request.args.get(bound, type=float) for bound in ["south", "west", "north", "east"]]
+        if zone is None and None in bounds:
+            message = "A zone or south, west, north and east bounds are required"
+            return jsonify({"message": message, "status": "error"}), 400
+        if zone is None:
+            south, west, north, east = bounds
+            message = _invalid_coordinates([south, north], [west, east])
+            if message is None and south > north:
+                message = "The south bound must not be greater than the north bound"
+            if message is not None:
+                return jsonify({"message": message, "status": "error"}), 400
+
+        with ADMIN_POOL.connection() as connection:
+            handler = ExaltPositionHandler(connection, connection.cursor())
+            result = handler.get_zone_positions(zone) if zone is not None else handler.get_positions(*bounds)
+        if result is None:
+            return jsonify({"message": "Unknown zone", "status": "error"}), 404
+
+        return jsonify(_serialize(result)), 200
+
+    except Exception as e:
+        return jsonify({"message": str(e), "status": "error"}), 500
+
+
+@bp.route("/positions/nearest", methods=["GET"])
+def nearest_positions():
+    try:
+        latitude = request.args.get("latitude", type=float)
+        longitude = request.args.get("longitude", type=float)
+        if latitude is None or longitude is None:
+            return jsonify({"message": "latitude and longitude are required", "status": "error"}), 400
+        message = _invalid_coordinates([latitude], [longitude])
+        if message is not None:
+            return jsonify({"message": message, "status": "error"}), 400
+
+        with ADMIN_POOL.connection() as connection:
+            result = ExaltPositionHandler(connection, connection.cursor()).get_nearest(
+                latitude,
+                longitude,
+                nb_positions=request.args.get("limit", 10, type=int),
+                max_distance_km=request.args.get("max_distance_km", type=float)
+            )
+
+        return jsonify(_serialize(result)), 200
+
+    except Exception as e:
+        return jsonify({"message": str(e), "status": "error"}), 500
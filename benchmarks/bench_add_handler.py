@@ -0,0 +1,90 @@
+"""Benchmark of ExaltAddHandler: multi-row INSERT against COPY FROM STDIN.
+
+The rows are loaded into a temporary copy of the flight table, on the database
+configured by ADMIN_CREDENTIAL.
+
+Usage (from the project root):
+    python -m benchmarks.bench_add_handler [--rows 1000 10000 100000]
+"""
+import argparse
+import time
+
+from psycopg2 import sql
+
+from lib.db_toolkits.exalt_handler import ADMIN_CREDENTIAL
+from lib.db_toolkits.exalt_handler.add import ExaltAddHandler
+from lib.db_toolkits.utilities import create_connection
+from lib.db_toolkits.utilities.table_mappings import FLIGHT_MAPPING
+
+BENCH_TABLE = "bench_flight"
+
+
+def generate_flight_data(nb_rows: int) -> list:
+    return [
+        {
+            "flight_id": f"{index:08x}",
+            "callsign": f"AFR{index % 10000}",
+            "live": True,
+            "aircraft_model_code": "A320",
+            "aircraft_model_text": "Airbus A320-214",
+            "aircraft_manufacturer": "Airbus",
+            "airline": "Air France",
+            "origin_airport_name": "Paris Charles de Gaulle Airport",
+            "origin_airport_iata": "CDG",
+            "origin_airport_icao": "LFPG",
+            "origin_airport_lat": 49.012798,
+            "origin_airport_long": 2.55,
+            "origin_airport_country": "France",
+            "origin_airport_continent": "Europe",
+            "destination_airport_name": "New York John F. Kennedy International Airport",
+            "destination_airport_iata": "JFK",
+            "destination_airport_icao": "KJFK",
+            "destination_airport_lat": 40.639751,
+            "destination_airport_long": -73.778925,
+            "destination_airport_country": "United States",
+            "destination_airport_continent": "America",
+            "scheduled_departure": "2024-07-03T09:46:40+00:00",
+            "scheduled_arrival": "2024-07-03T18:06:40+00:00",
+            "real_departure": "2024-07-03T09:56:40+00:00",
+            "real_arrival": None,
+            "estimated_departure": None,
+            "estimated_arrival": "2024-07-03T17:50:00+00:00",
+            "first_timestamp": "2024-07-03T09:46:40+00:00",
+            "data_status": {"flight_id": 1, "origin_airport_name": 1}
+        } for index in range(nb_rows)
+    ]
+
+
+def run(rows_list: list, methods: list):
+    connection = create_connection(ADMIN_CREDENTIAL)
+    cursor = connection.cursor()
+    fields = sql.SQL(", ").join(
+        sql.SQL("{} {}").format(sql.Identifier(field_name), sql.SQL(field_type))
+        for field_name, field_type in FLIGHT_MAPPING.items()
+    )
+    cursor.execute(sql.SQL("CREATE TEMPORARY TABLE {} ({})").format(sql.Identifier(BENCH_TABLE), fields))
+    connection.commit()
+
+    handler = ExaltAddHandler(connection, cursor)
+    for nb_rows in rows_list:
+        data = generate_flight_data(nb_rows)
+        for method in methods:
+            cursor.execute(sql.SQL("TRUNCATE {}").format(sql.Identifier(BENCH_TABLE)))
+            connection.commit()
+
+            start = time.perf_counter()
+            result = handler.process(BENCH_TABLE, data, method=method)
+            elapsed = time.perf_counter() - start
+            print(f"rows={nb_rows:>7}  method={method:<6}  {len(result['ids']) / elapsed:>10.0f} rows/s")
+
+    cursor.close()
+    connection.close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    arg_parser.add_argument("--methods", nargs="+", default=["insert", "copy"])
+    args = arg_parser.parse_args()
+
+    run(args.rows, args.methods)
@@ -0,0 +1,89 @@
+"""Benchmark of DataValidator: validation throughput of the vectorized and marshmallow engines.
+
+The marshmallow engine is measured with a cold and a cached schema.
+
+No database is needed: the mapping of the flight table is given to the validator.
+
+Usage (from the project root):
+    python -m benchmarks.bench_data_validation [--rows 10000 100000] [--invalid-ratio 0.01] [--engines vectorized marshmallow]
+"""
+import argparse
+import time
+
+from lib.data_upload.data_validation import DataValidator
+
+# Column types of the flight table, as returned by ExaltGetHandler.get_mapping
+FLIGHT_COLUMN_TYPES = {
+    "flight_id": "character varying",
+    "callsign": "character varying",
+    "live": "boolean",
+    "airline": "character varying",
+    "origin_airport_name": "character varying",
+    "origin_airport_iata": "character varying",
+    "origin_airport_lat": "numeric",
+    "origin_airport_long": "numeric",
+    "destination_airport_name": "character varying",
+    "destination_airport_iata": "character varying",
+    "destination_airport_lat": "numeric",
+    "destination_airport_long": "numeric",
+    "scheduled_departure": "timestamp with time zone",
+    "scheduled_arrival": "timestamp with time zone",
+}
+
+
+def generate_flight_data(nb_rows: int, invalid_ratio: float) -> list:
+    invalid_every = int(1 / invalid_ratio) if invalid_ratio else 0
+    data = []
+    for index in range(nb_rows):
+        record = {
+            "flight_id": f"{index:08x}",
+            "callsign": f"AFR{index % 10000}",
+            "live": True,
+            "airline": "Air France",
+            "origin_airport_name": "Paris Charles de Gaulle Airport",
+            "origin_airport_iata": "CDG",
+            "origin_airport_lat": 49.012798,
+            "origin_airport_long": 2.55,
+            "destination_airport_name": "New York John F. Kennedy International Airport",
+            "destination_airport_iata": "JFK",
+            "destination_airport_lat": 40.639751,
+            "destination_airport_long": -73.778925,
+            "scheduled_departure": "2024-07-03T09:46:40+00:00",
+            "scheduled_arrival": "2024-07-03T18:06:40+00:00",
+        }
+        if invalid_every and index % invalid_every == 0:
+            # One invalid type and one missing value
+            record["origin_airport_lat"] = "north"
+            record["destination_airport_name"] = None
+        data.append(record)
+
+    return data
+
+
+def run(rows_list: list, invalid_ratio: float, runs: int, engines: list):
+    for nb_rows in rows_list:
+        data = generate_flight_data(nb_rows, invalid_ratio)
+        for engine in engines:
+            for schema in (["cold", "cached"] if engine == "marshmallow" else ["-"]):
+                durations = []
+                for run_index in range(runs):
+                    # A new table name misses the schema cache, the same one hits it after the first run
+                    table_name = f"bench_flight_{nb_rows}_{run_index}" if schema == "cold" else "bench_flight"
+                    start = time.perf_counter()
+                    DataValidator(data, FLIGHT_COLUMN_TYPES, table_name=table_name, engine=engine).process()
+                    durations.append(time.perf_counter() - start)
+                print(
+                    f"rows={nb_rows:>7}  engine={engine:<11}  schema={schema:<6}  "
+                    f"{nb_rows / min(durations):>10.0f} rows/s"
+                )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    arg_parser.add_argument("--invalid-ratio", type=float, default=0.01)
+    arg_parser.add_argument("--runs", type=int, default=3)
+    arg_parser.add_argument("--engines", nargs="+", default=["vectorized", "marshmallow"])
+    args = arg_parser.parse_args()
+
+    run(args.rows, args.invalid_ratio, args.runs, args.engines)
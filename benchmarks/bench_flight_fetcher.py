@@ -0,0 +1,93 @@
+"""Benchmark of the flight details fetching against a local stub of the FlightRadar24 API.
+
+Usage (from the project root):
+    python -m benchmarks.bench_flight_fetcher [--flights 400] [--latency 0.05]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from types import SimpleNamespace
+
+from lib.data_upload.flight_fetcher import FlightDetailsFetcher
+
+STUB_FLIGHT_DETAILS = {
+    "identification": {"id": None, "callsign": "AFR1234"},
+    "status": {"live": True},
+    "aircraft": {"model": {"code": "A320", "text": "Airbus A320-214"}},
+    "airline": {"name": "Air France"},
+    "airport": {
+        "origin": {
+            "name": "Paris Charles de Gaulle Airport",
+            "code": {"iata": "CDG", "icao": "LFPG"},
+            "position": {"latitude": 49.012798, "longitude": 2.55, "country": {"name": "France"}},
+            "timezone": {"name": "Europe/Paris"}
+        },
+        "destination": {
+            "name": "New York John F. Kennedy International Airport",
+            "code": {"iata": "JFK", "icao": "KJFK"},
+            "position": {"latitude": 40.639751, "longitude": -73.778925, "country": {"name": "United States"}},
+            "timezone": {"name": "America/New_York"}
+        }
+    },
+    "time": {
+        "scheduled": {"departure": 1720000000, "arrival": 1720030000},
+        "real": {"departure": 1720000600, "arrival": None},
+        "estimated": {"departure": None, "arrival": 1720029000}
+    },
+    "firstTimestamp": 1720000000
+}
+
+
+def start_stub_server(latency: float) -> ThreadingHTTPServer:
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            flight_id = self.path.rsplit("=", 1)[-1]
+            details = {**STUB_FLIGHT_DETAILS, "identification": {"id": flight_id, "callsign": "AFR1234"}}
+            body = json.dumps(details).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def run(nb_flights: int, latency: float, workers_list: list, rate_limit: float):
+    server = start_stub_server(latency)
+    details_url = f"http://127.0.0.1:{server.server_address[1]}/clickhandler/?flight={{}}"
+    flights = [SimpleNamespace(id=f"{index:08x}") for index in range(nb_flights)]
+
+    print(f"{nb_flights} flights, stub latency {latency * 1000:.0f} ms, rate limit {rate_limit or 'none'}")
+    for workers in workers_list:
+        fetcher = FlightDetailsFetcher(workers=workers, rate_limit=rate_limit, details_url=details_url, headers={})
+        start = time.perf_counter()
+        nb_fetched = sum(1 for _ in fetcher.fetch(flights))
+        elapsed = time.perf_counter() - start
+        print(f"workers={workers:>3}  fetched={nb_fetched:>6}  {nb_fetched / elapsed:>9.1f} flights/s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--flights", type=int, default=400)
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency in seconds.")
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    arg_parser.add_argument("--rate-limit", type=float, default=0, help="Requests per second, 0 to disable.")
+    args = arg_parser.parse_args()
+
+    run(args.flights, args.latency, args.workers, args.rate_limit)
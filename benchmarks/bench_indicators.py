@@ -0,0 +1,165 @@
+"""Benchmark of IndicatorProcessor: per-indicator timings of each indicator source and engine at growing fleet sizes.
+
+The live flights are generated into flight_current and indicator tables of a benchmark schema, put
+before the tables of the database configured by ADMIN_CREDENTIAL in the search path of all the
+connections of the benchmark (PGOPTIONS), the connections of the pool included, and dropped at the
+end. The SQL engine is run on each source, one indicator after another and with each concurrency,
+the vectorized engine reading the live flights once, and the results of all the configurations are
+compared with the ones of the first. The total is the duration of the whole run.
+
+Usage (from the project root, the indicators importing modules from the lib directory as well):
+    PYTHONPATH=lib python -m benchmarks.bench_indicators [--flights 10000 100000 500000] [--sources snapshot direct]
+        [--engines sql vectorized] [--concurrency 1 4]
+"""
+import argparse
+import os
+import statistics
+
+from psycopg2 import sql
+
+from lib.db_toolkits.exalt_handler import ADMIN_CREDENTIAL
+from lib.db_toolkits.utilities import create_connection
+from lib.db_toolkits.utilities.table_mappings import FLIGHT_CURRENT_MAPPING, INDICATOR_MAPPING, INDEXES
+from lib.indicators import INDICATORS
+from lib.indicators.processor import IndicatorProcessor
+
+SCHEMA = "bench_indicators"
+
+AIRLINES = ["Air France", "KLM", "Lufthansa", "British Airways", "Delta", "ANA", "Emirates", "Qantas"]
+MODELS = ["Airbus A320-214", "Airbus A350-900", "Boeing 737-800", "Boeing 777-300ER", "Embraer E190"]
+# Name, IATA code, latitude, longitude and continent of the airports
+AIRPORTS = [
+    ("Paris Charles de Gaulle", "CDG", 49.0128, 2.55, "Europe"),
+    ("Amsterdam Schiphol", "AMS", 52.3086, 4.7639, "Europe"),
+    ("Frankfurt", "FRA", 50.0333, 8.5706, "Europe"),
+    ("New York JFK", "JFK", 40.6398, -73.7789, "America"),
+    ("Sao Paulo", "GRU", -23.4356, -46.4731, "America"),
+    ("Tokyo Narita", "NRT", 35.7647, 140.3864, "Asia"),
+    ("Dubai", "DXB", 25.2528, 55.3644, "Asia"),
+    ("Johannesburg", "JNB", -26.1392, 28.246, "Africa"),
+    ("Sydney", "SYD", -33.9461, 151.1772, "Australia"),
+]
+
+
+def create_tables(cursor, nb_flights: int):
+    for table_name, mapping in [("flight_current", FLIGHT_CURRENT_MAPPING), ("indicator", INDICATOR_MAPPING)]:
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(SCHEMA, table_name)))
+        cursor.execute(sql.SQL("CREATE TABLE {} ({})").format(
+            sql.Identifier(SCHEMA, table_name),
+            sql.SQL(", ").join(
+                sql.SQL("{} {}").format(sql.Identifier(field_name), sql.SQL(field_type))
+                for field_name, field_type in mapping.items()
+            )
+        ))
+
+    # Deterministic fleet: the airline, model and airports of a flight derive from its number
+    cursor.execute(
+        """
+        INSERT INTO flight_current (
+            flight_id, callsign, live, airline, aircraft_model_text, aircraft_manufacturer,
+            origin_airport_name, origin_airport_iata, origin_airport_lat, origin_airport_long, origin_airport_continent,
+            destination_airport_name, destination_airport_iata, destination_airport_lat, destination_airport_long,
+            destination_airport_continent
+        )
+        SELECT
+            to_hex(g), 'CS' || g, mod(g, 10) <> 0, airlines[1 + mod(g, cardinality(airlines))],
+            models[1 + mod(mod(g, 7), cardinality(models))],
+            split_part(models[1 + mod(mod(g, 7), cardinality(models))], ' ', 1),
+            o.name, o.iata, o.lat, o.long, o.continent,
+            d.name, d.iata, d.lat, d.long, d.continent
+        FROM generate_series(1, %(nb_flights)s) g
+        CROSS JOIN (SELECT %(airlines)s::text[] AS airlines, %(models)s::text[] AS models) lists
+        JOIN unnest(%(names)s::text[], %(iatas)s::text[], %(lats)s::numeric[], %(longs)s::numeric[],
+                    %(continents)s::text[]) WITH ORDINALITY AS o(name, iata, lat, long, continent, n)
+            ON o.n = 1 + mod(g, %(nb_airports)s)
+        JOIN unnest(%(names)s::text[], %(iatas)s::text[], %(lats)s::numeric[], %(longs)s::numeric[],
+                    %(continents)s::text[]) WITH ORDINALITY AS d(name, iata, lat, long, continent, n)
+            ON d.n = 1 + mod(g / %(nb_airports)s + g, %(nb_airports)s)
+        """,
+        {
+            "nb_flights": nb_flights, "airlines": AIRLINES, "models": MODELS, "nb_airports": len(AIRPORTS),
+            **{key: [airport[index] for airport in AIRPORTS]
+               for index, key in enumerate(["names", "iatas", "lats", "longs", "continents"])}
+        }
+    )
+    for index_key, index in INDEXES["flight_current"].items():
+        cursor.execute(sql.SQL("CREATE INDEX {} ON flight_current ({}){}").format(
+            sql.Identifier(f"flight_current_{index_key}"),
+            sql.SQL(", ".join(index["fields"])),
+            sql.SQL(f" WHERE {index['where']}" if index.get("where") else "")
+        ))
+    cursor.execute("ANALYZE flight_current")
+    cursor.connection.commit()
+
+
+def compute(connection, source: str, engine: str) -> dict:
+    processor = IndicatorProcessor(connection, source=source, engine=engine)
+    results = {indicator: getattr(processor, f"get_{indicator}")() for indicator in INDICATORS}
+    connection.rollback()
+
+    return results
+
+
+def run(flights_list: list, sources: list, engines: list, concurrencies: list, runs: int):
+    # (source, engine, concurrency) configurations: the vectorized engine does not depend on the
+    # source and computes the indicators one after another
+    configurations = [
+        (source, engine, concurrency)
+        for engine in engines
+        for source in (sources if engine == "sql" else sources[:1])
+        for concurrency in (concurrencies if engine == "sql" else [1])
+    ]
+    labels = [
+        engine if engine != "sql" else f"{engine}/{source}" + (f"/x{concurrency}" if concurrency > 1 else "")
+        for source, engine, concurrency in configurations
+    ]
+    # All the connections, the ones of the pool included, read the tables of the benchmark schema
+    os.environ["PGOPTIONS"] = f"-c search_path={SCHEMA},public"
+    connection = create_connection(ADMIN_CREDENTIAL)
+    connection.cursor().execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(SCHEMA)))
+    for nb_flights in flights_list:
+        create_tables(connection.cursor(), nb_flights)
+        timings = {}
+        for label, (source, engine, concurrency) in zip(labels, configurations):
+            source_timings = {}
+            for _ in range(runs):
+                # Forced, the runs following the first one would skip the unchanged indicators
+                processor = IndicatorProcessor(connection, source=source, engine=engine, concurrency=concurrency)
+                result = processor.process(force=True)
+                for step, duration in {**result["timings"], "total": result["duration"]}.items():
+                    source_timings.setdefault(step, []).append(duration)
+            timings[label] = {step: statistics.median(durations) for step, durations in source_timings.items()}
+
+        expected = compute(connection, *configurations[0][:2])
+        differences = {
+            label: [indicator for indicator, result in compute(connection, *configuration[:2]).items()
+                    if result != expected[indicator]]
+            for label, configuration in zip(labels[1:], configurations[1:])
+        }
+
+        print(f"\nflights={nb_flights}  (median of {runs} runs, ms)")
+        steps = list(dict.fromkeys(step for label in labels for step in timings[label] if step != "total"))
+        print(f"{'':<52}" + "".join(f"{label:>18}" for label in labels))
+        for step in steps + ["total"]:
+            durations = [timings[label].get(step) for label in labels]
+            print(f"{step:<52}" + "".join(
+                f"{duration * 1000:>18.1f}" if duration is not None else f"{'-':>18}" for duration in durations
+            ))
+        for label, indicators in differences.items():
+            print(f"results of {label} vs {labels[0]}: " + (f"DIFFERENT {indicators}" if indicators else "identical"))
+
+    connection.cursor().execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(SCHEMA)))
+    connection.commit()
+    connection.close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--flights", type=int, nargs="+", default=[10000, 100000, 500000])
+    arg_parser.add_argument("--sources", nargs="+", default=["snapshot", "direct"])
+    arg_parser.add_argument("--engines", nargs="+", default=["sql", "vectorized"])
+    arg_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    arg_parser.add_argument("--runs", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    run(args.flights, args.sources, args.engines, args.concurrency, args.runs)
@@ -0,0 +1,73 @@
+"""Benchmark of the startup time of the backend and of the lib packages.
+
+Each import runs in a fresh interpreter. No database is needed: importing must not connect.
+
+Usage (from the project root):
+    python -m benchmarks.bench_startup [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    "backend",
+    "backend.app",
+    "lib.db_toolkits.exalt_handler.get",
+    "lib.data_upload.flight_data",
+    "lib.indicators.processor",
+]
+
+
+def import_module(module: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    # The backend imports modules both from the project root and from the lib directory
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([PROJECT_ROOT, os.path.join(PROJECT_ROOT, "lib")]))
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", f"import {module}"]
+
+    return subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(module: str, top: int) -> list:
+    """Lists the imports with the largest cumulative time, as reported by `-X importtime`."""
+    imports = []
+    for line in import_module(module, importtime=True).stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level: only the first two levels are kept
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if 1 <= depth <= 2:
+            imports.append((int(cumulative), name.strip()))
+
+    return sorted(imports, reverse=True)[:top]
+
+
+def run(runs: int, top: int):
+    print(f"Interpreter startup included, {runs} runs per module")
+    for module in MODULES:
+        durations = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            import_module(module)
+            durations.append(time.perf_counter() - start)
+        print(
+            f"import {module:<40} median {statistics.median(durations) * 1000:>7.1f} ms"
+            f"  min {min(durations) * 1000:>7.1f} ms"
+        )
+
+    if top:
+        print("\nSlowest imports of backend.app (cumulative):")
+        for cumulative, name in slowest_imports("backend.app", top):
+            print(f"{cumulative / 1000:>9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--top", type=int, default=10, help="Number of slowest imports listed, 0 to disable.")
+    args = arg_parser.parse_args()
+
+    run(args.runs, args.top)
@@ -30,3 +30,45 @@ INTEGRITY_MAPPING = {
         "validation": True
     }
 }
+
+# Compact data_status: each field of INTEGRITY_MAPPING takes DATA_STATUS_BITS bits of an integer,
+# in the order of INTEGRITY_MAPPING (new fields must be appended), holding the code of its status.
+# A fully valid row has a data_status of 0.
+DATA_STATUS_BITS = 2
+DATA_STATUS_CODES = {
+    VALID_VARIABLE: 0,
+    INVALID_VARIABLE_TYPE: 1,
+    MISSING_VARIABLE_VALUE: 2,
+}
+
+# Validation engine of DataValidator: "vectorized" (column checks with pandas) or "marshmallow"
+VALIDATION_ENGINE = "vectorized"
+
+# Flight details fetching: number of concurrent workers and global cap on the number of
+# requests per second sent to FlightRadar24, all workers combined.
+FETCH_WORKERS = 8
+FETCH_RATE_LIMIT = 10
+FETCH_TIMEOUT = 10
+
+# Streaming upload: number of flight rows committed at once, maximum number of items waiting
+# between two stages of the fetch -> flatten -> validate -> write pipeline, and maximum number of
+# seconds a stage waits for the previous one to stop when the upload ends.
+UPLOAD_BATCH_SIZE = 500
+UPLOAD_QUEUE_SIZE = 1000
+PIPELINE_JOIN_TIMEOUT = 10
+
+# Change-detection cache of the flight details: a flight whose live feed data is unchanged
+# reuses its last record instead of downloading its details again.
+FLIGHT_CACHE_PATH = "../cache/flight_details.pickle"
+FLIGHT_CACHE_TTL = 3600
+FLIGHT_CACHE_MAX_SIZE = 50000
+
+# Space-Saving summaries of the flights (see FLIGHT_SKETCHES): whether each upload counts the live
+# flights it adds to flight_current in the summaries of its day, read by the "sketches" indicator source.
+UPDATE_FLIGHT_SKETCHES = False
+
+# Position upload (see FlightPositionUploader): number of positions upserted at once, and whether the
+# zones of FlightRadar24 are loaded in the zone table when it is empty, as predefined regions of the
+# position queries.
+POSITION_BATCH_SIZE = 5000
+LOAD_POSITION_ZONES = True
@@ -0,0 +1,80 @@
+from lib.data_upload import INTEGRITY_MAPPING, VARIABLE_STATUS, VALID_VARIABLE, DATA_STATUS_BITS, DATA_STATUS_CODES
+
+DATA_STATUS_FIELDS = list(INTEGRITY_MAPPING)
+_FIELD_MASK = (1 << DATA_STATUS_BITS) - 1
+_STATUS_BY_CODE = {code: VARIABLE_STATUS[status] for status, code in DATA_STATUS_CODES.items()}
+_CODE_BY_STATUS = {VARIABLE_STATUS[status]: code for status, code in DATA_STATUS_CODES.items()}
+
+
+def encode_data_status(field_status: dict) -> int:
+    """Encodes the status of the fields of a row into its compact data_status.
+
+    Args:
+        field_status (dict): Status of each field, e.g. {"flight_id": 1, "origin_airport_name": -1}.
+            Fields not given are valid.
+
+    Returns:
+        int: The data_status bitmask.
+    """
+    mask = 0
+    for index, field_name in enumerate(DATA_STATUS_FIELDS):
+        code = _CODE_BY_STATUS[field_status.get(field_name, VARIABLE_STATUS[VALID_VARIABLE])]
+        mask |= code << (index * DATA_STATUS_BITS)
+
+    return mask
+
+
+def decode_data_status(mask: int) -> dict:
+    """Decodes a compact data_status into the status of each field.
+
+    Args:
+        mask (int): The data_status bitmask of a row, as stored in the database.
+
+    Returns:
+        dict: Status of each field of INTEGRITY_MAPPING, e.g. {"flight_id": 1, "origin_airport_name": -1}.
+    """
+    return {
+        field_name: _STATUS_BY_CODE[(mask >> (index * DATA_STATUS_BITS)) & _FIELD_MASK]
+        for index, field_name in enumerate(DATA_STATUS_FIELDS)
+    }
+
+
+def decode_data_status_column(masks) -> dict:
+    """Decodes the data_status of many rows at once, field by field.
+
+    Args:
+        masks (array-like): data_status bitmasks, e.g. a column returned by `ExaltGetHandler.get_columns`.
+
+    Returns:
+        dict: For each field of INTEGRITY_MAPPING, a numpy array of the status of the rows.
+    """
+    import numpy as np
+
+    masks = np.asarray(masks, dtype=np.int64)
+    statuses = np.zeros(max(_STATUS_BY_CODE) + 1, dtype=np.int8)
+    for code, status in _STATUS_BY_CODE.items():
+        statuses[code] = status
+
+    return {
+        field_name: statuses[(masks >> (index * DATA_STATUS_BITS)) & _FIELD_MASK]
+        for index, field_name in enumerate(DATA_STATUS_FIELDS)
+    }
+
+
+def data_status_conversion_sql(column_name: str = "data_status") -> str:
+    """SQL expression converting a JSONB data_status ({"flight_id": 1, ...}) into its bitmask.
+
+    Args:
+        column_name (str): The JSONB column. Defaults to "data_status".
+
+    Returns:
+        str: The expression, to be used as the USING clause of an ALTER COLUMN ... TYPE.
+    """
+    fields = []
+    for index, field_name in enumerate(DATA_STATUS_FIELDS):
+        codes = " ".join(
+            f"WHEN '{status}' THEN {code}" for status, code in _CODE_BY_STATUS.items() if code
+        )
+        fields.append(f"(CASE {column_name}->>'{field_name}' {codes} ELSE 0 END << {index * DATA_STATUS_BITS})")
+
+    return f"COALESCE({' | '.join(fields)}, 0)"
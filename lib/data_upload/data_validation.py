@@ -1,28 +1,108 @@
-from copy import deepcopy
+import hashlib
+import numbers
+import threading
 
-from marshmallow import fields, Schema, ValidationError
-
-from lib.data_upload import INTEGRITY_MAPPING, VARIABLE_STATUS, MISSING_VARIABLE_VALUE, VALID_VARIABLE, \
-    INVALID_VARIABLE_TYPE
-from lib.db_toolkits.exalt_handler import ADMIN_CREDENTIAL
+from lib.data_upload import INTEGRITY_MAPPING, VARIABLE_STATUS, MISSING_VARIABLE_VALUE, \
+    INVALID_VARIABLE_TYPE, DATA_STATUS_BITS, DATA_STATUS_CODES, VALIDATION_ENGINE
+from lib.data_upload.data_status import DATA_STATUS_FIELDS, encode_data_status
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
 from lib.db_toolkits.exalt_handler.get import ExaltGetHandler
-from lib.db_toolkits.utilities import create_connection
+
+INTEGER_TYPES = ["integer"]
+NUMBER_TYPES = ["float", "double", "numeric"]
+STRING_TYPES = ["character varying"]
+
+# Generated schemas by table name: (fingerprint of the mapping, schema instance)
+_SCHEMAS = {}
+_SCHEMAS_LOCK = threading.Lock()
+
+
+def schema_fingerprint(mapping: dict, integrity_mapping: dict) -> str:
+    """Fingerprint of the columns a validation schema is generated from.
+
+    Args:
+        mapping (dict): Mapping of the table columns to their data types.
+        integrity_mapping (dict): The validated fields.
+
+    Returns:
+        str: A digest that changes whenever a validated column is added, removed or retyped.
+    """
+    return hashlib.sha1(repr((sorted(mapping.items()), sorted(integrity_mapping))).encode()).hexdigest()
+
+
+def _valid_integers(column):
+    # Strict integers: neither floats, nor numeric strings, nor booleans
+    import pandas as pd
+
+    if pd.api.types.infer_dtype(column, skipna=True) in ["integer", "empty"]:
+        return column.notna()
+
+    return column.map(lambda value: isinstance(value, numbers.Integral) and not isinstance(value, bool))
+
+
+def _valid_numbers(column):
+    # Any value converted to a number, booleans excepted
+    import pandas as pd
+
+    if pd.api.types.infer_dtype(column, skipna=True) in ["integer", "floating", "mixed-integer-float", "empty"]:
+        return column.notna()
+
+    return pd.to_numeric(column, errors="coerce").notna() & ~column.map(lambda value: isinstance(value, bool))
+
+
+def _valid_strings(column):
+    import pandas as pd
+
+    if pd.api.types.infer_dtype(column, skipna=True) in ["string", "empty"]:
+        return column.notna()
+
+    return column.map(lambda value: isinstance(value, str))
 
 
 class DataValidator:
-    def __init__(self, data: list):
-        connexion = create_connection(ADMIN_CREDENTIAL)
-        self.__mapping = ExaltGetHandler(connexion, connexion.cursor()).get_mapping("flight")
+    def __init__(
+            self,
+            data: list,
+            mapping: dict = None,
+            table_name: str = "flight",
+            engine: str = VALIDATION_ENGINE
+    ):
+        if engine not in ["vectorized", "marshmallow"]:
+            raise ValueError(f"Validation engine '{engine}' is not supported.")
+        if mapping is None:
+            with ADMIN_POOL.connection() as connexion:
+                mapping = ExaltGetHandler(connexion, connexion.cursor()).get_mapping(table_name)
+        self.__table_name = table_name
+        self.__mapping = mapping
         self.__integrity_mapping = INTEGRITY_MAPPING
         self.__data = data
-        self.__schema = self.__generate_schema()
-        self.__status, self.__validated_data = self.__validate_data()
+        if engine == "vectorized":
+            self.__validated_data = data
+            self.__data_status = self.__validate_columns()
+        else:
+            self.__schema = self.__get_schema()
+            self.__status, self.__validated_data = self.__validate_data()
+            self.__data_status = [encode_data_status(self.__status.get(index, {})) for index in range(len(data))]
+
+    def __get_schema(self):
+        # The schema is generated once per table and regenerated only when the table mapping changes
+        fingerprint = schema_fingerprint(self.__mapping, self.__integrity_mapping)
+        with _SCHEMAS_LOCK:
+            cached = _SCHEMAS.get(self.__table_name)
+            if cached is None or cached[0] != fingerprint:
+                cached = (fingerprint, self.__generate_schema()(many=True))
+                _SCHEMAS[self.__table_name] = cached
+
+        return cached[1]
 
     def __generate_schema(self):
+        # marshmallow is only loaded when data is validated, not when the package is imported
+        from marshmallow import fields, Schema
+
         fields_dict = {}
         for key in self.__mapping.keys():
             if key in list(self.__integrity_mapping):
-                if self.__mapping[key] == "integer":
+                if self.__mapping[key] in INTEGER_TYPES:
                     params = {
                         "required": True,
                         "allow_string": False,
@@ -31,7 +111,7 @@ class DataValidator:
                     fields_dict[key] = fields.Integer(
                         **params
                     )
-                elif self.__mapping[key] in ["float", "double", "numeric"]:
+                elif self.__mapping[key] in NUMBER_TYPES:
                     params = {
                         "required": True,
                         "allow_string": False,
@@ -40,7 +120,7 @@ class DataValidator:
                     fields_dict[key] = fields.Float(
                         **params
                     )
-                elif self.__mapping[key] in ["character varying"]:
+                elif self.__mapping[key] in STRING_TYPES:
                     params = {"required": True, "allow_none": False, "strict": True}
                     fields_dict[key] = fields.String(
                         **params
@@ -53,15 +133,18 @@ class DataValidator:
         return type('GeneratedSchema', (Schema,), fields_dict)
 
     def __validate_data(self):
+        from marshmallow import ValidationError
+
+        # Only the records with an invalid or missing field get a status, see `process`
         status = {}
-        for index in range(len(self.__data)):
-            status.update({
-                index: {field: VARIABLE_STATUS[VALID_VARIABLE] for field in list(self.__integrity_mapping)}
-            })
         try:
-            validated_data = self.__schema(many=True).load(self.__data, unknown="exclude")
+            # The schema only holds the validated fields: the loaded values are merged back into the
+            # records so that the other fields are uploaded as well.
+            loaded_data = self.__schema.load(self.__data, unknown="exclude")
+            validated_data = [{**data, **loaded} for data, loaded in zip(self.__data, loaded_data)]
         except ValidationError as err:
             for index, error_loads in err.messages.items():
+                status[index] = {}
                 for field_name, message in error_loads.items():
                     error_message = message[0]
                     if "not a valid" in error_message.lower() or "invalid" in error_message.lower():
@@ -72,23 +155,61 @@ class DataValidator:
 
         return status, validated_data
 
+    def __validate_columns(self):
+        """Runs the checks of the marshmallow schema over whole columns and encodes the data_status of the rows.
+
+        A field absent from a record or None is missing, a value of the wrong type is invalid. Fields
+        whose column type has no check (or which are not columns of the table) are valid.
+
+        Returns:
+            numpy.ndarray: The data_status bitmask of each record, see `lib.data_upload.data_status`.
+        """
+        import numpy as np
+        import pandas as pd
+
+        data_status = np.zeros(len(self.__data), dtype=np.int64)
+        for index, field_name in enumerate(DATA_STATUS_FIELDS):
+            column_type = self.__mapping.get(field_name)
+            if column_type in INTEGER_TYPES:
+                check = _valid_integers
+            elif column_type in NUMBER_TYPES:
+                check = _valid_numbers
+            elif column_type in STRING_TYPES:
+                check = _valid_strings
+            else:
+                continue
+
+            column = pd.Series([data.get(field_name) for data in self.__data], dtype=object)
+            missing = column.isna().to_numpy()
+            invalid = ~missing & ~check(column).to_numpy(dtype=bool)
+            codes = (
+                missing * DATA_STATUS_CODES[MISSING_VARIABLE_VALUE] + invalid * DATA_STATUS_CODES[INVALID_VARIABLE_TYPE]
+            )
+            data_status |= codes.astype(np.int64) << (index * DATA_STATUS_BITS)
+
+        return data_status
+
     def process(self):
-        data_to_upload = deepcopy(self.__validated_data)
-        data_status = [{} for _ in range(len(data_to_upload))]
+        # The records are never modified: each row is a new dictionary, without its invalid fields
+        invalid_code = DATA_STATUS_CODES[INVALID_VARIABLE_TYPE]
+        code_mask = (1 << DATA_STATUS_BITS) - 1
+        field_masks = [
+            (field_name, index * DATA_STATUS_BITS) for index, field_name in enumerate(DATA_STATUS_FIELDS)
+        ]
         result = []
-        if self.__status is not None:
-            for index, field_status in self.__status.items():
-                data_status[index] = field_status
-                for field_name, status in field_status.items():
-                    if status not in [VARIABLE_STATUS[VALID_VARIABLE], VARIABLE_STATUS[MISSING_VARIABLE_VALUE]]:
-                        del data_to_upload[index][field_name]
-
-        if data_to_upload:
-            result = [
-                {
-                    **data,
-                    "data_status": current_status,
-                } for data, current_status in zip(data_to_upload, data_status)
-            ]
+        for data, data_status in zip(self.__validated_data, self.__data_status):
+            data_status = int(data_status)
+            if not data_status:
+                result.append({**data, "data_status": data_status})
+                continue
+
+            invalid_fields = {
+                field_name for field_name, shift in field_masks
+                if (data_status >> shift) & code_mask == invalid_code
+            }
+            result.append({
+                **{field_name: value for field_name, value in data.items() if field_name not in invalid_fields},
+                "data_status": data_status,
+            })
 
         return result
@@ -0,0 +1,128 @@
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+from lib.data_upload import FLIGHT_CACHE_PATH, FLIGHT_CACHE_TTL, FLIGHT_CACHE_MAX_SIZE
+
+# Fields of the live feed (FlightRadar24 Flight) which reflect a change of the stored flight details.
+# The status and times of a flight (live, real and estimated times) are not in the feed: on_ground
+# has its details downloaded again on take-off and landing, FLIGHT_CACHE_TTL bounding their age in between.
+SIGNATURE_FIELDS = [
+    "callsign",
+    "number",
+    "registration",
+    "aircraft_code",
+    "airline_icao",
+    "origin_airport_iata",
+    "destination_airport_iata",
+    "on_ground",
+]
+
+
+class FlightDetailsCache:
+    def __init__(
+            self,
+            path: str = FLIGHT_CACHE_PATH,
+            ttl: float = FLIGHT_CACHE_TTL,
+            max_size: int = FLIGHT_CACHE_MAX_SIZE
+    ) -> None:
+        """Persistent cache of the last flight record uploaded for each flight.
+
+        Entries are keyed by flight_id and hold the signature of the live feed data the record was
+        built from. A record is reused as long as the feed signature is unchanged and the entry is
+        younger than `ttl`; the least recently used entries are evicted beyond `max_size` entries.
+        The status and times of a reused record are those of an aircraft still on the ground or still
+        airborne, at most `ttl` old.
+
+        The cache file is unpickled as is: it is trusted input, which must only be writable by the
+        uploader, as unpickling a crafted file runs arbitrary code.
+
+        Args:
+            path (str): File the cache is persisted to, see FLIGHT_CACHE_PATH. None keeps the cache in
+                memory only.
+            ttl (float): Lifetime of an entry, in seconds.
+            max_size (int): Maximum number of entries.
+        """
+        self.__path = path
+        self.__ttl = ttl
+        self.__max_size = max_size
+        self.__entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__load()
+
+    def __load(self):
+        if not self.__path or not os.path.exists(self.__path):
+            return
+
+        try:
+            with open(self.__path, "rb") as cache_file:
+                self.__entries = pickle.load(cache_file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            # A corrupted cache only costs a full download
+            self.__entries = OrderedDict()
+
+    @staticmethod
+    def signature(flight) -> tuple:
+        """Builds the signature of a flight from the live feed.
+
+        Args:
+            flight: A FlightRadar24 Flight instance.
+
+        Returns:
+            tuple: The values of the signature fields.
+        """
+        return tuple(getattr(flight, field, None) for field in SIGNATURE_FIELDS)
+
+    def get(self, flight):
+        """Retrieves the cached record of a flight if its feed signature is unchanged.
+
+        Args:
+            flight: A FlightRadar24 Flight instance.
+
+        Returns:
+            dict: A copy of the cached flight record, or None if the flight details must be fetched.
+        """
+        entry = self.__entries.get(flight.id)
+        if entry is not None:
+            signature, record, stored_at = entry
+            if time.time() - stored_at > self.__ttl:
+                del self.__entries[flight.id]
+            elif signature == self.signature(flight):
+                self.__entries.move_to_end(flight.id)
+                self.hits += 1
+                return dict(record)
+
+        self.misses += 1
+        return None
+
+    def set(self, flight, record: dict):
+        """Stores the record built from the details of a flight.
+
+        Args:
+            flight: A FlightRadar24 Flight instance.
+            record (dict): The flattened flight record.
+        """
+        self.__entries[flight.id] = (self.signature(flight), dict(record), time.time())
+        self.__entries.move_to_end(flight.id)
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+
+    def save(self):
+        """Persists the cache, without its expired entries."""
+        if not self.__path:
+            return
+
+        now = time.time()
+        for flight_id in [key for key, (_, _, stored_at) in self.__entries.items() if now - stored_at > self.__ttl]:
+            del self.__entries[flight_id]
+
+        cache_dir = os.path.dirname(self.__path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        temporary_path = f"{self.__path}.tmp"
+        with open(temporary_path, "wb") as cache_file:
+            pickle.dump(self.__entries, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self.__path)
@@ -1,155 +1,311 @@
 from datetime import datetime, timezone
 
-import requests
 from FlightRadar24.api import FlightRadar24API
-from FlightRadar24.errors import CloudflareError
 
+from lib.data_upload import (
+    FETCH_WORKERS, FETCH_RATE_LIMIT, UPLOAD_BATCH_SIZE, UPLOAD_QUEUE_SIZE, UPDATE_FLIGHT_SKETCHES
+)
 from lib.data_upload.data_validation import DataValidator
-from lib.db_toolkits.exalt_handler import ADMIN_CREDENTIAL
+from lib.data_upload.flight_cache import FlightDetailsCache
+from lib.data_upload.flight_fetcher import FlightDetailsFetcher
+from lib.data_upload.pipeline import batched, threaded
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
 from lib.db_toolkits.exalt_handler.add import ExaltAddHandler
-from lib.db_toolkits.utilities import create_connection
+from lib.db_toolkits.exalt_handler.delete import ExaltDeleteHandler
+from lib.db_toolkits.exalt_handler.get import ExaltGetHandler
+from lib.db_toolkits.exalt_handler.sketch import ExaltSketchHandler, sketch_bucket, update_sketches
+from lib.utilities.exceptions import AddException
 
 
 class FlightDataUploader:
-    def __init__(self):
+    def __init__(
+            self,
+            workers: int = FETCH_WORKERS,
+            rate_limit: float = FETCH_RATE_LIMIT,
+            batch_size: int = UPLOAD_BATCH_SIZE,
+            queue_size: int = UPLOAD_QUEUE_SIZE,
+            use_cache: bool = True,
+            sketches: bool = UPDATE_FLIGHT_SKETCHES
+    ):
         self.__fr_api = FlightRadar24API()
-        self.__connexion = create_connection(ADMIN_CREDENTIAL)
+        self.__fetcher = FlightDetailsFetcher(workers=workers, rate_limit=rate_limit)
+        self.__cache = FlightDetailsCache() if use_cache else None
+        self.__connexion = ADMIN_POOL.getconn()
         self.__cursor = self.__connexion.cursor()
         self.__exalt_add = ExaltAddHandler(self.__connexion, self.__cursor)
-        self.__flight_data = self._set_flight_data()
+        self.__exalt_delete = ExaltDeleteHandler(self.__connexion, self.__cursor)
+        self.__exalt_get = ExaltGetHandler(self.__connexion, self.__cursor)
+        self.__update_sketches = sketches
+        # Number of summaries written by the upload
+        self.__nb_sketches = 0
+        self.__batch_size = batch_size
+        self.__queue_size = queue_size
 
-    def _set_flight_data(self):
-        flight_data = []
+    def _get_flight_data(self):
+        """Fetches and flattens the details of every flight currently tracked by FlightRadar24.
+
+        Flights unchanged since their last upload are served from the cache, only new or
+        changed flights have their details downloaded.
+
+        Yields:
+            dict: The flight records, one at a time.
+        """
         flights = self.__fr_api.get_flights()
         # flights = [flights[i] for i in range(1100, 1105)]
-        for flight in flights:
-            try:
-                current_flight = self.__fr_api.get_flight_details(flight)
-                if current_flight.get("identification"):
-                    flight_id = current_flight["identification"].get("id")
-                    callsign = current_flight["identification"].get("callsign")
-                    live = current_flight.get("status", {}).get("live")
-
-                    aircraft_model = current_flight.get("aircraft", {}).get("model", {})
-                    aircraft_model_code = aircraft_model.get("code")
-                    aircraft_model_text = aircraft_model.get("text")
-                    aircraft_manufacturer = None
-                    if aircraft_model_text:
-                        aircraft_manufacturer = aircraft_model_text.split(" ")[0]
-                    airline = current_flight.get("airline").get("name") if current_flight.get("airline") else None
-
-                    origin_airport = current_flight.get("airport", {}).get("origin", {})
-                    origin_name = origin_airport.get("name") if origin_airport else None
-                    origin_iata = origin_airport.get("code", {}).get("iata") if origin_airport else None
-                    origin_icao = origin_airport.get("code", {}).get("icao") if origin_airport else None
-                    origin_lat = origin_airport.get("position", {}).get("latitude") if origin_airport else None
-                    origin_long = origin_airport.get("position", {}).get("longitude") if origin_airport else None
-                    origin_country = origin_airport.get("position", {}).get("country", {}).get(
-                        "name") if origin_airport else None
-                    origin_timezone = origin_airport.get("timezone", {}).get("name") if origin_airport else None
-                    if timezone:
-                        origin_timezone = str(origin_timezone).split("/")[0]
-                    origin_continent = origin_timezone
-
-                    destination_airport = current_flight.get("airport", {}).get("destination", {})
-                    destination_name = destination_airport.get("name") if destination_airport else None
-                    destination_iata = destination_airport.get("code", {}).get("iata") if destination_airport else None
-                    destination_icao = destination_airport.get("code", {}).get("icao") if destination_airport else None
-                    destination_lat = destination_airport.get("position", {}).get(
-                        "latitude") if destination_airport else None
-                    destination_long = destination_airport.get("position", {}).get(
-                        "longitude") if destination_airport else None
-                    destination_country = destination_airport.get("position", {}).get("country", {}).get(
-                        "name") if destination_airport else None
-                    destination_timezone = destination_airport.get("timezone", {}).get(
-                        "name") if destination_airport else None
-                    if timezone:
-                        destination_timezone = str(destination_timezone).split("/")[0]
-                    destination_continent = destination_timezone
-
-                    scheduled_time = current_flight.get("time", {}).get("scheduled", {})
-                    scheduled_departure = datetime.fromtimestamp(
-                        scheduled_time.get("departure"), timezone.utc
-                    ).isoformat() if scheduled_time.get("departure") else None
-                    scheduled_arrival = datetime.fromtimestamp(
-                        scheduled_time.get("arrival"), timezone.utc
-                    ).isoformat() if scheduled_time.get("arrival") else None
-
-                    real_time = current_flight.get("time", {}).get("real", {})
-                    real_departure = datetime.fromtimestamp(
-                        real_time.get("departure"), timezone.utc
-                    ).isoformat() if real_time.get("departure") else None
-                    real_arrival = datetime.fromtimestamp(
-                        real_time.get("arrival"), timezone.utc
-                    ).isoformat() if real_time.get("arrival") else None
-
-                    estimated_time = current_flight.get("time", {}).get("estimated", {})
-                    estimated_departure = datetime.fromtimestamp(
-                        estimated_time.get("departure"), timezone.utc
-                    ).isoformat() if estimated_time.get("departure") else None
-                    estimated_arrival = datetime.fromtimestamp(
-                        estimated_time.get("arrival"), timezone.utc
-                    ).isoformat() if estimated_time.get("arrival") else None
-                    first_timestamp = datetime.fromtimestamp(
-                        current_flight.get("firstTimestamp"), timezone.utc
-                    ).isoformat() if current_flight.get("firstTimestamp") else None
-
-                    # Prepare data for insertion
-                    flight_data.append({
-                        "flight_id": flight_id,
-                        "callsign": callsign,
-                        "live": live,
-                        "aircraft_model_code": aircraft_model_code,
-                        "aircraft_model_text": aircraft_model_text,
-                        "aircraft_manufacturer": aircraft_manufacturer,
-                        "airline": airline,
-                        "origin_airport_name": origin_name,
-                        "origin_airport_iata": origin_iata,
-                        "origin_airport_icao": origin_icao,
-                        "origin_airport_lat": origin_lat,
-                        "origin_airport_long": origin_long,
-                        "origin_airport_country": origin_country,
-                        "origin_airport_continent": origin_continent,
-                        "destination_airport_name": destination_name,
-                        "destination_airport_iata": destination_iata,
-                        "destination_airport_icao": destination_icao,
-                        "destination_airport_lat": destination_lat,
-                        "destination_airport_long": destination_long,
-                        "destination_airport_country": destination_country,
-                        "destination_airport_continent": destination_continent,
-                        "scheduled_departure": scheduled_departure,
-                        "scheduled_arrival": scheduled_arrival,
-                        "real_departure": real_departure,
-                        "real_arrival": real_arrival,
-                        "estimated_departure": estimated_departure,
-                        "estimated_arrival": estimated_arrival,
-                        "first_timestamp": first_timestamp
-                    })
-            except requests.exceptions.HTTPError:
-                # Log error
-                pass
-            except CloudflareError:
-                # LOG error for flight which required money
-                pass
-
-        return flight_data
+        if self.__cache is not None:
+            flights_to_fetch = []
+            for flight in flights:
+                record = self.__cache.get(flight)
+                if record is None:
+                    flights_to_fetch.append(flight)
+                else:
+                    yield record
+            flights = flights_to_fetch
 
-    def process(self):
-        validated_data = DataValidator(self.__flight_data).process()
-        result = self.__exalt_add.process(table_name="flight", data=validated_data)
+        for flight, current_flight in self.__fetcher.fetch(flights):
+            record = self._flatten_flight_details(current_flight)
+            if record is not None:
+                if self.__cache is not None:
+                    self.__cache.set(flight, record)
+                yield record
+
+    @staticmethod
+    def _validate_flight_data(batches, mapping: dict):
+        """Validates batches of flight records.
+
+        Args:
+            batches (iterable): Lists of flight records.
+            mapping (dict): Mapping of the flight table columns to their data types.
+
+        Yields:
+            list: The validated batches, ready to be uploaded.
+        """
+        for batch in batches:
+            validated_data = DataValidator(batch, mapping).process()
+            if validated_data:
+                yield validated_data
+
+    @staticmethod
+    def _flatten_flight_details(current_flight: dict):
+        """Flattens the details of a flight returned by FlightRadar24 into a flight table record.
+
+        Args:
+            current_flight (dict): Flight details as returned by FlightRadar24.
+
+        Returns:
+            dict: The flight record, or None if the details do not identify a flight.
+        """
+        if current_flight.get("identification"):
+            flight_id = current_flight["identification"].get("id")
+            callsign = current_flight["identification"].get("callsign")
+            live = current_flight.get("status", {}).get("live")
 
-        self.__cursor.close()
-        self.__connexion.close()
+            aircraft_model = current_flight.get("aircraft", {}).get("model", {})
+            aircraft_model_code = aircraft_model.get("code")
+            aircraft_model_text = aircraft_model.get("text")
+            aircraft_manufacturer = None
+            if aircraft_model_text:
+                aircraft_manufacturer = aircraft_model_text.split(" ")[0]
+            airline = current_flight.get("airline").get("name") if current_flight.get("airline") else None
 
-        if result.get("status") == "success":
+            origin_airport = current_flight.get("airport", {}).get("origin", {})
+            origin_name = origin_airport.get("name") if origin_airport else None
+            origin_iata = origin_airport.get("code", {}).get("iata") if origin_airport else None
+            origin_icao = origin_airport.get("code", {}).get("icao") if origin_airport else None
+            origin_lat = origin_airport.get("position", {}).get("latitude") if origin_airport else None
+            origin_long = origin_airport.get("position", {}).get("longitude") if origin_airport else None
+            origin_country = origin_airport.get("position", {}).get("country", {}).get(
+                "name") if origin_airport else None
+            origin_timezone = origin_airport.get("timezone", {}).get("name") if origin_airport else None
+            if timezone:
+                origin_timezone = str(origin_timezone).split("/")[0]
+            origin_continent = origin_timezone
+
+            destination_airport = current_flight.get("airport", {}).get("destination", {})
+            destination_name = destination_airport.get("name") if destination_airport else None
+            destination_iata = destination_airport.get("code", {}).get("iata") if destination_airport else None
+            destination_icao = destination_airport.get("code", {}).get("icao") if destination_airport else None
+            destination_lat = destination_airport.get("position", {}).get(
+                "latitude") if destination_airport else None
+            destination_long = destination_airport.get("position", {}).get(
+                "longitude") if destination_airport else None
+            destination_country = destination_airport.get("position", {}).get("country", {}).get(
+                "name") if destination_airport else None
+            destination_timezone = destination_airport.get("timezone", {}).get(
+                "name") if destination_airport else None
+            if timezone:
+                destination_timezone = str(destination_timezone).split("/")[0]
+            destination_continent = destination_timezone
+
+            scheduled_time = current_flight.get("time", {}).get("scheduled", {})
+            scheduled_departure = datetime.fromtimestamp(
+                scheduled_time.get("departure"), timezone.utc
+            ).isoformat() if scheduled_time.get("departure") else None
+            scheduled_arrival = datetime.fromtimestamp(
+                scheduled_time.get("arrival"), timezone.utc
+            ).isoformat() if scheduled_time.get("arrival") else None
+
+            real_time = current_flight.get("time", {}).get("real", {})
+            real_departure = datetime.fromtimestamp(
+                real_time.get("departure"), timezone.utc
+            ).isoformat() if real_time.get("departure") else None
+            real_arrival = datetime.fromtimestamp(
+                real_time.get("arrival"), timezone.utc
+            ).isoformat() if real_time.get("arrival") else None
+
+            estimated_time = current_flight.get("time", {}).get("estimated", {})
+            estimated_departure = datetime.fromtimestamp(
+                estimated_time.get("departure"), timezone.utc
+            ).isoformat() if estimated_time.get("departure") else None
+            estimated_arrival = datetime.fromtimestamp(
+                estimated_time.get("arrival"), timezone.utc
+            ).isoformat() if estimated_time.get("arrival") else None
+            first_timestamp = datetime.fromtimestamp(
+                current_flight.get("firstTimestamp"), timezone.utc
+            ).isoformat() if current_flight.get("firstTimestamp") else None
+
+            # Prepare data for insertion
             return {
+                "flight_id": flight_id,
+                "callsign": callsign,
+                "live": live,
+                "aircraft_model_code": aircraft_model_code,
+                "aircraft_model_text": aircraft_model_text,
+                "aircraft_manufacturer": aircraft_manufacturer,
+                "airline": airline,
+                "origin_airport_name": origin_name,
+                "origin_airport_iata": origin_iata,
+                "origin_airport_icao": origin_icao,
+                "origin_airport_lat": origin_lat,
+                "origin_airport_long": origin_long,
+                "origin_airport_country": origin_country,
+                "origin_airport_continent": origin_continent,
+                "destination_airport_name": destination_name,
+                "destination_airport_iata": destination_iata,
+                "destination_airport_icao": destination_icao,
+                "destination_airport_lat": destination_lat,
+                "destination_airport_long": destination_long,
+                "destination_airport_country": destination_country,
+                "destination_airport_continent": destination_continent,
+                "scheduled_departure": scheduled_departure,
+                "scheduled_arrival": scheduled_arrival,
+                "real_departure": real_departure,
+                "real_arrival": real_arrival,
+                "estimated_departure": estimated_departure,
+                "estimated_arrival": estimated_arrival,
+                "first_timestamp": first_timestamp
+            }
+
+        return None
+
+    def _update_current_flights(self, batch: list, bucket: datetime):
+        """Upserts a batch of flight records into the current flight state table.
+
+        With sketches, the live flights not yet in the table are counted in the summaries of the bucket,
+        in the transaction of the upsert: each live flight is counted once, landed flights being removed
+        from the table at each upload.
+
+        Args:
+            batch (list): The validated flight records.
+            bucket (datetime): The bucket of the summaries, see `sketch_bucket`.
+
+        Raises:
+            AddException: If the records or the summaries cannot be stored.
+        """
+        current_flights = [data for data in batch if data.get("flight_id") is not None]
+        if not current_flights:
+            return
+
+        sketches = {}
+        if self.__update_sketches:
+            # The last record of a flight wins, as in the upsert
+            new_flights = {data["flight_id"]: data for data in current_flights}
+            new_flights = {flight_id: data for flight_id, data in new_flights.items() if data.get("live")}
+            for flight in self.__exalt_get.get_properties(
+                    "flight_current", ["flight_id"], {"flight_id": {"in": list(new_flights)}}
+            ):
+                del new_flights[flight["flight_id"]]
+            update_sketches(sketches, list(new_flights.values()))
+        self.__exalt_add.upsert(
+            table_name="flight_current", data=current_flights, conflict_fields=["flight_id"], commit=not sketches
+        )
+        if sketches:
+            result = ExaltSketchHandler(self.__connexion, self.__cursor).add(bucket, sketches, commit=False)
+            if result["status"] != "success":
+                raise AddException(result["message"])
+            self.__connexion.commit()
+            self.__nb_sketches += result["nb_data"]
+
+    def _remove_ended_flights(self, upload_start) -> int:
+        """Removes from the current flight state table the flights which are no longer live.
+
+        Args:
+            upload_start (datetime): Database time at the start of the upload, flights which were
+                not updated since are no longer tracked by FlightRadar24.
+
+        Returns:
+            int: The number of removed flights.
+        """
+        stale_flights = self.__exalt_delete.process("flight_current", {"latest_update": {"lt": upload_start}})
+        landed_flights = self.__exalt_delete.process("flight_current", {"live": {"eq": False}})
+
+        return stale_flights["nb_data"] + landed_flights["nb_data"]
+
+    def process(self):
+        """Streams the flight data through the fetch -> flatten -> validate -> write pipeline.
+
+        Stages run concurrently and are linked by bounded queues, and each batch of validated
+        rows is committed as soon as it is full, so memory usage does not depend on the
+        number of flights. Each batch is appended to the flight history and upserted into the
+        current flight state, from which the flights no longer live are removed at the end. With
+        sketches, the live flights added to the current flight state are counted in the summaries of
+        the day of the upload, with each batch.
+
+        Returns:
+            dict: A dictionary containing the response status and message.
+        """
+        nb_data, nb_batches, nb_removed = 0, 0, 0
+        try:
+            self.__cursor.execute("SELECT NOW()")
+            upload_start = self.__cursor.fetchone()[0]
+            mapping = ExaltGetHandler(self.__connexion, self.__cursor).get_mapping("flight")
+            flights = threaded(self._get_flight_data(), self.__queue_size, name="flight_fetch")
+            batches = threaded(
+                self._validate_flight_data(batched(flights, self.__batch_size), mapping),
+                maxsize=2,
+                name="flight_validation"
+            )
+            for batch in batches:
+                result = self.__exalt_add.process(table_name="flight", data=batch)
+                nb_data += len(result.get("ids"))
+                nb_batches += 1
+                self._update_current_flights(batch, sketch_bucket(upload_start))
+
+            if nb_batches:
+                nb_removed = self._remove_ended_flights(upload_start)
+
+            if self.__cache is not None:
+                self.__cache.save()
+        finally:
+            self.__cursor.close()
+            self.__connexion.close()
+
+        if nb_batches:
+            result = {
                 "status": "success",
                 "message": "flight data successfully uploaded.",
-                "nb_data": len(result.get("ids"))
+                "nb_data": nb_data,
+                "nb_batches": nb_batches,
+                "nb_removed_flights": nb_removed
             }
+            if self.__cache is not None:
+                result["cache"] = {"hits": self.__cache.hits, "misses": self.__cache.misses}
+            if self.__update_sketches:
+                result["nb_sketches"] = self.__nb_sketches
+
+            return result
         else:
             return {
                 "status": "error",
                 "message": "Internal error occurred during flight data uploading."
             }
-
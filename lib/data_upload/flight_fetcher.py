@@ -0,0 +1,139 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+from FlightRadar24.core import Core
+from FlightRadar24.errors import CloudflareError
+
+from lib.data_upload import FETCH_WORKERS, FETCH_RATE_LIMIT, FETCH_TIMEOUT
+
+
+class RateLimiter:
+    def __init__(self, rate: float):
+        """Thread-safe limiter spacing out calls so that at most `rate` calls are made per second.
+
+        Args:
+            rate (float): Maximum number of calls per second. A falsy value disables the limit.
+        """
+        self.__interval = 1.0 / rate if rate else 0.0
+        self.__next_slot = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks the calling thread until it is allowed to make its call."""
+        if not self.__interval:
+            return
+
+        with self.__lock:
+            now = time.monotonic()
+            slot = max(self.__next_slot, now)
+            self.__next_slot = slot + self.__interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class FlightDetailsFetcher:
+    def __init__(
+            self,
+            workers: int = FETCH_WORKERS,
+            rate_limit: float = FETCH_RATE_LIMIT,
+            timeout: float = FETCH_TIMEOUT,
+            details_url: str = Core.flight_data_url,
+            headers: dict = None
+    ) -> None:
+        """Fetches flight details from FlightRadar24 with a pool of workers.
+
+        Each worker keeps its own HTTP session so that connections are kept alive and reused
+        between calls, and all workers share the same rate limiter.
+
+        Args:
+            workers (int): Number of concurrent workers.
+            rate_limit (float): Maximum number of requests per second, all workers combined.
+            timeout (float): Timeout of a single request, in seconds.
+            details_url (str): URL template of the flight details endpoint.
+            headers (dict, optional): Headers sent with each request. Defaults to FlightRadar24 JSON headers.
+        """
+        self.__workers = max(1, workers)
+        self.__timeout = timeout
+        self.__details_url = details_url
+        self.__headers = dict(Core.json_headers if headers is None else headers)
+        self.__rate_limiter = RateLimiter(rate_limit)
+        self.__local = threading.local()
+
+    def __get_session(self) -> requests.Session:
+        session = getattr(self.__local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.__headers)
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self.__local.session = session
+
+        return session
+
+    def get_flight_details(self, flight) -> dict:
+        """Retrieves the details of a single flight.
+
+        Args:
+            flight: A FlightRadar24 Flight instance (only its `id` is used).
+
+        Returns:
+            dict: The flight details as returned by FlightRadar24.
+
+        Raises:
+            requests.exceptions.HTTPError: If the API answers with an error status.
+            CloudflareError: If the request was rejected by Cloudflare.
+        """
+        self.__rate_limiter.acquire()
+        response = self.__get_session().get(self.__details_url.format(flight.id), timeout=self.__timeout)
+        if response.status_code == 520:
+            raise CloudflareError(
+                message="An unexpected error has occurred. Perhaps you are making too many calls?",
+                response=response
+            )
+        response.raise_for_status()
+
+        return response.json()
+
+    def __safe_get_flight_details(self, flight):
+        try:
+            return flight, self.get_flight_details(flight)
+        except (requests.exceptions.RequestException, ValueError):
+            # Log error
+            return None
+        except CloudflareError:
+            # LOG error for flight which required money
+            return None
+
+    def fetch(self, flights):
+        """Yields the details of the given flights as soon as they are retrieved.
+
+        At most twice as many requests as workers are in flight at once, so the flights
+        iterable is consumed lazily. Flights whose details cannot be retrieved are skipped.
+
+        Args:
+            flights (iterable): FlightRadar24 Flight instances.
+
+        Yields:
+            tuple: (flight, details) for each flight, in completion order.
+        """
+        flights = iter(flights)
+        max_pending = 2 * self.__workers
+        with ThreadPoolExecutor(max_workers=self.__workers, thread_name_prefix="flight_fetcher") as executor:
+            pending = set()
+            for flight in flights:
+                pending.add(executor.submit(self.__safe_get_flight_details, flight))
+                if len(pending) < max_pending:
+                    continue
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.result() is not None:
+                        yield future.result()
+
+            for future in pending:
+                if future.result() is not None:
+                    yield future.result()
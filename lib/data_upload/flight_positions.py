@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+
+from FlightRadar24.api import FlightRadar24API
+
+from lib.data_upload import POSITION_BATCH_SIZE, LOAD_POSITION_ZONES
+from lib.data_upload.pipeline import batched
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.exalt_handler.add import ExaltAddHandler
+from lib.db_toolkits.exalt_handler.delete import ExaltDeleteHandler
+from lib.db_toolkits.exalt_handler.position import ExaltPositionHandler, POSITION_TABLE, ZONE_TABLE
+
+# Value of the fields missing from the FlightRadar24 feed
+MISSING_FEED_VALUE = "N/A"
+POSITION_FIELDS = [
+    "icao_24bit", "callsign", "registration", "aircraft_code", "number", "airline_iata", "airline_icao",
+    "origin_airport_iata", "destination_airport_iata", "altitude", "ground_speed", "heading", "vertical_speed",
+    "squawk"
+]
+
+
+class FlightPositionUploader:
+    def __init__(self, batch_size: int = POSITION_BATCH_SIZE, load_zones: bool = LOAD_POSITION_ZONES):
+        """Stores the positions of the aircraft of the live feed, without downloading any flight details.
+
+        Args:
+            batch_size (int): Number of positions upserted at once. Defaults to POSITION_BATCH_SIZE.
+            load_zones (bool): Whether the zones of FlightRadar24 are loaded in the zone table when it
+                is empty. Defaults to LOAD_POSITION_ZONES.
+        """
+        self.__fr_api = FlightRadar24API()
+        self.__connexion = ADMIN_POOL.getconn()
+        self.__cursor = self.__connexion.cursor()
+        self.__exalt_add = ExaltAddHandler(self.__connexion, self.__cursor)
+        self.__exalt_delete = ExaltDeleteHandler(self.__connexion, self.__cursor)
+        self.__batch_size = batch_size
+        self.__load_zones = load_zones
+
+    @staticmethod
+    def _flatten_flight_position(flight):
+        """Converts an aircraft of the live feed (FlightRadar24 Flight) into a flight_position record.
+
+        Returns:
+            dict: The position record, or None if the aircraft has no valid position.
+        """
+        values = {
+            field: None if getattr(flight, field, None) == MISSING_FEED_VALUE else getattr(flight, field, None)
+            for field in ["id", "latitude", "longitude", "on_ground", "time", *POSITION_FIELDS]
+        }
+        latitude, longitude = values["latitude"], values["longitude"]
+        if (
+                not values["id"]
+                or not isinstance(latitude, (int, float)) or not isinstance(longitude, (int, float))
+                or not -90 <= latitude <= 90 or not -180 <= longitude <= 180
+        ):
+            return None
+
+        return {
+            "flight_id": values["id"],
+            "latitude": latitude,
+            "longitude": longitude,
+            "on_ground": bool(values["on_ground"]) if values["on_ground"] is not None else None,
+            "position_timestamp": datetime.fromtimestamp(
+                values["time"], timezone.utc
+            ).isoformat() if values["time"] else None,
+            **{field: values[field] for field in POSITION_FIELDS}
+        }
+
+    def _load_zones(self) -> int:
+        """Loads the zones of FlightRadar24 in the zone table if it is empty.
+
+        Returns:
+            int: The number of loaded zones.
+        """
+        self.__cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {ZONE_TABLE})")
+        if self.__cursor.fetchone()[0]:
+            return 0
+
+        result = ExaltPositionHandler(self.__connexion, self.__cursor).add_zones(self.__fr_api.get_zones())
+
+        return result["nb_data"]
+
+    def process(self):
+        """Upserts the positions of the live feed into flight_position, then removes the aircraft no longer in it.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the number of stored and
+                removed positions.
+        """
+        nb_data, nb_removed, nb_zones = 0, 0, 0
+        try:
+            self.__cursor.execute("SELECT NOW()")
+            upload_start = self.__cursor.fetchone()[0]
+            positions = {}
+            for flight in self.__fr_api.get_flights():
+                position = self._flatten_flight_position(flight)
+                if position is not None:
+                    # The feed may list an aircraft twice, the upsert takes each key once
+                    positions[position["flight_id"]] = position
+            for batch in batched(positions.values(), self.__batch_size):
+                self.__exalt_add.upsert(table_name=POSITION_TABLE, data=batch, conflict_fields=["flight_id"])
+                nb_data += len(batch)
+
+            if nb_data:
+                # Aircraft not updated since the start of the upload are no longer in the feed
+                removed = self.__exalt_delete.process(POSITION_TABLE, {"latest_update": {"lt": upload_start}})
+                nb_removed = removed["nb_data"]
+            if self.__load_zones:
+                nb_zones = self._load_zones()
+        finally:
+            self.__cursor.close()
+            self.__connexion.close()
+
+        if nb_data:
+            return {
+                "status": "success",
+                "message": "flight positions successfully uploaded.",
+                "nb_data": nb_data,
+                "nb_removed_positions": nb_removed,
+                "nb_zones": nb_zones
+            }
+        else:
+            return {
+                "status": "error",
+                "message": "Internal error occurred during flight positions uploading."
+            }
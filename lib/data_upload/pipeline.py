@@ -0,0 +1,96 @@
+import queue
+import threading
+
+from lib.data_upload import PIPELINE_JOIN_TIMEOUT
+
+_END_OF_STAGE = object()
+
+
+def batched(iterable, size: int):
+    """Groups the items of an iterable into lists of at most `size` items.
+
+    Args:
+        iterable (iterable): Items to group.
+        size (int): Maximum size of a batch.
+
+    Yields:
+        list: The successive batches, the last one may be smaller.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def threaded(iterable, maxsize: int, name: str = "pipeline_stage", join_timeout: float = PIPELINE_JOIN_TIMEOUT):
+    """Consumes an iterable in a background thread through a bounded queue.
+
+    The producer thread blocks as soon as `maxsize` items are waiting to be consumed, so a
+    fast stage never gets more than `maxsize` items ahead of the next one. An exception raised
+    by the producer is re-raised in the consumer, and closing the consumer stops the producer.
+
+    The iterator of the iterable is closed (see generator.close) by the producer thread once it
+    stops, releasing the resources of an unfinished stage. The consumer waits at most `join_timeout`
+    seconds for the producer: a producer still blocked in the iterable is left to stop on its own.
+
+    Args:
+        iterable (iterable): Stage to run in the background.
+        maxsize (int): Maximum number of items waiting between the two stages.
+        name (str): Name of the background thread.
+        join_timeout (float): Maximum number of seconds waited for the producer to stop. Defaults to
+            PIPELINE_JOIN_TIMEOUT.
+
+    Yields:
+        The items of the iterable, in order.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    errors = []
+    iterator = iter(iterable)
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # A generator can only be closed by the thread running it, once it is not executing
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    errors.append(e)
+            put(_END_OF_STAGE)
+
+    producer = threading.Thread(target=produce, name=name, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END_OF_STAGE:
+                break
+            yield item
+
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        producer.join(timeout=join_timeout)
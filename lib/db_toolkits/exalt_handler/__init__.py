@@ -1,4 +1,4 @@
-from lib.db_toolkits.utilities import create_connection
+from lib.db_toolkits.utilities.connection_pool import ConnectionPool
 
 ADMIN_CREDENTIAL = {
     "name": "exalt_fr_db",
@@ -8,6 +8,35 @@ ADMIN_CREDENTIAL = {
     "port": 5432
 }
 
-ADMIN_CONNEXION = create_connection(ADMIN_CREDENTIAL)
-TABLES = ["flight", "indicator"]
+# Connection pool shared by the handlers, jobs and endpoints, connecting on first checkout. At most
+# POOL_MAX_SIZE connections are checked out at once, a checkout waits up to POOL_TIMEOUT seconds for
+# a connection to be released. Connections idle for more than POOL_HEALTH_CHECK_INTERVAL seconds
+# are checked first.
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+POOL_TIMEOUT = 30
+POOL_HEALTH_CHECK_INTERVAL = 30
+ADMIN_POOL = ConnectionPool(
+    ADMIN_CREDENTIAL,
+    min_size=POOL_MIN_SIZE,
+    max_size=POOL_MAX_SIZE,
+    timeout=POOL_TIMEOUT,
+    health_check_interval=POOL_HEALTH_CHECK_INTERVAL
+)
+TABLES = [
+    "flight", "flight_current", "flight_aggregate", "airport", "flight_sketch", "flight_position", "zone",
+    "indicator", "indicator_view", "indicator_rollup"
+]
 INTERNAL_FIELDS = ["id", "latest_update", "data_status"]
+
+# Bulk loading: records are loaded with COPY FROM STDIN by chunks of COPY_CHUNK_SIZE records.
+# Multi-row INSERT statements are chunked to stay under the Postgres bind parameters limit.
+ADD_METHOD = "copy"
+COPY_CHUNK_SIZE = 10000
+MAX_QUERY_PARAMETERS = 65535
+
+# Streaming reads: number of rows transferred at once by the server-side cursors of ExaltGetHandler
+GET_ITERSIZE = 2000
+
+# Columnar reads: size of the COPY stream buffered before it is decoded, in bytes
+COPY_TO_CHUNK_SIZE = 8 * 1024 * 1024
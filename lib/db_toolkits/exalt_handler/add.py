@@ -2,26 +2,123 @@ import psycopg2
 from psycopg2 import sql, DatabaseError
 from psycopg2.extras import Json
 
-from lib.db_toolkits.exalt_handler import ADMIN_CONNEXION
+from lib.db_toolkits.exalt_handler import ADMIN_POOL, ADD_METHOD, COPY_CHUNK_SIZE, MAX_QUERY_PARAMETERS
+from lib.db_toolkits.utilities.processing_functions import process_copy_rows
 from lib.utilities.exceptions import AddException
 
 
 class ExaltAddHandler:
     def __init__(
             self,
-            connection: psycopg2.extensions.connection = ADMIN_CONNEXION,
-            cursor: psycopg2.extensions.cursor = ADMIN_CONNEXION.cursor()
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
     ) -> None:
-        self.__connection: psycopg2.extensions.connection = connection
-        self.__cursor: psycopg2.extensions.cursor = cursor
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
 
-    def process(self, table_name: str, data: list) -> dict:
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
+
+    @staticmethod
+    def __get_columns(data: list) -> list:
+        """Lists the keys of all the records, in order of appearance."""
+        return list(dict.fromkeys(key for record in data for key in record.keys()))
+
+    def __reserve_ids(self, table_name: str, nb_ids: int) -> list:
+        """Draws `nb_ids` values from the sequence of the table id, or returns None if it has none."""
+        self.__cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table_name,))
+        sequence = self.__cursor.fetchone()[0]
+        if sequence is None:
+            return None
+
+        self.__cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", (sequence, nb_ids))
+
+        return [row[0] for row in self.__cursor.fetchall()]
+
+    def __insert(self, table_name: str, data: list, columns: list, return_ids: bool) -> list:
+        """Inserts the records with multi-row INSERT statements, chunked to respect the bind parameters limit."""
+        # Create a list of SQL placeholders
+        placeholders = sql.SQL(', ').join(sql.Placeholder() * len(columns))
+        chunk_size = max(1, MAX_QUERY_PARAMETERS // len(columns))
+
+        inserted_ids = []
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start:start + chunk_size]
+
+            # Build the SQL query for inserting multiple rows
+            insert_query = sql.SQL(
+                "INSERT INTO {} ({}) VALUES {}{}"
+            ).format(
+                sql.Identifier(table_name),
+                sql.SQL(", ").join([sql.Identifier(col.lower()) for col in columns]),
+                sql.SQL(', ').join(sql.SQL('({})').format(placeholders) for _ in chunk),
+                sql.SQL(" RETURNING id" if return_ids else "")
+            )
+
+            # Flatten the list of values from all dictionaries
+            values = [
+                Json(value) if isinstance(value, dict) else value
+                for record in chunk for value in (record.get(col) for col in columns)
+            ]
+
+            # Execute the query
+            self.__cursor.execute(insert_query, values)
+
+            # Fetch all returned IDs
+            if return_ids:
+                inserted_ids.extend(row[0] for row in self.__cursor.fetchall())
+
+        return inserted_ids
+
+    def __copy(self, table_name: str, data: list, columns: list, return_ids: bool, chunk_size: int) -> list:
+        """Loads the records with COPY FROM STDIN, one in-memory buffer per chunk.
+
+        COPY cannot return the generated ids: when they are requested, they are drawn from the
+        table id sequence beforehand and loaded along with the records.
+        """
+        inserted_ids = []
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start:start + chunk_size]
+            chunk_columns = columns
+            if return_ids:
+                ids = self.__reserve_ids(table_name, len(chunk))
+                if ids is None:
+                    inserted_ids.extend(self.__insert(table_name, chunk, columns, return_ids))
+                    continue
+
+                chunk = [{**record, "id": record_id} for record, record_id in zip(chunk, ids)]
+                chunk_columns = ["id"] + [col for col in columns if col.lower() != "id"]
+                inserted_ids.extend(ids)
+
+            copy_query = sql.SQL("COPY {} ({}) FROM STDIN").format(
+                sql.Identifier(table_name),
+                sql.SQL(", ").join([sql.Identifier(col.lower()) for col in chunk_columns])
+            )
+            self.__cursor.copy_expert(copy_query, process_copy_rows(chunk, chunk_columns))
+
+        return inserted_ids
+
+    def process(
+            self,
+            table_name: str,
+            data: list,
+            method: str = ADD_METHOD,
+            return_ids: bool = True,
+            chunk_size: int = COPY_CHUNK_SIZE
+    ) -> dict:
         """
         Add new data to the specified table in the database
 
         Args:
             table_name (str): The name of the table to be used.
             data (list): List of dictionaries containing the data to be added to the table.
+            method (str): "copy" to bulk load the data with COPY FROM STDIN, or "insert" to use
+                multi-row INSERT statements. Defaults to ADD_METHOD.
+            return_ids (bool): Whether the ids of the new records are returned. Defaults to True.
+            chunk_size (int): Number of records loaded per COPY. Defaults to COPY_CHUNK_SIZE.
 
         Returns:
             dict: A dictionary containing the response status and message.
@@ -31,46 +128,114 @@ class ExaltAddHandler:
         """
         if not data:
             raise AddException("No data is provided")
+        if method not in ["copy", "insert"]:
+            raise AddException(f"Unknown add method '{method}'")
 
         try:
             # Rollback current transaction
             self.__cursor.execute("ROLLBACK;")
             self.__connection.commit()
 
-            # Extract columns from the first dictionary in the list
-            columns = list(col.lower() for col in data[0].keys())
+            columns = self.__get_columns(data)
+            if method == "copy":
+                inserted_ids = self.__copy(table_name, data, columns, return_ids, chunk_size)
+            else:
+                inserted_ids = self.__insert(table_name, data, columns, return_ids)
+            self.__connection.commit()
 
-            # Create a list of SQL placeholders
-            placeholders = sql.SQL(', ').join(sql.Placeholder() * len(columns))
+            return {
+                "status": "success",
+                "message": f"New records successfully added to {table_name}.",
+                "ids": inserted_ids
+            }
 
-            # Build the SQL query for inserting multiple rows
-            insert_query = sql.SQL(
-                "INSERT INTO {} ({}) VALUES {} RETURNING id"
-            ).format(
-                sql.Identifier(table_name),
-                sql.SQL(", ").join([sql.Identifier(col) for col in columns]),
-                sql.SQL(', ').join(sql.SQL('({})').format(placeholders) for _ in data)
-            )
+        except Exception as e:
+            self.__connection.rollback()
+            raise AddException(f"An error occurred while adding data to the table {table_name}: {str(e)}")
 
-            # Flatten the list of values from all dictionaries
-            values = [
-                Json(value) if isinstance(value, dict) else value
-                for record in data for value in record.values()
-            ]
+    def upsert(
+            self,
+            table_name: str,
+            data: list,
+            conflict_fields: list,
+            chunk_size: int = COPY_CHUNK_SIZE,
+            commit: bool = True
+    ) -> dict:
+        """
+        Insert or replace data in the specified table, based on a unique key.
 
-            # Execute the query
-            self.__cursor.execute(insert_query, values)
+        The records are bulk loaded into a temporary staging table, then merged into the table with
+        INSERT ... ON CONFLICT DO UPDATE. A replaced row takes all the values of the new record, the
+        columns missing from the record being reset to their default value.
+
+        Args:
+            table_name (str): The name of the table to be used.
+            data (list): List of dictionaries containing the data to be upserted.
+            conflict_fields (list): Fields of the unique key of the table.
+            chunk_size (int): Number of records loaded per COPY. Defaults to COPY_CHUNK_SIZE.
+            commit (bool): Whether the records are committed, False to leave the transaction open for
+                other writes to be committed with them. Defaults to True.
+
+        Returns:
+            dict: A dictionary containing the response status, message and number of upserted records.
+
+        Raises:
+            AddException: If an error occurs while upserting the records.
+        """
+        if not data:
+            raise AddException("No data is provided")
+
+        try:
+            # Rollback current transaction
+            self.__cursor.execute("ROLLBACK;")
             self.__connection.commit()
 
-            # Fetch all returned IDs
-            inserted_ids = [row[0] for row in self.__cursor.fetchall()]
+            staging_table = f"{table_name}_staging"
+            self.__cursor.execute(
+                sql.SQL("CREATE TEMPORARY TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                    sql.Identifier(staging_table), sql.Identifier(table_name)
+                )
+            )
+            self.__copy(staging_table, data, self.__get_columns(data), False, chunk_size)
+
+            # Generated columns are computed by Postgres and cannot be written
+            self.__cursor.execute(
+                "SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attgenerated <> ''",
+                (table_name,)
+            )
+            generated_columns = {row[0] for row in self.__cursor.fetchall()}
+            self.__cursor.execute(sql.SQL("SELECT * FROM {} LIMIT 0").format(sql.Identifier(staging_table)))
+            table_columns = [col.name for col in self.__cursor.description if col.name not in generated_columns]
+            update_columns = [col for col in table_columns if col not in conflict_fields]
+            conflict = sql.SQL(", ").join([sql.Identifier(col) for col in conflict_fields])
+
+            # The last loaded record wins when the same key appears several times
+            upsert_query = sql.SQL(
+                """
+                INSERT INTO {table} ({columns})
+                SELECT DISTINCT ON ({conflict}) {columns} FROM {staging} ORDER BY {conflict}, ctid DESC
+                ON CONFLICT ({conflict}) DO UPDATE SET {updates}
+                """
+            ).format(
+                table=sql.Identifier(table_name),
+                staging=sql.Identifier(staging_table),
+                columns=sql.SQL(", ").join([sql.Identifier(col) for col in table_columns]),
+                conflict=conflict,
+                updates=sql.SQL(", ").join(
+                    sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(col)) for col in update_columns
+                )
+            )
+            self.__cursor.execute(upsert_query)
+            nb_data = self.__cursor.rowcount
+            if commit:
+                self.__connection.commit()
 
             return {
                 "status": "success",
-                "message": f"New records successfully added to {table_name}.",
-                "ids": inserted_ids
+                "message": f"Records successfully upserted to {table_name}.",
+                "nb_data": nb_data
             }
 
         except Exception as e:
             self.__connection.rollback()
-            raise AddException(f"An error occurred while adding data to the table {table_name}: {str(e)}")
+            raise AddException(f"An error occurred while upserting data to the table {table_name}: {str(e)}")
@@ -0,0 +1,360 @@
+import psycopg2
+from psycopg2 import sql
+
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.utilities.table_mappings import FLIGHT_AGGREGATES
+
+AGGREGATE_TABLE = "flight_aggregate"
+AIRPORT_TABLE = "airport"
+SOURCE_TABLE = "flight_current"
+APPLY_FUNCTION = "flight_aggregate_apply"
+# Statement-level triggers of the source table and their transition tables
+TRIGGERS = {
+    "flight_aggregate_insert": {"event": "INSERT", "referencing": "NEW TABLE AS new_rows"},
+    "flight_aggregate_update": {"event": "UPDATE", "referencing": "OLD TABLE AS old_rows NEW TABLE AS new_rows"},
+    "flight_aggregate_delete": {"event": "DELETE", "referencing": "OLD TABLE AS old_rows"},
+}
+
+
+def _aggregate_rows_query(flights: str) -> str:
+    """Counts signed flights per aggregate name and key.
+
+    Args:
+        flights (str): A query of flights with a "sign" column, 1 for a flight added to the counters
+            and -1 for a flight removed from them.
+
+    Returns:
+        str: A query of (name, key, nb_flights, nb_regional_flights) rows.
+    """
+    aggregates = []
+    for name, aggregate in FLIGHT_AGGREGATES.items():
+        where = f"live = TRUE AND ({aggregate['where']})" if aggregate.get("where") else "live = TRUE"
+        aggregates.append(
+            f"""
+            SELECT
+                '{name}' AS name,
+                jsonb_build_array({', '.join(aggregate['fields'])}) AS key,
+                sign AS nb_flights,
+                CASE WHEN origin_airport_continent = destination_airport_continent THEN sign ELSE 0 END
+                    AS nb_regional_flights
+            FROM flights
+            WHERE {where}
+            """
+        )
+
+    return f"""
+        WITH flights AS ({flights})
+        SELECT name, key, SUM(nb_flights) AS nb_flights, SUM(nb_regional_flights) AS nb_regional_flights
+        FROM ({' UNION ALL '.join(aggregates)}) aggregates
+        GROUP BY name, key
+    """
+
+
+def _airport_rows_query(flights: str) -> str:
+    """Counts signed departures and arrivals per airport IATA code.
+
+    Args:
+        flights (str): A query of flights with a "sign" column, see `_aggregate_rows_query`.
+
+    Returns:
+        str: A query of (iata, name, icao, lat, lon, country, nb_departures, nb_arrivals) rows, the
+            details of an airport being read from the flights added to the counters.
+    """
+    airports = []
+    for prefix, nb_departures, nb_arrivals in [("origin", "sign", "0"), ("destination", "0", "sign")]:
+        airports.append(
+            f"""
+            SELECT
+                {prefix}_airport_iata AS iata,
+                CASE WHEN sign > 0 THEN {prefix}_airport_name END AS name,
+                CASE WHEN sign > 0 THEN {prefix}_airport_icao END AS icao,
+                CASE WHEN sign > 0 THEN {prefix}_airport_lat END AS lat,
+                CASE WHEN sign > 0 THEN {prefix}_airport_long END AS lon,
+                CASE WHEN sign > 0 THEN {prefix}_airport_country END AS country,
+                {nb_departures} AS nb_departures,
+                {nb_arrivals} AS nb_arrivals
+            FROM flights
+            WHERE live = TRUE AND {prefix}_airport_iata IS NOT NULL
+            """
+        )
+
+    return f"""
+        WITH flights AS ({flights})
+        SELECT
+            iata, MAX(name) AS name, MAX(icao) AS icao, MAX(lat) AS lat, MAX(lon) AS lon, MAX(country) AS country,
+            SUM(nb_departures) AS nb_departures, SUM(nb_arrivals) AS nb_arrivals
+        FROM ({' UNION ALL '.join(airports)}) airports
+        GROUP BY iata
+    """
+
+
+def _airport_apply_query(flights: str) -> str:
+    """Adds the counts of signed departures and arrivals to the airport counters, see `_airport_rows_query`.
+
+    Airports are kept when their counters fall to 0, the airport table being the dimension of the
+    airports ever seen.
+    """
+    return f"""
+        INSERT INTO {AIRPORT_TABLE} AS airport (iata, name, icao, lat, lon, country, nb_departures, nb_arrivals)
+        SELECT iata, name, icao, lat, lon, country, nb_departures, nb_arrivals
+        FROM ({_airport_rows_query(flights)}) changes
+        WHERE nb_departures <> 0 OR nb_arrivals <> 0
+        ON CONFLICT (iata) DO UPDATE SET
+            name = COALESCE(EXCLUDED.name, airport.name),
+            icao = COALESCE(EXCLUDED.icao, airport.icao),
+            lat = COALESCE(EXCLUDED.lat, airport.lat),
+            lon = COALESCE(EXCLUDED.lon, airport.lon),
+            country = COALESCE(EXCLUDED.country, airport.country),
+            nb_departures = airport.nb_departures + EXCLUDED.nb_departures,
+            nb_arrivals = airport.nb_arrivals + EXCLUDED.nb_arrivals,
+            latest_update = NOW();
+    """
+
+
+def _apply_query(flights: str) -> str:
+    """Adds the counts of signed flights to the counters and to the airport counters, see `_aggregate_rows_query`."""
+    return f"""
+        INSERT INTO {AGGREGATE_TABLE} AS aggregate (name, key, nb_flights, nb_regional_flights)
+        SELECT name, key, nb_flights, nb_regional_flights
+        FROM ({_aggregate_rows_query(flights)}) changes
+        WHERE nb_flights <> 0 OR nb_regional_flights <> 0
+        ON CONFLICT (name, key) DO UPDATE SET
+            nb_flights = aggregate.nb_flights + EXCLUDED.nb_flights,
+            nb_regional_flights = aggregate.nb_regional_flights + EXCLUDED.nb_regional_flights,
+            latest_update = NOW();
+        DELETE FROM {AGGREGATE_TABLE} WHERE nb_flights = 0;
+        {_airport_apply_query(flights)}
+    """
+
+
+class ExaltAggregateHandler:
+    def __init__(
+            self,
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
+    ) -> None:
+        """Maintains the counters of the live flights in the flight_aggregate table, and the numbers of
+        live departures and arrivals of each airport in the airport table.
+
+        The counters are updated incrementally by statement-level triggers of flight_current, from the
+        flights inserted, updated and removed by each statement (its transition tables), so that the
+        indicators read them instead of scanning the live flights.
+
+        Args:
+            connection (psycopg2.extensions.connection, optional): Defaults to a connection checked out
+                from the pool until the handler is closed.
+            cursor (psycopg2.extensions.cursor, optional): Defaults to a new cursor of the connection.
+        """
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
+
+    def create_triggers(self) -> dict:
+        """Creates (or replaces) the triggers maintaining the counters, then recomputes the counters.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the triggers.
+        """
+        insert_query = _apply_query("SELECT *, 1 AS sign FROM new_rows")
+        update_query = _apply_query("SELECT *, 1 AS sign FROM new_rows UNION ALL SELECT *, -1 AS sign FROM old_rows")
+        delete_query = _apply_query("SELECT *, -1 AS sign FROM old_rows")
+        try:
+            self.__cursor.execute(
+                f"""
+                CREATE OR REPLACE FUNCTION {APPLY_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN
+                        {insert_query}
+                    ELSIF TG_OP = 'UPDATE' THEN
+                        {update_query}
+                    ELSE
+                        {delete_query}
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$;
+                """
+            )
+            for trigger_name, trigger in TRIGGERS.items():
+                self.__cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name} ON {SOURCE_TABLE};")
+                self.__cursor.execute(
+                    f"CREATE TRIGGER {trigger_name} AFTER {trigger['event']} ON {SOURCE_TABLE} "
+                    f"REFERENCING {trigger['referencing']} FOR EACH STATEMENT EXECUTE FUNCTION {APPLY_FUNCTION}();"
+                )
+            self.__connection.commit()
+        except Exception as e:
+            self.__connection.rollback()
+            return {
+                "status": "error",
+                "message": f"Error occurred during aggregate triggers creation: {str(e)}"
+            }
+
+        result = self.refresh()
+        if result["status"] == "success":
+            result = {
+                "status": "success",
+                "message": "Aggregate triggers successfully created.",
+                "triggers": list(TRIGGERS)
+            }
+
+        return result
+
+    def refresh(self) -> dict:
+        """Recomputes all the counters from the live flights, the fallback of the incremental maintenance.
+
+        Writes to flight_current wait for the end of the recomputation.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the number of counters.
+        """
+        try:
+            self.__cursor.execute(f"LOCK TABLE {SOURCE_TABLE} IN SHARE MODE;")
+            self.__cursor.execute(f"DELETE FROM {AGGREGATE_TABLE};")
+            self.__cursor.execute(
+                f"""
+                INSERT INTO {AGGREGATE_TABLE} (name, key, nb_flights, nb_regional_flights)
+                {_aggregate_rows_query(f"SELECT *, 1 AS sign FROM {SOURCE_TABLE}")}
+                """
+            )
+            nb_data = self.__cursor.rowcount
+            self.__cursor.execute(
+                f"UPDATE {AIRPORT_TABLE} SET nb_departures = 0, nb_arrivals = 0 "
+                "WHERE nb_departures <> 0 OR nb_arrivals <> 0;"
+            )
+            self.__cursor.execute(_airport_apply_query(f"SELECT *, 1 AS sign FROM {SOURCE_TABLE}"))
+            nb_airports = self.__cursor.rowcount
+            self.__connection.commit()
+
+            return {
+                "status": "success",
+                "message": "Aggregates successfully recomputed.",
+                "nb_data": nb_data,
+                "nb_airports": nb_airports
+            }
+
+        except Exception as e:
+            self.__connection.rollback()
+            return {
+                "status": "error",
+                "message": f"Error occurred during aggregates recomputation: {str(e)}"
+            }
+
+    def check(self, nb_examples: int = 10) -> dict:
+        """Compares the counters with a recomputation from the live flights.
+
+        Args:
+            nb_examples (int): Maximum number of differing counters returned. Defaults to 10.
+
+        Returns:
+            dict: A dictionary containing the response status, message, whether the counters are
+                consistent, the number of differing counters and examples of them (name and key, or
+                airport IATA code, stored and expected counts).
+        """
+        try:
+            self.__cursor.execute(f"LOCK TABLE {SOURCE_TABLE} IN SHARE MODE;")
+            self.__cursor.execute(
+                f"""
+                WITH expected AS ({_aggregate_rows_query(f"SELECT *, 1 AS sign FROM {SOURCE_TABLE}")})
+                SELECT
+                    name,
+                    key,
+                    COALESCE(aggregate.nb_flights, 0) AS nb_flights,
+                    COALESCE(expected.nb_flights, 0) AS expected_nb_flights,
+                    COALESCE(aggregate.nb_regional_flights, 0) AS nb_regional_flights,
+                    COALESCE(expected.nb_regional_flights, 0) AS expected_nb_regional_flights
+                FROM {AGGREGATE_TABLE} aggregate
+                FULL OUTER JOIN expected USING (name, key)
+                WHERE aggregate.nb_flights IS DISTINCT FROM expected.nb_flights
+                OR aggregate.nb_regional_flights IS DISTINCT FROM expected.nb_regional_flights
+                """
+            )
+            differences = [
+                {col.name: value for col, value in zip(self.__cursor.description, row)}
+                for row in self.__cursor.fetchall()
+            ]
+            self.__cursor.execute(
+                f"""
+                WITH expected AS ({_airport_rows_query(f"SELECT *, 1 AS sign FROM {SOURCE_TABLE}")})
+                SELECT
+                    iata,
+                    COALESCE(airport.nb_departures, 0) AS nb_departures,
+                    COALESCE(expected.nb_departures, 0) AS expected_nb_departures,
+                    COALESCE(airport.nb_arrivals, 0) AS nb_arrivals,
+                    COALESCE(expected.nb_arrivals, 0) AS expected_nb_arrivals
+                FROM {AIRPORT_TABLE} airport
+                FULL OUTER JOIN expected USING (iata)
+                WHERE COALESCE(airport.nb_departures, 0) <> COALESCE(expected.nb_departures, 0)
+                OR COALESCE(airport.nb_arrivals, 0) <> COALESCE(expected.nb_arrivals, 0)
+                """
+            )
+            differences += [
+                {col.name: value for col, value in zip(self.__cursor.description, row)}
+                for row in self.__cursor.fetchall()
+            ]
+            self.__connection.commit()
+        except Exception as e:
+            self.__connection.rollback()
+            return {
+                "status": "error",
+                "message": f"Error occurred during aggregates check: {str(e)}"
+            }
+
+        return {
+            "status": "success",
+            "message": "Aggregates are consistent." if not differences else "Aggregates are inconsistent.",
+            "consistent": not differences,
+            "nb_differences": len(differences),
+            "differences": differences[:nb_examples]
+        }
+
+    def get_airports(self, fields: list, limit: int = None) -> list:
+        """Retrieves the airports with live flights, the largest difference between departures and arrivals first.
+
+        The airports are read in the order of the partial index on their difference, ties broken by
+        IATA code, the first `limit` ones only.
+
+        Args:
+            fields (list): The fields of the airports, see AIRPORT_MAPPING.
+            limit (int, optional): The maximum number of airports. Defaults to None, all of them.
+
+        Returns:
+            list: The airports, as dictionaries.
+        """
+        self.__cursor.execute(
+            sql.SQL(
+                """
+                SELECT {fields}
+                FROM {table}
+                WHERE nb_departures > 0 OR nb_arrivals > 0
+                ORDER BY flights_difference DESC, iata COLLATE "C"
+                LIMIT %s
+                """
+            ).format(
+                fields=sql.SQL(", ").join(sql.Identifier(field) for field in fields),
+                table=sql.Identifier(AIRPORT_TABLE)
+            ),
+            (limit,)
+        )
+        columns = [col.name for col in self.__cursor.description]
+        airports = [dict(zip(columns, row)) for row in self.__cursor.fetchall()]
+        self.__connection.commit()
+
+        return airports
+
+    def process(self) -> dict:
+        """Checks the counters and recomputes them if they are inconsistent.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the check result.
+        """
+        check = self.check()
+        if check["status"] == "success" and not check["consistent"]:
+            refresh = self.refresh()
+            check = {**refresh, "check": check}
+
+        return check
@@ -1,22 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
 import psycopg2
 
-from lib.db_toolkits.exalt_handler import TABLES, ADMIN_CONNEXION
-from lib.db_toolkits.utilities.table_mappings import MAPPINGS
+from lib.db_toolkits.exalt_handler import TABLES, ADMIN_POOL
+from lib.db_toolkits.exalt_handler.aggregate import ExaltAggregateHandler
+from lib.db_toolkits.exalt_handler.view import ExaltViewHandler
+from lib.db_toolkits.utilities.table_mappings import MAPPINGS, PARTITIONS, INDEXES, COLUMN_CONVERSIONS
+from lib.indicators import INDICATOR_SOURCE
+
+PARTITION_DATE_FORMAT = "%Y%m%d"
+# Partition of the rows outside of the daily partitions
+DEFAULT_PARTITION_SUFFIX = "_default"
 
 
 class ExaltCreateHandler:
     def __init__(
             self,
-            connection: psycopg2.extensions.connection = ADMIN_CONNEXION,
-            cursor: psycopg2.extensions.cursor = ADMIN_CONNEXION.cursor()
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None,
+            partitioned: bool = True,
+            indicator_views: bool = INDICATOR_SOURCE == "views"
     ) -> None:
-        self.__connection: psycopg2.extensions.connection = connection
-        self.__cursor: psycopg2.extensions.cursor = cursor
+        """Creates and maintains the tables of the database, their indexes and partitions.
+
+        Args:
+            connection (psycopg2.extensions.connection, optional): Defaults to a connection checked out
+                from the pool until the handler is closed.
+            cursor (psycopg2.extensions.cursor, optional): Defaults to a new cursor of the connection.
+            partitioned (bool): Whether the tables defined in PARTITIONS are created partitioned.
+                Defaults to True.
+            indicator_views (bool): Whether `process` also creates the materialized views of the
+                indicators, see ExaltViewHandler. Defaults to True with the "views" INDICATOR_SOURCE.
+        """
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
         self.authorized_tables = TABLES
+        self.__partitioned = partitioned
+        self.__indicator_views = indicator_views
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
 
     def __create_table(self, table_name: str) -> dict:
         """Creates a new table named 'airport' in the database if it does not already exist.
 
+        When partitioning is enabled and the table is defined in PARTITIONS, the table is created
+        as partitioned by range on its partition field.
+
         Args:
             table_name (str): The name of the table to create.
 
@@ -27,8 +60,16 @@ class ExaltCreateHandler:
             psycopg2.Error: If the table creation fails.
         """
         mapping = MAPPINGS[table_name]
-        fields = ", ".join([f"{field_name} {field_type}" for field_name, field_type in mapping.items()])
-        query = f"CREATE TABLE IF NOT EXISTS {table_name}({fields});"
+        partition = PARTITIONS.get(table_name) if self.__partitioned else None
+        if partition:
+            fields = ", ".join(
+                [f"{field_name} {field_type.replace('PRIMARY KEY', '')}" for field_name, field_type in mapping.items()]
+                + [f"PRIMARY KEY ({', '.join(partition['primary_key'])})"]
+            )
+            query = f"CREATE TABLE IF NOT EXISTS {table_name}({fields}) PARTITION BY RANGE ({partition['field']});"
+        else:
+            fields = ", ".join([f"{field_name} {field_type}" for field_name, field_type in mapping.items()])
+            query = f"CREATE TABLE IF NOT EXISTS {table_name}({fields});"
         self.__cursor.execute(query)
 
         return {
@@ -37,8 +78,269 @@ class ExaltCreateHandler:
             "table_name": table_name
         }
 
-    def process(self):
-        """Initializes the database and creates all tables needed.
+    def __sync_columns(self, table_name: str) -> list:
+        """Brings the columns of an existing table in line with its mapping.
+
+        Columns added to the mapping since the table was created are added, and columns still of a
+        type they were converted from in COLUMN_CONVERSIONS are converted.
+
+        Args:
+            table_name (str): The name of the table.
+
+        Returns:
+            list: The names of the added or converted columns.
+        """
+        self.__cursor.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = %s",
+            (table_name,)
+        )
+        columns = dict(self.__cursor.fetchall())
+
+        changed_columns = []
+        for field_name, field_type in MAPPINGS[table_name].items():
+            field_type = field_type.replace("PRIMARY KEY", "")
+            conversion = COLUMN_CONVERSIONS.get(table_name, {}).get(field_name)
+            if field_name not in columns:
+                self.__cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {field_name} {field_type};")
+            elif conversion and columns[field_name] == conversion["from"]:
+                self.__cursor.execute(
+                    f"ALTER TABLE {table_name} ALTER COLUMN {field_name} TYPE {field_type} USING {conversion['using']};"
+                )
+            else:
+                continue
+            changed_columns.append(field_name)
+
+        return changed_columns
+
+    def __is_partitioned(self, table_name: str) -> bool:
+        self.__cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", (table_name,)
+        )
+
+        return self.__cursor.fetchone()[0]
+
+    def __get_partitions(self, table_name: str) -> list:
+        self.__cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            (table_name,)
+        )
+
+        return [row[0] for row in self.__cursor.fetchall()]
+
+    def __maintain_table_partitions(self, table_name: str, reference_date: datetime) -> dict:
+        """Creates the upcoming daily partitions of a table and removes those out of the retention window.
+
+        Rows outside of the daily partitions (e.g. the maintenance did not run in time) are written to
+        the DEFAULT partition of the table rather than rejected: they are moved to their daily partition
+        when it is created, and removed from the DEFAULT partition once out of the retention window
+        (unless the retention only detaches partitions).
+        """
+        partition = PARTITIONS[table_name]
+        today = reference_date.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        default_partition = f"{table_name}{DEFAULT_PARTITION_SUFFIX}"
+        self.__cursor.execute(f"CREATE TABLE IF NOT EXISTS {default_partition} PARTITION OF {table_name} DEFAULT;")
+        partitions = self.__get_partitions(table_name)
+
+        created_partitions = []
+        for day in range(partition["premake_days"] + 1):
+            start = today + timedelta(days=day)
+            partition_name = f"{table_name}_p{start.strftime(PARTITION_DATE_FORMAT)}"
+            if partition_name not in partitions:
+                # A partition cannot be created over rows of the DEFAULT partition, which are moved into it
+                self.__cursor.execute(
+                    f"CREATE TEMPORARY TABLE {partition_name}_rows ON COMMIT DROP AS "
+                    f"WITH moved AS (DELETE FROM {default_partition} WHERE {partition['field']} >= %s "
+                    f"AND {partition['field']} < %s RETURNING *) SELECT * FROM moved;",
+                    (start, start + timedelta(days=1))
+                )
+            self.__cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {partition_name} PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{(start + timedelta(days=1)).isoformat()}');"
+            )
+            if partition_name not in partitions:
+                self.__cursor.execute(f"INSERT INTO {table_name} SELECT * FROM {partition_name}_rows;")
+                self.__cursor.execute(f"DROP TABLE {partition_name}_rows;")
+            created_partitions.append(partition_name)
+
+        removed_partitions = []
+        retention_limit = today - timedelta(days=partition["retention_days"])
+        for partition_name in self.__get_partitions(table_name):
+            try:
+                start = datetime.strptime(
+                    partition_name.rsplit("_p", 1)[-1], PARTITION_DATE_FORMAT
+                ).replace(tzinfo=timezone.utc)
+            except ValueError:
+                # Not a daily partition managed here
+                continue
+
+            if start + timedelta(days=1) <= retention_limit:
+                if partition["retention_action"] == "detach":
+                    self.__cursor.execute(f"ALTER TABLE {table_name} DETACH PARTITION {partition_name};")
+                else:
+                    self.__cursor.execute(f"DROP TABLE {partition_name};")
+                removed_partitions.append(partition_name)
+        if partition["retention_action"] != "detach":
+            self.__cursor.execute(
+                f"DELETE FROM {default_partition} WHERE {partition['field']} < %s;", (retention_limit,)
+            )
+
+        return {"created": created_partitions, "removed": removed_partitions}
+
+    def __get_index_validity(self, index_name: str):
+        """Returns whether an index is valid, or None if it does not exist."""
+        self.__cursor.execute(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (index_name,)
+        )
+        index = self.__cursor.fetchone()
+
+        return index[0] if index is not None else None
+
+    def __has_attached_index(self, partition_name: str, index_name: str) -> bool:
+        """Returns whether an index of a partition is attached to an index of its partitioned table."""
+        self.__cursor.execute(
+            """
+            SELECT EXISTS (
+                SELECT 1
+                FROM pg_inherits
+                JOIN pg_index ON pg_index.indexrelid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass(%s) AND pg_index.indrelid = to_regclass(%s)
+            )
+            """,
+            (index_name, partition_name)
+        )
+
+        return self.__cursor.fetchone()[0]
+
+    def __create_table_indexes(self, table_name: str, concurrently: bool) -> list:
+        """Creates the indexes of a table defined in INDEXES, if they do not already exist.
+
+        Indexes cannot be built concurrently on a partitioned table: the index is then created on the
+        parent table only, built concurrently on each partition and attached partition by partition.
+        """
+        created_indexes = []
+        is_partitioned = self.__is_partitioned(table_name)
+        for index_key, index in INDEXES.get(table_name, {}).items():
+            index_name = f"{table_name}_{index_key}"
+            definition = f"({', '.join(index['fields'])})" + (f" WHERE {index['where']}" if index.get("where") else "")
+            unique = "UNIQUE " if index.get("unique") else ""
+
+            if not concurrently:
+                self.__cursor.execute(f"CREATE {unique}INDEX IF NOT EXISTS {index_name} ON {table_name} {definition};")
+            elif is_partitioned:
+                self.__cursor.execute(
+                    f"CREATE {unique}INDEX IF NOT EXISTS {index_name} ON ONLY {table_name} {definition};"
+                )
+                for partition_name in self.__get_partitions(table_name):
+                    if self.__has_attached_index(partition_name, index_name):
+                        # Partitions created after the index got theirs with the partition
+                        continue
+                    partition_index_name = f"{partition_name}_{index_key}"
+                    if self.__get_index_validity(partition_index_name) is False:
+                        self.__cursor.execute(f"DROP INDEX CONCURRENTLY {partition_index_name};")
+                    self.__cursor.execute(
+                        f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {partition_index_name} "
+                        f"ON {partition_name} {definition};"
+                    )
+                    self.__cursor.execute(
+                        "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s))",
+                        (partition_index_name,)
+                    )
+                    if not self.__cursor.fetchone()[0]:
+                        self.__cursor.execute(f"ALTER INDEX {index_name} ATTACH PARTITION {partition_index_name};")
+            else:
+                # A failed concurrent build leaves an invalid index behind, which must be rebuilt
+                if self.__get_index_validity(index_name) is False:
+                    self.__cursor.execute(f"DROP INDEX CONCURRENTLY {index_name};")
+                self.__cursor.execute(
+                    f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table_name} {definition};"
+                )
+            created_indexes.append(index_name)
+
+        return created_indexes
+
+    def create_indexes(self, concurrently: bool = False) -> dict:
+        """Creates the indexes defined in INDEXES for all tables, if they do not already exist.
+
+        Args:
+            concurrently (bool): Whether indexes are built without locking the tables against writes,
+                to be used on databases already in use. Defaults to False.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the indexes of each table.
+        """
+        autocommit = self.__connection.autocommit
+        try:
+            if concurrently:
+                # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+                self.__connection.commit()
+                self.__connection.autocommit = True
+            indexes = {
+                table_name: self.__create_table_indexes(table_name, concurrently)
+                for table_name in self.authorized_tables
+            }
+            self.__connection.commit()
+            result = {
+                "status": "success",
+                "message": "Indexes successfully created.",
+                "indexes": indexes
+            }
+        except Exception as e:
+            self.__connection.rollback()
+            result = {
+                "status": "error",
+                "message": f"Error occurred during indexes creation: {str(e)}"
+            }
+        finally:
+            self.__connection.autocommit = autocommit
+
+        return result
+
+    def maintain_partitions(self, reference_date: datetime = None) -> dict:
+        """Creates the upcoming partitions and applies the retention window of all partitioned tables.
+
+        Tables defined in PARTITIONS but created without partitioning are left untouched.
+
+        Args:
+            reference_date (datetime, optional): Date of the maintenance. Defaults to now.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the partitions created
+                or removed for each table.
+        """
+        reference_date = reference_date or datetime.now(timezone.utc)
+        try:
+            partitions = {
+                table_name: self.__maintain_table_partitions(table_name, reference_date)
+                for table_name in PARTITIONS
+                if table_name in self.authorized_tables and self.__is_partitioned(table_name)
+            }
+            self.__connection.commit()
+            result = {
+                "status": "success",
+                "message": "Partitions successfully maintained.",
+                "partitions": partitions
+            }
+        except Exception as e:
+            self.__connection.rollback()
+            result = {
+                "status": "error",
+                "message": f"Error occurred during partitions maintenance: {str(e)}"
+            }
+
+        return result
+
+    def process(self, concurrently: bool = False):
+        """Initializes the database and creates all tables and indexes needed.
+
+        Args:
+            concurrently (bool): Whether indexes are built concurrently, for databases already in use.
+                Defaults to False.
 
         Returns:
             dict: A dictionary containing the response status and message.
@@ -46,7 +348,19 @@ class ExaltCreateHandler:
         """
         try:
             [self.__create_table(table_name) for table_name in self.authorized_tables]
+            [self.__sync_columns(table_name) for table_name in self.authorized_tables]
             self.__connection.commit()
+            steps = [
+                self.maintain_partitions,
+                lambda: self.create_indexes(concurrently),
+                ExaltAggregateHandler(self.__connection, self.__cursor).create_triggers
+            ]
+            if self.__indicator_views:
+                steps.append(ExaltViewHandler(self.__connection, self.__cursor).create_views)
+            for step in steps:
+                step = step()
+                if step["status"] != "success":
+                    raise Exception(step["message"])
             result = {
                 "status": "success",
                 "message": "Database successfully initialized.",
@@ -58,7 +372,6 @@ class ExaltCreateHandler:
                 "message": f"Error occurred during database initialization: {str(e)}"
             }
 
-        self.__cursor.close()
-        self.__connection.close()
+        self.close()
 
         return result
@@ -0,0 +1,59 @@
+import psycopg2
+from psycopg2 import sql
+
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.utilities.processing_functions import process_filters
+from lib.utilities.exceptions import DeleteException
+
+
+class ExaltDeleteHandler:
+    def __init__(
+            self,
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
+    ) -> None:
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
+
+    def process(self, table_name: str, filters: dict) -> dict:
+        """
+        Delete the records matching the filters from the specified table
+
+        Args:
+            table_name (str): The name of the table to be used.
+            filters (dict): A dictionary containing filters selecting the records to delete.
+                Filters are mandatory, a table is never emptied by this method.
+
+        Returns:
+            dict: A dictionary containing the response status, message and number of deleted records.
+
+        Raises:
+            DeleteException: If an error occurs while deleting records from the database.
+        """
+        if not filters:
+            raise DeleteException("No filter is provided")
+
+        try:
+            where_clause, filters_params = process_filters(filters)
+            self.__cursor.execute(
+                sql.SQL("DELETE FROM {} {}").format(sql.Identifier(table_name), where_clause),
+                filters_params
+            )
+            nb_data = self.__cursor.rowcount
+            self.__connection.commit()
+
+            return {
+                "status": "success",
+                "message": f"Records successfully deleted from {table_name}.",
+                "nb_data": nb_data
+            }
+
+        except Exception as e:
+            self.__connection.rollback()
+            raise DeleteException(f"An error occurred while deleting data from the table {table_name}: {str(e)}")
@@ -1,8 +1,10 @@
-import pandas as pd
+import uuid
+
 import psycopg2
 
-from lib.db_toolkits.exalt_handler import ADMIN_CONNEXION, INTERNAL_FIELDS
-from lib.db_toolkits.utilities.processing_functions import process_filters, process_fields
+from lib.db_toolkits.exalt_handler import ADMIN_POOL, INTERNAL_FIELDS, GET_ITERSIZE, COPY_TO_CHUNK_SIZE
+from lib.db_toolkits.utilities.query_builder import filter_shape, compile_select, compile_filters, table_identifier, \
+    execute
 
 DEC2FLOAT = psycopg2.extensions.new_type(
     psycopg2.extensions.DECIMAL.values,
@@ -15,11 +17,17 @@ psycopg2.extensions.register_type(DEC2FLOAT)
 class ExaltGetHandler:
     def __init__(
             self,
-            connection: psycopg2.extensions.connection = ADMIN_CONNEXION,
-            cursor: psycopg2.extensions.cursor = ADMIN_CONNEXION.cursor()
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
     ) -> None:
-        self.__connection: psycopg2.extensions.connection = connection
-        self.__cursor: psycopg2.extensions.cursor = cursor
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
 
     def get_properties(self, table_name: str, fields: list = None, filters: dict = None) -> list:
         """Retrieves properties (field values) from the database.
@@ -39,14 +47,150 @@ class ExaltGetHandler:
 
         """
 
-        filters, filters_params = ("", []) if not filters else process_filters(filters)
-        processed_fields = process_fields(fields)
+        shape, filters_params = filter_shape(filters)
+        query = compile_select(table_name, tuple(fields) if fields else None, shape)
+
+        execute(self.__cursor, query, filters_params)
+        columns = [col.name for col in self.__cursor.description]
+
+        return [dict(zip(columns, row)) for row in self.__cursor.fetchall()]
+
+    def iter_properties(
+            self,
+            table_name: str,
+            fields: list = None,
+            filters: dict = None,
+            itersize: int = GET_ITERSIZE,
+            batch_size: int = None
+    ):
+        """Streams properties (field values) from the database with a server-side cursor.
+
+        Rows are transferred `itersize` at a time, so only a bounded part of the result is held in
+        memory whatever the size of the table. The cursor lives in the current transaction of the
+        connection (or is held across transactions in autocommit mode) until the iteration ends.
+
+        Args:
+            table_name (str): The name of the Postgres table to query.
+            fields (list, optional): A list of specific fields to retrieve. If None, all
+                fields will be returned. Defaults to None.
+            filters (dict, optional): A dictionary containing filters to apply to the query.
+            itersize (int): Number of rows fetched from the server at once. Defaults to GET_ITERSIZE.
+            batch_size (int, optional): If given, lists of `batch_size` rows (the last one possibly
+                shorter) are yielded instead of single rows, whatever the number of rows fetched at
+                once. Defaults to None.
+
+        Yields:
+            dict | list: A dictionary per row, or a list of dictionaries per batch.
+
+        Raises:
+            Exception: If there is an error during the database operation.
+        """
+        shape, filters_params = filter_shape(filters)
+        query = compile_select(table_name, tuple(fields) if fields else None, shape)
+
+        cursor = self.__connection.cursor(
+            name=f"exalt_get_{uuid.uuid4().hex}", withhold=self.__connection.autocommit
+        )
+        try:
+            cursor.itersize = itersize
+            execute(cursor, query, filters_params)
+            rows = cursor.fetchmany(itersize)
+            # The description of a server-side cursor is only known once rows have been fetched
+            columns = [col.name for col in cursor.description]
+            batch = []
+            while rows:
+                if batch_size:
+                    # The fetched rows are split into batches, the rest waiting for the next fetch
+                    batch += [dict(zip(columns, row)) for row in rows]
+                    while len(batch) >= batch_size:
+                        yield batch[:batch_size]
+                        del batch[:batch_size]
+                else:
+                    for row in rows:
+                        yield dict(zip(columns, row))
+                rows = cursor.fetchmany(itersize)
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
 
-        self.__cursor.execute(f"""SELECT {processed_fields} FROM {table_name} {filters}""", filters_params)
+    def get_columns(
+            self,
+            table_name: str,
+            fields: list = None,
+            filters: dict = None,
+            as_frame: bool = False,
+            chunk_size: int = COPY_TO_CHUNK_SIZE
+    ):
+        """Retrieves properties (field values) from the database as columns rather than rows.
 
-        return pd.DataFrame(
-            self.__cursor.fetchall(), columns=[col.name for col in self.__cursor.description]
-        ).to_dict("records")
+        The rows are streamed with a COPY TO and decoded chunk by chunk into one contiguous numpy array
+        per field, without building a Python object per row. Selections of fixed-width fields (numbers,
+        booleans, dates) are streamed in the binary format and decoded without any loop over the rows;
+        text fields require the text format, split with bytes methods. NUMERIC fields are read as
+        float64 and fields of other types (JSONB...) as strings.
+
+        Args:
+            table_name (str): The name of the Postgres table to query.
+            fields (list, optional): A list of specific fields to retrieve. If None, all
+                fields will be returned. Defaults to None.
+            filters (dict, optional): A dictionary containing filters to apply to the query.
+            as_frame (bool): Whether a pandas DataFrame is returned instead of arrays. Defaults to False.
+            chunk_size (int): Size of the stream decoded at once, in bytes. Defaults to COPY_TO_CHUNK_SIZE.
+
+        Returns:
+            dict | pandas.DataFrame: For each field, a numpy array. Fields holding NULL values are
+                masked arrays, except for floats (NaN) and datetimes (NaT). With `as_frame`, a
+                DataFrame with nullable integer and boolean columns.
+
+        Raises:
+            Exception: If there is an error during the database operation.
+        """
+        # numpy is only loaded with the columnar reads
+        import numpy as np
+        from lib.db_toolkits.utilities.columnar_copy import BinaryCopyReader, TextCopyReader, TIMESTAMPTZ_TYPE, \
+            copy_query, is_binary
+
+        shape, filters_params = filter_shape(filters)
+        execute(
+            self.__cursor, compile_select(table_name, tuple(fields) if fields else None, shape, limit=True),
+            filters_params + [0]
+        )
+        columns = [(col.name, col.type_code) for col in self.__cursor.description]
+        type_codes = [type_code for _, type_code in columns]
+
+        query = copy_query(table_identifier(table_name), columns, compile_filters(shape))
+        # COPY does not take parameters: the filter values are bound on the client side
+        query = self.__cursor.mogrify(query, filters_params).decode()
+        reader = (BinaryCopyReader if is_binary(type_codes) else TextCopyReader)(type_codes, chunk_size)
+        self.__cursor.copy_expert(query, reader)
+
+        results = {}
+        for (name, _), (values, mask) in zip(columns, reader.columns()):
+            if mask.any():
+                if values.dtype.kind == "f":
+                    values[mask] = np.nan
+                elif values.dtype.kind == "M":
+                    values[mask] = np.datetime64("NaT")
+                elif values.dtype.kind != "O":
+                    values = np.ma.MaskedArray(values, mask)
+            results[name] = values
+
+        if not as_frame:
+            return results
+
+        import pandas as pd
+
+        frame = {}
+        for (name, type_code), values in zip(columns, results.values()):
+            if isinstance(values, np.ma.MaskedArray):
+                values = pd.array(values.filled(0), dtype="boolean" if values.dtype.kind == "b" else "Int64")
+                values[results[name].mask] = pd.NA
+            elif type_code == TIMESTAMPTZ_TYPE:
+                values = pd.DatetimeIndex(values).tz_localize("UTC")
+            frame[name] = values
+
+        return pd.DataFrame(frame)
 
     def get_mapping(self, table_name: str) -> dict:
         """Get the mapping of column names to data types for a given table.
@@ -82,12 +226,11 @@ class ExaltGetHandler:
             dict: dict containing data
         """
         indicator_result = {}
-        query = f"""
-        SELECT result 
-        FROM indicator WHERE name = '{indicator_name}' 
-        ORDER BY computation_timestamp DESC LIMIT 1
-        """
-        self.__cursor.execute(query)
+        query = compile_select(
+            "indicator", ("result",), (("name", "eq"),), (("computation_timestamp", "DESC"),), limit=True
+        )
+        # Looked up on every API call: planned once per connection
+        execute(self.__cursor, query, [indicator_name, 1], prepare=True)
         indicator = self.__cursor.fetchone()
         if indicator is not None:
             indicator_result = indicator[0]
@@ -104,8 +247,8 @@ class ExaltGetHandler:
             dict: dict containing data
         """
         last_data = {}
-        query = f"SELECT * FROM {table_name} ORDER BY {timestamp_field} DESC LIMIT 1"
-        self.__cursor.execute(query)
+        query = compile_select(table_name, order_by=((timestamp_field, "DESC"),), limit=True)
+        execute(self.__cursor, query, [1])
         data = self.__cursor.fetchone()
         if data is not None:
             fields = [desc[0] for desc in self.__cursor.description]
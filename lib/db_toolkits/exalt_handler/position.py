@@ -0,0 +1,166 @@
+import math
+
+import psycopg2
+
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.exalt_handler.add import ExaltAddHandler
+from lib.db_toolkits.exalt_handler.get import ExaltGetHandler
+from lib.db_toolkits.utilities.position_grid import EARTH_RADIUS_KM, bbox_cells, haversine_km, radius_bbox
+from lib.db_toolkits.utilities.table_mappings import POSITION_GRID_DEGREES
+
+POSITION_TABLE = "flight_position"
+ZONE_TABLE = "zone"
+# Radius of the first search of the nearest aircraft, doubled until enough aircraft are found
+NEAREST_START_RADIUS_KM = 200
+# Half of the circumference of the Earth: every position is within this distance
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+# Boxes intersecting more cells are read without the grid index, most of the table being read anyway
+MAX_INDEX_CELLS = 5000
+
+
+class ExaltPositionHandler:
+    def __init__(
+            self,
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
+    ) -> None:
+        """Queries the positions of the live aircraft (flight_position table) through their grid cell index.
+
+        A bounding box is read as the cells of the uniform grid (see POSITION_GRID_DEGREES) it
+        intersects, found with the index on `grid_cell`, the positions of the cells being then
+        filtered on their coordinates.
+
+        Args:
+            connection (psycopg2.extensions.connection, optional): Defaults to a connection checked out
+                from the pool until the handler is closed.
+            cursor (psycopg2.extensions.cursor, optional): Defaults to a new cursor of the connection.
+        """
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
+        self.__exalt_add = ExaltAddHandler(self.__connection, self.__cursor)
+        self.__exalt_get = ExaltGetHandler(self.__connection, self.__cursor)
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
+
+    def __get_bbox(self, south: float, west: float, north: float, east: float, fields: list = None) -> list:
+        if west > east:
+            # A box crossing the antimeridian is read as its western and eastern parts
+            return self.__get_bbox(south, west, north, 180, fields) + self.__get_bbox(south, -180, north, east, fields)
+
+        filters = {
+            "latitude": {"gte": south, "lte": north},
+            "longitude": {"gte": west, "lte": east}
+        }
+        cells = bbox_cells(south, west, north, east, POSITION_GRID_DEGREES)
+        if len(cells) <= MAX_INDEX_CELLS:
+            filters["grid_cell"] = {"in": cells}
+
+        return self.__exalt_get.get_properties(POSITION_TABLE, fields, filters)
+
+    def get_positions(self, south: float, west: float, north: float, east: float, fields: list = None) -> list:
+        """Retrieves the positions of the live aircraft within a bounding box.
+
+        Args:
+            south (float): The southern latitude of the box.
+            west (float): The western longitude of the box, greater than the eastern longitude for a
+                box crossing the antimeridian.
+            north (float): The northern latitude of the box.
+            east (float): The eastern longitude of the box.
+            fields (list, optional): The fields of the positions. Defaults to None, all the fields.
+
+        Returns:
+            list: The positions, as dictionaries.
+        """
+        positions = self.__get_bbox(south, west, north, east, fields)
+        self.__connection.commit()
+
+        return positions
+
+    def get_zone_positions(self, zone: str, fields: list = None) -> list:
+        """Retrieves the positions of the live aircraft within a zone of the zone table.
+
+        Args:
+            zone (str): The name of the zone (e.g. "europe").
+            fields (list, optional): The fields of the positions. Defaults to None, all the fields.
+
+        Returns:
+            list: The positions, as dictionaries, None if the zone does not exist.
+        """
+        zones = self.__exalt_get.get_properties(ZONE_TABLE, ["tl_y", "tl_x", "br_y", "br_x"], {"name": {"eq": zone}})
+        if not zones:
+            self.__connection.commit()
+            return None
+
+        # The top left corner of a zone is its north-west corner
+        bounds = {field: float(value) for field, value in zones[0].items()}
+
+        return self.get_positions(bounds["br_y"], bounds["tl_x"], bounds["tl_y"], bounds["br_x"], fields)
+
+    def get_nearest(
+            self,
+            latitude: float,
+            longitude: float,
+            nb_positions: int = 10,
+            max_distance_km: float = None,
+            fields: list = None
+    ) -> list:
+        """Retrieves the positions of the live aircraft nearest to a point.
+
+        The positions are read within the bounding box of a radius around the point, doubled until
+        `nb_positions` positions lie within the radius itself: the positions of the box beyond the
+        radius are left out, a position outside the box may be closer than them.
+
+        Args:
+            latitude (float): The latitude of the point.
+            longitude (float): The longitude of the point.
+            nb_positions (int): The number of positions. Defaults to 10.
+            max_distance_km (float, optional): The maximum distance of a position from the point.
+                Defaults to None, no limit.
+            fields (list, optional): The fields of the positions. Defaults to None, all the fields.
+
+        Returns:
+            list: The positions by increasing distance, with their "distance_km" from the point.
+        """
+        max_distance_km = MAX_DISTANCE_KM if max_distance_km is None else min(max_distance_km, MAX_DISTANCE_KM)
+        if fields:
+            fields = list(dict.fromkeys([*fields, "latitude", "longitude"]))
+        radius_km = min(NEAREST_START_RADIUS_KM, max_distance_km)
+        while True:
+            positions = self.__get_bbox(*radius_bbox(latitude, longitude, radius_km), fields)
+            for position in positions:
+                position["distance_km"] = haversine_km(latitude, longitude, position["latitude"], position["longitude"])
+            positions = sorted(
+                [position for position in positions if position["distance_km"] <= radius_km],
+                key=lambda position: (position["distance_km"], position.get("flight_id") or "")
+            )
+            if len(positions) >= nb_positions or radius_km >= max_distance_km:
+                self.__connection.commit()
+                return positions[:nb_positions]
+
+            radius_km = min(2 * radius_km, max_distance_km)
+
+    def add_zones(self, zones: dict) -> dict:
+        """Stores zones (bounding boxes of regions) in the zone table, as returned by FlightRadar24API.get_zones.
+
+        Args:
+            zones (dict): The zones by name, with their "tl_y", "tl_x", "br_y" and "br_x" bounds. The
+                sub zones of a zone are not stored.
+
+        Returns:
+            dict: A dictionary containing the response status, message and number of stored zones.
+        """
+        data = [
+            {"name": name, **{field: zone[field] for field in ["tl_y", "tl_x", "br_y", "br_x"]}}
+            for name, zone in zones.items()
+        ]
+        self.__exalt_add.upsert(table_name=ZONE_TABLE, data=data, conflict_fields=["name"])
+
+        return {
+            "status": "success",
+            "message": "Zones successfully stored.",
+            "nb_data": len(data)
+        }
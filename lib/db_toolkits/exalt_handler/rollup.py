@@ -0,0 +1,294 @@
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.exalt_handler.add import ExaltAddHandler
+from lib.db_toolkits.exalt_handler.delete import ExaltDeleteHandler
+from lib.db_toolkits.exalt_handler.get import ExaltGetHandler
+from lib.db_toolkits.utilities.table_mappings import ROLLUP_TIERS
+
+RAW_TABLE = "indicator"
+ROLLUP_TABLE = "indicator_rollup"
+# The finest tier, the results of the indicator table
+RAW_TIER = next(iter(ROLLUP_TIERS))
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def numeric_fields(value):
+    """Numeric fields of a result: its JSON structure holding only its numbers, None without any number."""
+    if _is_number(value):
+        return value
+    if isinstance(value, dict):
+        fields = {key: numeric_fields(item) for key, item in value.items()}
+        fields = {key: item for key, item in fields.items() if item is not None}
+        return fields or None
+    if isinstance(value, list):
+        # List items keep their position
+        fields = [numeric_fields(item) for item in value]
+        return fields if any(item is not None for item in fields) else None
+
+    return None
+
+
+def merge_numeric_fields(value, other, pick):
+    """Merges the numeric fields of two results (see `numeric_fields`) field by field.
+
+    Args:
+        value: Numeric fields of a result.
+        other: Numeric fields of the other result.
+        pick (callable): Picks the merged value of two numbers, `min` or `max`.
+
+    Returns:
+        The merged numeric fields, with the fields of both results.
+    """
+    if value is None:
+        return other
+    if other is None:
+        return value
+    if _is_number(value) and _is_number(other):
+        return pick(value, other)
+    if isinstance(value, dict) and isinstance(other, dict):
+        return {key: merge_numeric_fields(value.get(key), other.get(key), pick) for key in {**value, **other}}
+    if isinstance(value, list) and isinstance(other, list):
+        return [
+            merge_numeric_fields(
+                value[index] if index < len(value) else None, other[index] if index < len(other) else None, pick
+            )
+            for index in range(max(len(value), len(other)))
+        ]
+
+    # A field whose shape changed keeps the shape of the other result
+    return other
+
+
+def _bucket(date: datetime, seconds: int) -> datetime:
+    """Start of the bucket of `seconds` containing a date, buckets being aligned on the Unix epoch."""
+    return datetime.fromtimestamp(date.timestamp() // seconds * seconds, timezone.utc)
+
+
+class ExaltRollupHandler:
+    def __init__(
+            self,
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
+    ) -> None:
+        """Compacts the history of the indicators into the rollup tiers of ROLLUP_TIERS.
+
+        Each tier holds, per indicator and bucket, the last result of the bucket and the minimum and
+        maximum of its numeric fields, built from the previous tier, then the results older than
+        the retention of their tier are removed.
+
+        Args:
+            connection (psycopg2.extensions.connection, optional): Defaults to a connection checked out
+                from the pool until the handler is closed.
+            cursor (psycopg2.extensions.cursor, optional): Defaults to a new cursor of the connection.
+        """
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
+        self.__exalt_add = ExaltAddHandler(self.__connection, self.__cursor)
+        self.__exalt_delete = ExaltDeleteHandler(self.__connection, self.__cursor)
+        self.__exalt_get = ExaltGetHandler(self.__connection, self.__cursor)
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
+
+    def __iter_tier(self, tier: str, filters: dict):
+        """Streams the results of a tier as rollups, a raw result being the rollup of itself.
+
+        Args:
+            tier (str): The tier, see ROLLUP_TIERS.
+            filters (dict): Filters of the results on "name" and "timestamp" (computation timestamp of a
+                raw result, bucket of a rollup).
+
+        Yields:
+            dict: The rollups, with their "timestamp".
+        """
+        if tier == RAW_TIER:
+            if "timestamp" in filters:
+                filters = {**filters, "computation_timestamp": filters["timestamp"]}
+                del filters["timestamp"]
+            fields = ["name", "computation_timestamp", "result"]
+            for result in self.__exalt_get.iter_properties(RAW_TABLE, fields, {**filters}):
+                numbers = numeric_fields(result["result"])
+                yield {
+                    "name": result["name"],
+                    "timestamp": result["computation_timestamp"],
+                    "result": result["result"],
+                    "minimum": numbers,
+                    "maximum": numbers,
+                    "nb_results": 1,
+                    "last_computation_timestamp": result["computation_timestamp"]
+                }
+        else:
+            if "timestamp" in filters:
+                filters = {**filters, "bucket": filters["timestamp"]}
+                del filters["timestamp"]
+            fields = ["name", "bucket", "result", "minimum", "maximum", "nb_results", "last_computation_timestamp"]
+            for rollup in self.__exalt_get.iter_properties(ROLLUP_TABLE, fields, {**filters, "tier": {"eq": tier}}):
+                rollup["timestamp"] = rollup.pop("bucket")
+                yield rollup
+
+    def __rollup_tier(self, tier: str, source_tier: str, reference_date: datetime) -> int:
+        """Compacts the results of the source tier into the buckets of a tier completed since its last rollup.
+
+        Returns:
+            int: The number of rollups written.
+        """
+        seconds = ROLLUP_TIERS[tier]["seconds"]
+        self.__cursor.execute(f"SELECT MAX(bucket) FROM {ROLLUP_TABLE} WHERE tier = %s", (tier,))
+        last_bucket = self.__cursor.fetchone()[0]
+        # Only the completed buckets are compacted, once
+        timestamp_filters = {"lt": _bucket(reference_date, seconds)}
+        if last_bucket is not None:
+            timestamp_filters["gte"] = last_bucket + timedelta(seconds=seconds)
+
+        rollups = {}
+        for source in self.__iter_tier(source_tier, {"timestamp": timestamp_filters}):
+            bucket = _bucket(source["timestamp"], seconds)
+            rollup = rollups.get((source["name"], bucket))
+            if rollup is None:
+                rollups[(source["name"], bucket)] = {
+                    "name": source["name"],
+                    "tier": tier,
+                    "bucket": bucket,
+                    **{field: source[field] for field in [
+                        "result", "minimum", "maximum", "nb_results", "last_computation_timestamp"
+                    ]}
+                }
+                continue
+
+            # The results are read in any order, the last one is the one computed last
+            if source["last_computation_timestamp"] > rollup["last_computation_timestamp"]:
+                rollup["result"] = source["result"]
+                rollup["last_computation_timestamp"] = source["last_computation_timestamp"]
+            rollup["minimum"] = merge_numeric_fields(rollup["minimum"], source["minimum"], min)
+            rollup["maximum"] = merge_numeric_fields(rollup["maximum"], source["maximum"], max)
+            rollup["nb_results"] += source["nb_results"]
+
+        if rollups:
+            self.__exalt_add.upsert(ROLLUP_TABLE, list(rollups.values()), ["name", "tier", "bucket"])
+
+        return len(rollups)
+
+    def __apply_retention(self, reference_date: datetime) -> dict:
+        """Removes the results older than the retention of their tier, once compacted into the next tier.
+
+        Returns:
+            dict: The number of results removed from each tier.
+        """
+        removed = {}
+        tiers = list(ROLLUP_TIERS)
+        for index, tier in enumerate(tiers):
+            retention_days = ROLLUP_TIERS[tier]["retention_days"]
+            if retention_days is None:
+                continue
+
+            limit = reference_date - timedelta(days=retention_days)
+            if index + 1 < len(tiers):
+                # The buckets of the next tier are compacted up to its last completed bucket
+                limit = min(limit, _bucket(reference_date, ROLLUP_TIERS[tiers[index + 1]]["seconds"]))
+            if tier == RAW_TIER:
+                result = self.__exalt_delete.process(RAW_TABLE, {"computation_timestamp": {"lt": limit}})
+            else:
+                result = self.__exalt_delete.process(ROLLUP_TABLE, {"tier": {"eq": tier}, "bucket": {"lt": limit}})
+            removed[tier] = result["nb_data"]
+
+        return removed
+
+    def process(self, reference_date: datetime = None) -> dict:
+        """Compacts the completed buckets of each rollup tier, then applies the retention of each tier.
+
+        Args:
+            reference_date (datetime, optional): Date of the rollup. Defaults to now.
+
+        Returns:
+            dict: A dictionary containing the response status, message, the number of rollups written
+                and of results removed in each tier.
+        """
+        reference_date = reference_date or datetime.now(timezone.utc)
+        try:
+            tiers = list(ROLLUP_TIERS)
+            rollups = {
+                tier: self.__rollup_tier(tier, source_tier, reference_date)
+                for source_tier, tier in zip(tiers, tiers[1:])
+            }
+            removed = self.__apply_retention(reference_date)
+
+            return {
+                "status": "success",
+                "message": "Indicator history successfully rolled up.",
+                "rollups": rollups,
+                "removed": removed
+            }
+
+        except Exception as e:
+            self.__connection.rollback()
+            return {
+                "status": "error",
+                "message": f"Error occurred during indicator history rollup: {str(e)}"
+            }
+
+    def get_history(self, name: str, start: datetime, end: datetime = None, resolution: int = None) -> dict:
+        """Retrieves the history of an indicator from the coarsest tier satisfying a time range and resolution.
+
+        The tier is the coarsest one whose buckets are not larger than the resolution and whose
+        retention still covers the start of the range (the finest tier covering it if none does).
+        The end of the range not compacted yet into this tier is read from the finer tiers.
+
+        Args:
+            name (str): The name of the indicator.
+            start (datetime): The start of the range.
+            end (datetime, optional): The end of the range, excluded. Defaults to now.
+            resolution (int, optional): The largest acceptable interval between two results, in seconds.
+                Defaults to None, every result.
+
+        Returns:
+            dict: A dictionary containing the response status, the tier and the history: the rollups
+                of the range by increasing timestamp (start of their bucket, or computation timestamp
+                of a raw result), each with the last result, the minimum and maximum of its numeric
+                fields and the number of results compacted.
+        """
+        reference_date = datetime.now(timezone.utc)
+        end = end or reference_date
+        tiers = list(ROLLUP_TIERS)
+
+        def covers(tier: str) -> bool:
+            retention_days = ROLLUP_TIERS[tier]["retention_days"]
+            return retention_days is None or start >= reference_date - timedelta(days=retention_days)
+
+        def fine_enough(tier: str) -> bool:
+            seconds = ROLLUP_TIERS[tier]["seconds"]
+            return seconds is None or (resolution is not None and seconds <= resolution)
+
+        tier = next(
+            (tier for tier in reversed(tiers) if fine_enough(tier) and covers(tier)),
+            next((tier for tier in tiers if covers(tier)), tiers[-1])
+        )
+
+        history = []
+        since = start
+        for history_tier in reversed(tiers[:tiers.index(tier) + 1]):
+            rollups = sorted(
+                self.__iter_tier(history_tier, {"name": {"eq": name}, "timestamp": {"gte": since, "lt": end}}),
+                key=lambda rollup: rollup["timestamp"]
+            )
+            for rollup in rollups:
+                del rollup["name"]
+                history.append({"tier": history_tier, **rollup})
+            if rollups and ROLLUP_TIERS[history_tier]["seconds"]:
+                # The finer tiers only cover the end of the range, after the last bucket read
+                since = rollups[-1]["timestamp"] + timedelta(seconds=ROLLUP_TIERS[history_tier]["seconds"])
+        self.__connection.commit()
+
+        return {
+            "status": "success",
+            "tier": tier,
+            "history": history
+        }
@@ -0,0 +1,157 @@
+import json
+from collections import Counter
+from datetime import datetime, timezone
+
+import psycopg2
+
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.db_toolkits.utilities.space_saving import SpaceSaving
+from lib.db_toolkits.utilities.table_mappings import FLIGHT_SKETCHES
+
+SKETCH_TABLE = "flight_sketch"
+
+
+def sketch_bucket(date: datetime) -> datetime:
+    """Bucket of the summaries of a date: its day, starting at midnight UTC."""
+    return date.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def update_sketches(sketches: dict, records: list) -> dict:
+    """Counts flight records in the summaries of FLIGHT_SKETCHES.
+
+    Args:
+        sketches (dict): The summaries by (name, key) pair, the key being the tuple of the values of the
+            "per" fields, updated in place.
+        records (list): The flight records.
+
+    Returns:
+        dict: The summaries.
+    """
+    for name, sketch in FLIGHT_SKETCHES.items():
+        # The records are counted once per distinct value rather than one by one
+        counts = Counter(
+            (tuple(record.get(field) for field in sketch.get("per", [])), record.get(sketch["item"]))
+            for record in records
+            if all(record.get(field) is not None for field in sketch.get("not_null", []))
+        )
+        for (key, item), count in counts.items():
+            if (name, key) not in sketches:
+                sketches[(name, key)] = SpaceSaving(sketch["capacity"])
+            sketches[(name, key)].update(item, count)
+
+    return sketches
+
+
+class ExaltSketchHandler:
+    def __init__(
+            self,
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
+    ) -> None:
+        """Stores the Space-Saving summaries of the flights in the flight_sketch table, one per day bucket.
+
+        The summaries of an upload are merged into the ones of their bucket, and the summaries of
+        several buckets merged into the summary of a time window, see SpaceSaving.
+
+        Args:
+            connection (psycopg2.extensions.connection, optional): Defaults to a connection checked out
+                from the pool until the handler is closed.
+            cursor (psycopg2.extensions.cursor, optional): Defaults to a new cursor of the connection.
+        """
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
+
+    def add(self, bucket: datetime, sketches: dict, commit: bool = True) -> dict:
+        """Merges summaries into the stored summaries of a bucket.
+
+        Args:
+            bucket (datetime): The bucket of the summaries, see `sketch_bucket`.
+            sketches (dict): The summaries by (name, key) pair, see `update_sketches`.
+            commit (bool): Whether the summaries are committed, False to commit them with the other
+                writes of the transaction, which is rolled back on error. Defaults to True.
+
+        Returns:
+            dict: A dictionary containing the response status, message and number of stored summaries.
+        """
+        if not sketches:
+            return {"status": "success", "message": "No flight sketch to store.", "nb_data": 0}
+
+        try:
+            # Summaries are merged one upload after another, reads are not blocked
+            self.__cursor.execute(f"LOCK TABLE {SKETCH_TABLE} IN SHARE ROW EXCLUSIVE MODE;")
+            self.__cursor.execute(
+                f"SELECT name, key, sketch FROM {SKETCH_TABLE} WHERE bucket = %s AND name = ANY(%s)",
+                (bucket, list({name for name, _ in sketches}))
+            )
+            stored_sketches = {
+                (name, tuple(key)): SpaceSaving.from_dict(sketch) for name, key, sketch in self.__cursor.fetchall()
+            }
+
+            names, keys, states = [], [], []
+            for (name, key), sketch in sketches.items():
+                stored_sketch = stored_sketches.get((name, key))
+                sketch = sketch if stored_sketch is None else stored_sketch.merge(sketch)
+                names.append(name)
+                keys.append(json.dumps(list(key)))
+                states.append(json.dumps(sketch.to_dict()))
+
+            self.__cursor.execute(
+                f"""
+                INSERT INTO {SKETCH_TABLE} (bucket, name, key, sketch)
+                SELECT %s, name, key, sketch
+                FROM unnest(%s::varchar[], %s::jsonb[], %s::jsonb[]) AS sketches(name, key, sketch)
+                ON CONFLICT (name, bucket, key) DO UPDATE SET sketch = EXCLUDED.sketch, latest_update = NOW()
+                """,
+                (bucket, names, keys, states)
+            )
+            nb_data = self.__cursor.rowcount
+            if commit:
+                self.__connection.commit()
+
+            return {
+                "status": "success",
+                "message": "Flight sketches successfully stored.",
+                "nb_data": nb_data
+            }
+
+        except Exception as e:
+            self.__connection.rollback()
+            return {
+                "status": "error",
+                "message": f"Error occurred during flight sketches storage: {str(e)}"
+            }
+
+    def get_sketches(self, name: str, start: datetime, end: datetime = None) -> dict:
+        """Merges the stored summaries of the buckets of a time window.
+
+        Args:
+            name (str): The name of the summaries, see FLIGHT_SKETCHES.
+            start (datetime): The first bucket of the window.
+            end (datetime, optional): The bucket following the window. Defaults to none, the window
+                ending with the last bucket.
+
+        Returns:
+            dict: The summaries of the window by key, the tuple of the values of the "per" fields.
+        """
+        self.__cursor.execute(
+            f"""
+            SELECT key, sketch
+            FROM {SKETCH_TABLE}
+            WHERE name = %s AND bucket >= %s AND (%s::timestamptz IS NULL OR bucket < %s::timestamptz)
+            ORDER BY bucket
+            """,
+            (name, start, end, end)
+        )
+        sketches = {}
+        for key, state in self.__cursor.fetchall():
+            key = tuple(key)
+            sketch = SpaceSaving.from_dict(state)
+            sketches[key] = sketch if key not in sketches else sketches[key].merge(sketch)
+
+        return sketches
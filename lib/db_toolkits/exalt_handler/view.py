@@ -0,0 +1,168 @@
+import psycopg2
+from psycopg2 import sql
+
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
+from lib.indicators.queries import INDICATOR_QUERIES, LIVE_FLIGHTS_QUERY
+
+# Last refresh of each view, see INDICATOR_VIEW_MAPPING
+REFRESH_TABLE = "indicator_view"
+
+
+def view_name(indicator: str) -> str:
+    """Name of the materialized view of an indicator."""
+    return f"{indicator}_view"
+
+
+def _view_query(indicator: str) -> sql.Composed:
+    """Builds the query of the materialized view of an indicator, its rows numbered in the order of the query.
+
+    The row number is the key of the view: REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index
+    on columns of all the rows, and the rows of an indicator have no other non-NULL key.
+    """
+    live_flights = sql.SQL("({})").format(LIVE_FLIGHTS_QUERY)
+    query = sql.SQL(INDICATOR_QUERIES[indicator]["query"].strip().rstrip(";")).format(
+        live_flights=live_flights, indexed_live_flights=live_flights
+    )
+
+    return sql.SQL("SELECT ROW_NUMBER() OVER () AS row_number, indicator.* FROM ({}) indicator").format(query)
+
+
+class ExaltViewHandler:
+    def __init__(
+            self,
+            connection: psycopg2.extensions.connection = None,
+            cursor: psycopg2.extensions.cursor = None
+    ) -> None:
+        """Maintains a materialized view of each indicator, holding its rows computed from the live flights.
+
+        The views are refreshed concurrently: the indicators keep being read from them during a refresh.
+        The time of the last refresh of each view is stored in the indicator_view table.
+        Parameterized indicators hold the rows of the default parameters of their query, see
+        INDICATOR_QUERIES.
+
+        Args:
+            connection (psycopg2.extensions.connection, optional): Defaults to a connection checked out
+                from the pool until the handler is closed.
+            cursor (psycopg2.extensions.cursor, optional): Defaults to a new cursor of the connection.
+        """
+        # Without a connection, the handler checks one out from the pool until it is closed
+        self.__connection: psycopg2.extensions.connection = ADMIN_POOL.getconn() if connection is None else connection
+        self.__cursor: psycopg2.extensions.cursor = self.__connection.cursor() if cursor is None else cursor
+
+    def close(self):
+        """Closes the cursor and the connection of the handler, giving a pooled connection back to the pool."""
+        self.__cursor.close()
+        self.__connection.close()
+
+    def __stamp(self, views: list, replace: bool = True):
+        """Records the start of the current transaction as the last refresh of views.
+
+        Args:
+            views (list): The names of the views.
+            replace (bool): Whether the refresh time of a view already recorded is replaced. Defaults to True.
+        """
+        self.__cursor.execute(
+            sql.SQL(
+                "INSERT INTO {} (name, refresh_timestamp) SELECT unnest(%s::text[]), NOW() ON CONFLICT (name) {}"
+            ).format(
+                sql.Identifier(REFRESH_TABLE),
+                sql.SQL("DO UPDATE SET refresh_timestamp = EXCLUDED.refresh_timestamp" if replace else "DO NOTHING")
+            ),
+            [views]
+        )
+
+    def get_refresh_timestamp(self, indicator: str):
+        """Retrieves the time of the last refresh of the view of an indicator.
+
+        Args:
+            indicator (str): The name of the indicator, see INDICATORS.
+
+        Returns:
+            datetime: The start of the transaction of the last refresh, None if the view was never refreshed.
+        """
+        self.__cursor.execute(
+            sql.SQL("SELECT refresh_timestamp FROM {} WHERE name = %s").format(sql.Identifier(REFRESH_TABLE)),
+            [view_name(indicator)]
+        )
+        refresh = self.__cursor.fetchone()
+
+        return refresh[0] if refresh else None
+
+    def create_views(self) -> dict:
+        """Creates the materialized views of the indicators and their unique indexes, if they do not already exist.
+
+        The views are populated on creation. A view whose query changed must be dropped to be created again.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the views.
+        """
+        try:
+            views = []
+            for indicator, definition in INDICATOR_QUERIES.items():
+                view = view_name(indicator)
+                self.__cursor.execute(
+                    sql.SQL("CREATE MATERIALIZED VIEW IF NOT EXISTS {} AS {} WITH DATA").format(
+                        sql.Identifier(view), _view_query(indicator)
+                    ),
+                    definition.get("params")
+                )
+                self.__cursor.execute(
+                    sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} (row_number)").format(
+                        sql.Identifier(f"{view}_idx"), sql.Identifier(view)
+                    )
+                )
+                views.append(view)
+            # An existing view keeps the time of its last refresh
+            self.__stamp(views, replace=False)
+            self.__connection.commit()
+
+            return {
+                "status": "success",
+                "message": "Indicator views successfully created.",
+                "views": views
+            }
+
+        except Exception as e:
+            self.__connection.rollback()
+            return {
+                "status": "error",
+                "message": f"Error occurred during indicator views creation: {str(e)}"
+            }
+
+    def refresh(self, indicators: list = None, concurrently: bool = True) -> dict:
+        """Recomputes the materialized views of indicators from the live flights.
+
+        Args:
+            indicators (list, optional): The names of the indicators, see INDICATORS. Defaults to all.
+            concurrently (bool): Whether the views are refreshed without locking them against reads,
+                updating only their changed rows. Defaults to True.
+
+        Returns:
+            dict: A dictionary containing the response status, message and the views.
+        """
+        indicators = list(INDICATOR_QUERIES) if indicators is None else indicators
+        try:
+            views = []
+            for indicator in indicators:
+                view = view_name(indicator)
+                self.__cursor.execute(
+                    sql.SQL("REFRESH MATERIALIZED VIEW {}{}").format(
+                        sql.SQL("CONCURRENTLY " if concurrently else ""), sql.Identifier(view)
+                    )
+                )
+                views.append(view)
+            self.__stamp(views)
+            self.__connection.commit()
+
+            return {
+                "status": "success",
+                "message": "Indicator views successfully refreshed.",
+                "views": views
+            }
+
+        except Exception as e:
+            self.__connection.rollback()
+            return {
+                "status": "error",
+                "message": f"Error occurred during indicator views refresh: {str(e)}"
+            }
@@ -1,7 +1,7 @@
 import psycopg2
 
 
-def create_connection(credential: dict) -> psycopg2.extensions.connection:
+def create_connection(credential: dict, connection_factory=None) -> psycopg2.extensions.connection:
     """Establishes a connection to a Postgres database.
 
     This method uses psycopg2's connect method to create a connection to a Postgres database.
@@ -14,6 +14,7 @@ def create_connection(credential: dict) -> psycopg2.extensions.connection:
         - user (str): The username to authenticate with.
         - password (str): The password to authenticate with.
         - port (int): The port number to connect to.
+    connection_factory (type, optional): Subclass of psycopg2 connection to create. Defaults to None.
 
     Returns:
     psycopg2.extensions.connection: A connection object representing the database connection.
@@ -26,5 +27,6 @@ def create_connection(credential: dict) -> psycopg2.extensions.connection:
         dbname=credential["name"],
         user=credential["user"],
         password=credential["password"],
-        port=credential["port"]
+        port=credential["port"],
+        connection_factory=connection_factory
     )
@@ -0,0 +1,260 @@
+import re
+
+import numpy as np
+from psycopg2 import sql
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+# Header: signature, flags (int32) and length of the header extension (int32)
+COPY_HEADER_SIZE = len(COPY_SIGNATURE) + 8
+COPY_TRAILER = b"\xff\xff"
+
+# Postgres epoch (2000-01-01) in the Unix epoch, in days
+PG_EPOCH_DAYS = 10957
+
+BOOL_TYPE = 16
+DATE_TYPE = 1082
+TIMESTAMPTZ_TYPE = 1184
+TIMESTAMP_TYPES = {1114, TIMESTAMPTZ_TYPE}
+NUMERIC_TYPE = 1700
+# Big-endian layout of the fixed-width types in the binary format, by type oid
+FIXED_WIDTH_TYPES = {
+    BOOL_TYPE: np.dtype("?"),
+    20: np.dtype(">i8"),
+    21: np.dtype(">i2"),
+    23: np.dtype(">i4"),
+    700: np.dtype(">f4"),
+    701: np.dtype(">f8"),
+    DATE_TYPE: np.dtype(">i4"),  # days since the Postgres epoch
+    1114: np.dtype(">i8"),  # microseconds since the Postgres epoch
+    TIMESTAMPTZ_TYPE: np.dtype(">i8"),  # UTC microseconds since the Postgres epoch
+}
+# Placeholder of the NULL values, which would otherwise break the fixed width of the binary rows. Each is
+# of the type of its column: COALESCE would otherwise widen a smallint column to the integer of a bare 0.
+NULL_PLACEHOLDERS = {
+    BOOL_TYPE: "FALSE",
+    20: "0::int8",
+    21: "0::int2",
+    23: "0::int4",
+    700: "0::float4",
+    701: "0::float8",
+    DATE_TYPE: "'2000-01-01'::date",
+    1114: "'2000-01-01'::timestamp",
+    TIMESTAMPTZ_TYPE: "'2000-01-01'::timestamptz",
+}
+# Values parsed from the text format, the other types being read as strings
+TEXT_FORMAT_TYPES = {
+    20: np.int64, 21: np.int16, 23: np.int32, 700: np.float32, 701: np.float64, NUMERIC_TYPE: np.float64
+}
+
+TEXT_ESCAPES = {b"b": b"\b", b"f": b"\f", b"n": b"\n", b"r": b"\r", b"t": b"\t", b"v": b"\v", b"\\": b"\\"}
+_TEXT_ESCAPE = re.compile(rb"\\(.)")
+
+
+def is_binary(type_codes: list) -> bool:
+    """Whether columns of the given type oids are read with a binary COPY, i.e. all have a fixed width."""
+    return all(type_code in FIXED_WIDTH_TYPES for type_code in type_codes)
+
+
+def copy_query(table_name: sql.Composable, columns: list, where_clause: sql.Composable) -> sql.Composed:
+    """Builds the COPY TO query streaming columns to a BinaryCopyReader or a TextCopyReader.
+
+    Args:
+        table_name (sql.Composable): The table to read.
+        columns (list): (field_name, type oid) pairs.
+        where_clause (sql.Composable): Filters of the rows.
+
+    Returns:
+        sql.Composed: The query, binary if all columns have a fixed width, text otherwise.
+    """
+    expressions = []
+    binary = is_binary([type_code for _, type_code in columns])
+    for name, type_code in columns:
+        field = sql.Identifier(name)
+        if binary:
+            # Each value is followed by its NULL flag
+            expressions.append(sql.SQL("COALESCE({0}, {1}), {0} IS NULL").format(
+                field, sql.SQL(NULL_PLACEHOLDERS[type_code])
+            ))
+        elif type_code == DATE_TYPE:
+            expressions.append(sql.SQL("{} - DATE '1970-01-01'").format(field))
+        elif type_code in TIMESTAMP_TYPES:
+            expressions.append(sql.SQL("(EXTRACT(EPOCH FROM {}) * 1000000)::int8").format(field))
+        else:
+            expressions.append(field)
+
+    return sql.SQL("COPY (SELECT {} FROM {} {}) TO STDOUT{}").format(
+        sql.SQL(", ").join(expressions), table_name, where_clause, sql.SQL(" WITH (FORMAT binary)" if binary else "")
+    )
+
+
+def _to_datetimes(values: np.ndarray, type_code: int, epoch_days: int) -> np.ndarray:
+    if type_code == DATE_TYPE:
+        return (values.astype(np.int64) + epoch_days).astype("datetime64[D]")
+    if type_code in TIMESTAMP_TYPES:
+        return (values + epoch_days * 86400 * 1000000).astype("datetime64[us]")
+
+    return values
+
+
+class BinaryCopyReader:
+    def __init__(self, type_codes: list, chunk_size: int) -> None:
+        """File-like target of a binary COPY TO of fixed-width columns, see `copy_query`.
+
+        All rows have the same size: every `chunk_size` bytes received, the complete rows are decoded
+        at once as a numpy structured array.
+
+        Args:
+            type_codes (list): Oids of the column types.
+            chunk_size (int): Number of bytes buffered before they are decoded.
+        """
+        self.__type_codes = type_codes
+        self.__chunk_size = chunk_size
+        self.__buffer = bytearray()
+        self.__header_read = False
+        self.__chunks = []
+
+        row_fields = [("nb_fields", ">i2")]
+        for index, type_code in enumerate(type_codes):
+            row_fields += [
+                (f"length_{index}", ">i4"), (f"value_{index}", FIXED_WIDTH_TYPES[type_code]),
+                (f"null_length_{index}", ">i4"), (f"null_{index}", "?")
+            ]
+        self.__row_dtype = np.dtype(row_fields)
+
+    def write(self, data):
+        self.__buffer += data
+        if len(self.__buffer) >= self.__chunk_size:
+            self.__decode()
+
+    def __decode(self):
+        if not self.__header_read:
+            if len(self.__buffer) < COPY_HEADER_SIZE:
+                return
+            if bytes(self.__buffer[:len(COPY_SIGNATURE)]) != COPY_SIGNATURE:
+                raise ValueError("The stream is not in the Postgres binary COPY format.")
+            extension_size = int.from_bytes(self.__buffer[COPY_HEADER_SIZE - 4:COPY_HEADER_SIZE], "big")
+            if len(self.__buffer) < COPY_HEADER_SIZE + extension_size:
+                return
+            del self.__buffer[:COPY_HEADER_SIZE + extension_size]
+            self.__header_read = True
+
+        nb_rows = len(self.__buffer) // self.__row_dtype.itemsize
+        if nb_rows:
+            rows = np.frombuffer(self.__buffer, dtype=self.__row_dtype, count=nb_rows)
+            if (rows["nb_fields"] != 2 * len(self.__type_codes)).any():
+                raise ValueError("Unexpected row in the binary COPY stream.")
+            self.__chunks.append(rows.copy())
+            # The buffer cannot be resized while an array is viewing it
+            del rows
+            del self.__buffer[:nb_rows * self.__row_dtype.itemsize]
+
+    def columns(self) -> list:
+        """Decodes the end of the stream and returns the columns.
+
+        Returns:
+            list: For each column, a tuple (values, mask) of numpy arrays, mask being True for NULL values.
+                Dates and timestamps are numpy datetimes, UTC for timestamps with time zone.
+        """
+        self.__decode()
+        if bytes(self.__buffer) not in [b"", COPY_TRAILER]:
+            raise ValueError("Truncated binary COPY stream.")
+
+        rows = np.concatenate(self.__chunks) if self.__chunks else np.empty(0, dtype=self.__row_dtype)
+        columns = []
+        for index, type_code in enumerate(self.__type_codes):
+            values = rows[f"value_{index}"].astype(FIXED_WIDTH_TYPES[type_code].newbyteorder("="))
+            columns.append((_to_datetimes(values, type_code, PG_EPOCH_DAYS), rows[f"null_{index}"].copy()))
+
+        return columns
+
+
+class TextCopyReader:
+    def __init__(self, type_codes: list, chunk_size: int) -> None:
+        """File-like target of a text COPY TO, see `copy_query`.
+
+        Every `chunk_size` bytes received, the complete lines are split into columns with bytes
+        methods, numbers are parsed by numpy and the other values decoded as strings, character
+        by character only if the chunk contains escaped characters.
+
+        Args:
+            type_codes (list): Oids of the column types.
+            chunk_size (int): Number of bytes buffered before they are decoded.
+        """
+        self.__type_codes = type_codes
+        self.__chunk_size = chunk_size
+        self.__buffer = bytearray()
+        self.__values = [[] for _ in type_codes]
+        self.__masks = [[] for _ in type_codes]
+
+    def write(self, data):
+        self.__buffer += data
+        if len(self.__buffer) >= self.__chunk_size:
+            self.__decode()
+
+    @staticmethod
+    def __unescape(value: bytes) -> str:
+        if b"\\" in value:
+            value = _TEXT_ESCAPE.sub(lambda match: TEXT_ESCAPES.get(match.group(1), match.group(1)), value)
+
+        return value.decode()
+
+    def __decode(self):
+        end = self.__buffer.rfind(b"\n") + 1
+        if not end:
+            return
+
+        chunk = bytes(self.__buffer[:end - 1])
+        del self.__buffer[:end]
+        # Backslashes other than the ones of the NULL markers (\N) escape special characters
+        escaped = chunk.count(b"\\") != chunk.count(b"\\N")
+        # All fields of the chunk at once, the fields of a column being every len(type_codes)-th one
+        fields = chunk.replace(b"\n", b"\t").split(b"\t")
+        nb_columns = len(self.__type_codes)
+        for index, type_code in enumerate(self.__type_codes):
+            column = fields[index::nb_columns]
+            if type_code in TEXT_FORMAT_TYPES or type_code in TIMESTAMP_TYPES or type_code == DATE_TYPE:
+                values = np.array(column, dtype=bytes)
+                mask = values == b"\\N"
+                values[mask] = b"0"
+                values = values.astype(TEXT_FORMAT_TYPES.get(type_code, np.int64))
+            elif type_code == BOOL_TYPE:
+                values = np.array(column, dtype=bytes)
+                mask = values == b"\\N"
+                values = values == b"t"
+            else:
+                if escaped:
+                    values = np.array(
+                        [None if value == b"\\N" else self.__unescape(value) for value in column], dtype=object
+                    )
+                    mask = np.equal(values, None)
+                else:
+                    values = np.array(b"\t".join(column).decode().split("\t"), dtype=object)
+                    mask = values == "\\N"
+                    values[mask] = None
+            self.__values[index].append(values)
+            self.__masks[index].append(mask)
+
+    def columns(self) -> list:
+        """Decodes the end of the stream and returns the columns.
+
+        Returns:
+            list: For each column, a tuple (values, mask) of numpy arrays, mask being True for NULL values.
+                Dates and timestamps are numpy datetimes, UTC for timestamps with time zone, and
+                NUMERIC values are floats.
+        """
+        if self.__buffer and not self.__buffer.endswith(b"\n"):
+            self.__buffer += b"\n"
+        self.__decode()
+
+        columns = []
+        for type_code, values, masks in zip(self.__type_codes, self.__values, self.__masks):
+            if values:
+                values = np.concatenate(values)
+            elif type_code in TEXT_FORMAT_TYPES or type_code in TIMESTAMP_TYPES or type_code == DATE_TYPE:
+                values = np.empty(0, dtype=TEXT_FORMAT_TYPES.get(type_code, np.int64))
+            else:
+                values = np.empty(0, dtype=bool if type_code == BOOL_TYPE else object)
+            mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+            columns.append((_to_datetimes(values, type_code, 0), mask))
+
+        return columns
@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+from lib.db_toolkits.utilities import create_connection
+from lib.utilities.exceptions import PoolException
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection created by a ConnectionPool: closing it while checked out gives it back to its pool."""
+    pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.putconn(self)
+        else:
+            super().close()
+
+
+class ConnectionPool:
+    def __init__(
+            self,
+            credential: dict,
+            min_size: int,
+            max_size: int,
+            timeout: float,
+            health_check_interval: float
+    ) -> None:
+        """Thread-safe pool of connections to a Postgres database.
+
+        No connection is opened before the first checkout, which opens the first `min_size` ones.
+        At most `max_size` connections are checked out at once, further checkouts wait for a
+        connection to be given back. Released connections are kept open and reused, a connection
+        idle for more than `health_check_interval` seconds is checked before being handed out.
+
+        Args:
+            credential (dict): Credential of the database, see `create_connection`.
+            min_size (int): Number of connections opened on the first checkout.
+            max_size (int): Maximum number of connections checked out at once.
+            timeout (float): Maximum time to wait for a connection, in seconds.
+            health_check_interval (float): Idle time after which a connection is checked, in seconds.
+        """
+        self.__credential = credential
+        self.__min_size = min(min_size, max_size)
+        self.__timeout = timeout
+        self.__health_check_interval = health_check_interval
+        self.__slots = threading.BoundedSemaphore(max_size)
+        self.__lock = threading.Lock()
+        self.__idle = []
+        self.__checked_out = set()
+        self.__warmed_up = False
+        self.__closed = False
+
+    def __connect(self) -> PooledConnection:
+        return create_connection(self.__credential, connection_factory=PooledConnection)
+
+    def __warm_up(self):
+        with self.__lock:
+            if self.__warmed_up:
+                return
+            while len(self.__idle) < self.__min_size:
+                self.__idle.append((self.__connect(), time.monotonic()))
+            self.__warmed_up = True
+
+    def __is_healthy(self, connection: PooledConnection, released_at: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - released_at < self.__health_check_interval:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self) -> PooledConnection:
+        """Checks out a connection, opening a new one if none is idle.
+
+        The connection must be given back with `putconn`, or by closing it.
+
+        Returns:
+            PooledConnection: A healthy connection, outside of any transaction.
+
+        Raises:
+            PoolException: If the pool is closed or no connection was given back within the timeout.
+            psycopg2.OperationalError: If a new connection could not be established.
+        """
+        if self.__closed:
+            raise PoolException("The connection pool is closed.")
+        if not self.__slots.acquire(timeout=self.__timeout):
+            raise PoolException(f"No connection available after {self.__timeout} seconds.")
+
+        try:
+            if not self.__warmed_up:
+                self.__warm_up()
+            connection = None
+            while connection is None:
+                with self.__lock:
+                    idle = self.__idle.pop() if self.__idle else None
+                if idle is None:
+                    connection = self.__connect()
+                elif self.__is_healthy(*idle):
+                    connection = idle[0]
+                else:
+                    # Broken connection (server restart, network failure...): dropped and replaced
+                    idle[0].close()
+        except Exception:
+            self.__slots.release()
+            raise
+
+        connection.pool = self
+        with self.__lock:
+            self.__checked_out.add(connection)
+
+        return connection
+
+    def putconn(self, connection: PooledConnection):
+        """Gives a connection back to the pool, rolling back its pending transaction.
+
+        Args:
+            connection (PooledConnection): A connection checked out from this pool.
+        """
+        with self.__lock:
+            if connection not in self.__checked_out:
+                return
+            self.__checked_out.discard(connection)
+        connection.pool = None
+
+        try:
+            if not connection.closed:
+                if connection.info.transaction_status == TRANSACTION_STATUS_UNKNOWN:
+                    connection.close()
+                else:
+                    if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                        connection.rollback()
+                    if connection.autocommit:
+                        connection.autocommit = False
+        except psycopg2.Error:
+            connection.close()
+
+        with self.__lock:
+            if not connection.closed and not self.__closed:
+                self.__idle.append((connection, time.monotonic()))
+                connection = None
+        if connection is not None:
+            connection.close()
+        self.__slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Checks out a connection for the duration of a `with` block.
+
+        Changes not committed within the block are rolled back when the connection is given back.
+
+        Yields:
+            PooledConnection: A connection checked out from the pool.
+        """
+        connection = self.getconn()
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def close(self):
+        """Closes the idle connections, the checked out ones being closed when they are given back."""
+        with self.__lock:
+            self.__closed = True
+            idle, self.__idle = self.__idle, []
+        for connection, _ in idle:
+            connection.close()
@@ -0,0 +1,61 @@
+import math
+
+EARTH_RADIUS_KM = 6371
+# Degrees of latitude per kilometer, along a meridian
+KM_DEGREES = 180 / (math.pi * EARTH_RADIUS_KM)
+
+
+def grid_cell(latitude: float, longitude: float, degrees: float) -> int:
+    """Cell of the uniform grid of `degrees` degrees containing a position, as GRID_CELL_SQL computes it.
+
+    The cells are numbered row by row from the south-west corner (-90, -180): the cells of a row of
+    latitude are consecutive integers. The north pole belongs to the northernmost row and the
+    antimeridian (longitude 180) to the easternmost column.
+    """
+    nb_rows, nb_columns = math.ceil(180 / degrees), math.ceil(360 / degrees)
+    row = min(math.floor((latitude + 90) / degrees), nb_rows - 1)
+
+    return row * nb_columns + min(math.floor((longitude + 180) / degrees), nb_columns - 1)
+
+
+def bbox_cells(south: float, west: float, north: float, east: float, degrees: float) -> list:
+    """Cells of the uniform grid of `degrees` degrees intersecting a bounding box not crossing the antimeridian."""
+    nb_columns = math.ceil(360 / degrees)
+    south_west, north_east = grid_cell(south, west, degrees), grid_cell(north, east, degrees)
+
+    return [
+        row * nb_columns + column
+        for row in range(south_west // nb_columns, north_east // nb_columns + 1)
+        for column in range(south_west % nb_columns, north_east % nb_columns + 1)
+    ]
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float) -> tuple:
+    """Smallest (south, west, north, east) bounding box holding every position within a radius of a point.
+
+    The box spans all the longitudes once the circle reaches a pole. Its west longitude is greater
+    than its east longitude when it crosses the antimeridian.
+    """
+    radius = radius_km * KM_DEGREES
+    south, north = latitude - radius, latitude + radius
+    if south <= -90 or north >= 90 or radius >= 90:
+        return max(south, -90), -180, min(north, 90), 180
+
+    # Largest longitude difference on the circle, reached at its tangent meridians
+    longitude_radius = math.degrees(math.asin(math.sin(math.radians(radius)) / math.cos(math.radians(latitude))))
+    west, east = longitude - longitude_radius, longitude + longitude_radius
+    if east - west >= 360:
+        return south, -180, north, 180
+
+    return south, (west + 180) % 360 - 180, north, (east + 180) % 360 - 180
+
+
+def haversine_km(latitude: float, longitude: float, other_latitude: float, other_longitude: float) -> float:
+    """Great-circle distance between two positions, in kilometers."""
+    latitude, other_latitude = math.radians(latitude), math.radians(other_latitude)
+    half_chord = (
+        math.sin((other_latitude - latitude) / 2) ** 2
+        + math.cos(latitude) * math.cos(other_latitude) * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(half_chord, 1)))
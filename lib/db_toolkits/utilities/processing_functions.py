@@ -1,3 +1,12 @@
+import io
+import json
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from lib.db_toolkits.utilities.query_builder import filter_shape, compile_filters, compile_fields
+
+
 def process_filters(filters: dict) -> tuple:
     """Transforms a dictionary of filters into a Postgres WHERE clause and parameters.
 
@@ -7,47 +16,81 @@ def process_filters(filters: dict) -> tuple:
             * operator: The comparison operator (e.g., "eq", "gt", "lt")
 
     Returns:
-        tuple: A tuple containing the where clause and a list of parameters to be used in the query.
+        tuple: A tuple containing the where clause (compiled once per filter shape) and a list of
+            parameters to be used in the query.
     """
-    operators: dict = {
-        "eq": {"func": lambda x: x, "db_name": "="},
-        "neq": {"func": lambda x: x, "db_name": "!="},
-        "start": {"func": lambda x: f"{x}%", "db_name": "ILIKE"},
-        "gt": {"func": lambda x: x, "db_name": ">"},
-        "gte": {"func": lambda x: x, "db_name": ">="},
-        "lte": {"func": lambda x: x, "db_name": "<="},
-        "lt": {"func": lambda x: x, "db_name": "<"},
-        "in": {"func": lambda x: tuple(x), "db_name": "in"},
-    }
-
-    mapping: list = []
-    prefix: str = ""
-
-    sql_query: str = "WHERE "
-    sql_params: list = []
-    for field, var_filters in filters.items():
-        if field in mapping:
-            field = f"{prefix}{field}"
-
-        for operator, value in var_filters.items():
-            if operator not in operators:
-                raise ValueError(f"Operator '{operator}' is not supported.")
-            if len(sql_params) > 0:
-                sql_query += " AND "
-            sql_query += f"{field} {operators[operator]['db_name']} %s"
-            sql_params.append(operators[operator]['func'](value))
-
-    return sql_query, sql_params
-
-
-def process_fields(fields: list) -> str:
-    """Transforms a list of fields into a comma-separated string for Postgresql queries.
+    shape, sql_params = filter_shape(filters)
+
+    return compile_filters(shape), sql_params
+
+
+def process_fields(fields: list) -> sql.Composable:
+    """Transforms a list of fields into a comma-separated selection for Postgresql queries.
 
     Args:
         fields (list): A list of field names to include in the query.
 
     Returns:
-        str: A comma-separated string representing the selected fields for the Postgres query.
-            If the list is empty, returns "*".
+        sql.Composable: The quoted fields, separated by commas. If the list is empty, "*".
     """
-    return "*" if not fields else ", ".join(fields)
+    return compile_fields(tuple(fields) if fields else None)
+
+
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def process_copy_value(value, escape: bool = True) -> str:
+    """Transforms a python value into its representation in the Postgresql COPY text format.
+
+    Args:
+        value: The value to transform.
+        escape (bool): Whether backslashes, tabs and newlines are escaped. Defaults to True.
+
+    Returns:
+        str: The value, with NULL represented as \\N.
+    """
+    if value is None:
+        return "\\N"
+    value_type = type(value)
+    if value_type is not str:
+        if value_type is bool:
+            return "t" if value else "f"
+        if value_type is int or value_type is float:
+            return str(value)
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        else:
+            value = str(value)
+
+    return value.translate(COPY_ESCAPES) if escape else value
+
+
+def process_copy_rows(data: list, columns: list) -> io.StringIO:
+    """Transforms a list of records into an in-memory buffer in the Postgresql COPY text format.
+
+    Args:
+        data (list): List of dictionaries, missing keys are written as NULL.
+        columns (list): Ordered list of the columns to write.
+
+    Returns:
+        io.StringIO: A buffer, positioned at its start, with one line per record.
+    """
+    buffer = io.StringIO()
+    nb_separators = len(columns) - 1
+    for record in data:
+        values = [record.get(column) for column in columns]
+        # Values rarely hold characters to escape: the whole line is checked at once, the only
+        # expected backslashes being the NULL markers, and the values are only escaped when needed.
+        line = "\t".join([process_copy_value(value, escape=False) for value in values])
+        if (
+                line.count("\t") != nb_separators or line.count("\\") != values.count(None)
+                or "\n" in line or "\r" in line
+        ):
+            line = "\t".join([process_copy_value(value) for value in values])
+        buffer.write(line)
+        buffer.write("\n")
+    buffer.seek(0)
+
+    return buffer
@@ -0,0 +1,164 @@
+import hashlib
+import threading
+import weakref
+from functools import lru_cache
+from typing import NamedTuple
+
+from psycopg2 import sql
+
+QUERY_CACHE_SIZE = 256
+
+# Filter operators: SQL template of the condition ({0} field, {1} value) and transformation of the value
+OPERATORS = {
+    "eq": {"template": sql.SQL("{0} = {1}"), "func": None},
+    "neq": {"template": sql.SQL("{0} != {1}"), "func": None},
+    "start": {"template": sql.SQL("{0} ILIKE {1}"), "func": lambda x: f"{x}%"},
+    "gt": {"template": sql.SQL("{0} > {1}"), "func": None},
+    "gte": {"template": sql.SQL("{0} >= {1}"), "func": None},
+    "lte": {"template": sql.SQL("{0} <= {1}"), "func": None},
+    "lt": {"template": sql.SQL("{0} < {1}"), "func": None},
+    "in": {"template": sql.SQL("{0} = ANY({1})"), "func": lambda x: list(x)},
+}
+
+# Names of the statements prepared on each connection, forgotten with the connection
+_PREPARED_STATEMENTS = weakref.WeakKeyDictionary()
+_PREPARED_STATEMENTS_LOCK = threading.Lock()
+
+
+class CompiledQuery(NamedTuple):
+    """A query compiled once for a given shape, run with `execute`."""
+    name: str
+    query: sql.Composed
+    prepared_query: sql.Composed
+    execute_query: str
+
+
+def table_identifier(table_name: str) -> sql.Identifier:
+    """Quotes a table name, optionally qualified by its schema (e.g. "information_schema.columns")."""
+    return sql.Identifier(*table_name.split("."))
+
+
+def filter_shape(filters: dict) -> tuple:
+    """Splits filters into their shape, which is all a compiled query depends on, and their parameters.
+
+    Args:
+        filters (dict): A dictionary representing the filters for the query.
+            The structure is {field_name: {operator: value}}.
+
+    Returns:
+        tuple: The shape, a tuple of (field_name, operator) pairs, and the list of parameters.
+
+    Raises:
+        ValueError: If an operator is not supported.
+    """
+    shape = []
+    params = []
+    for field, var_filters in (filters or {}).items():
+        for operator, value in var_filters.items():
+            if operator not in OPERATORS:
+                raise ValueError(f"Operator '{operator}' is not supported.")
+            func = OPERATORS[operator]["func"]
+            shape.append((field, operator))
+            params.append(func(value) if func else value)
+
+    return tuple(shape), params
+
+
+def _placeholder(index: int, prepared: bool) -> sql.Composable:
+    return sql.SQL(f"${index}") if prepared else sql.Placeholder()
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_fields(fields: tuple = None) -> sql.Composable:
+    """Compiles a selection of fields, all fields ("*") if none is given."""
+    return sql.SQL("*") if not fields else sql.SQL(", ").join([sql.Identifier(field) for field in fields])
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_filters(shape: tuple, prepared: bool = False) -> sql.Composable:
+    """Compiles the WHERE clause of a filter shape, see `filter_shape`.
+
+    Args:
+        shape (tuple): (field_name, operator) pairs.
+        prepared (bool): Whether the values are numbered parameters ($1, $2...) of a prepared
+            statement rather than psycopg2 placeholders. Defaults to False.
+
+    Returns:
+        sql.Composable: The WHERE clause, empty if there is no filter.
+    """
+    if not shape:
+        return sql.SQL("")
+
+    return sql.SQL("WHERE ") + sql.SQL(" AND ").join([
+        OPERATORS[operator]["template"].format(sql.Identifier(field), _placeholder(index, prepared))
+        for index, (field, operator) in enumerate(shape, start=1)
+    ])
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_select(
+        table_name: str,
+        fields: tuple = None,
+        shape: tuple = (),
+        order_by: tuple = (),
+        limit: bool = False
+) -> CompiledQuery:
+    """Compiles a SELECT query once for a table, a selection of fields and a filter shape.
+
+    Args:
+        table_name (str): The name of the table to query.
+        fields (tuple, optional): Fields to retrieve, all fields if None. Defaults to None.
+        shape (tuple): Filter shape, see `filter_shape`. Defaults to no filter.
+        order_by (tuple): (field_name, "ASC" or "DESC") pairs. Defaults to no ordering.
+        limit (bool): Whether the number of rows is limited, by a last parameter. Defaults to False.
+
+    Returns:
+        CompiledQuery: The compiled query.
+    """
+    queries = []
+    for prepared in [False, True]:
+        query = sql.SQL("SELECT {} FROM {} {}").format(
+            compile_fields(fields), table_identifier(table_name), compile_filters(shape, prepared)
+        )
+        if order_by:
+            query += sql.SQL(" ORDER BY ") + sql.SQL(", ").join([
+                sql.SQL("{} {}").format(sql.Identifier(field), sql.SQL("DESC" if direction == "DESC" else "ASC"))
+                for field, direction in order_by
+            ])
+        if limit:
+            query += sql.SQL(" LIMIT ") + _placeholder(len(shape) + 1, prepared)
+        queries.append(query)
+
+    nb_params = len(shape) + int(limit)
+    name = "exalt_" + hashlib.md5(repr((table_name, fields, shape, order_by, limit)).encode()).hexdigest()[:16]
+    execute_query = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * nb_params)})" if nb_params else "")
+
+    return CompiledQuery(name, queries[0], queries[1], execute_query)
+
+
+def execute(cursor, compiled_query: CompiledQuery, params: list = None, prepare: bool = False):
+    """Runs a compiled query, optionally as a server-side prepared statement.
+
+    A prepared statement is planned once per connection (PREPARE) and then only executed
+    (EXECUTE), which saves the parsing and planning of frequent lookups.
+
+    Args:
+        cursor: The cursor used to run the query.
+        compiled_query (CompiledQuery): The query, see `compile_select`.
+        params (list, optional): The values of the query parameters. Defaults to None.
+        prepare (bool): Whether the query is run as a prepared statement. Defaults to False.
+    """
+    if not prepare:
+        cursor.execute(compiled_query.query, params)
+        return
+
+    connection = cursor.connection
+    with _PREPARED_STATEMENTS_LOCK:
+        prepared_statements = _PREPARED_STATEMENTS.setdefault(connection, set())
+    if compiled_query.name not in prepared_statements:
+        cursor.execute(
+            sql.SQL("PREPARE {} AS ").format(sql.Identifier(compiled_query.name)) + compiled_query.prepared_query
+        )
+        # Prepared statements belong to the session: they outlive the transaction they were created in
+        prepared_statements.add(compiled_query.name)
+    cursor.execute(compiled_query.execute_query, params)
@@ -0,0 +1,96 @@
+def _text_order(item) -> tuple:
+    """Sort key of an item as in Postgres with the "C" collation, NULL values last."""
+    return item is None, item or ""
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int, counters: list = None, nb_items: int = 0) -> None:
+        """Space-Saving summary of the most frequent items of a stream, in constant memory.
+
+        At most `capacity` items are counted. An item arriving when the summary is full replaces the
+        least counted item and inherits its count, recorded as the error of the new counter: the count
+        of an item overestimates its true count by at most its error, itself at most
+        nb_items / capacity. Summaries of different streams (e.g. of different days) merge into the
+        summary of the whole stream with the same guarantees.
+
+        Args:
+            capacity (int): Maximum number of items counted.
+            counters (list, optional): [item, count, error] counters, see `to_dict`. Defaults to none.
+            nb_items (int): Number of items already summarized. Defaults to 0.
+        """
+        if capacity < 1:
+            raise ValueError("The capacity of a Space-Saving summary must be at least 1.")
+        self.capacity = capacity
+        self.nb_items = nb_items
+        self.__counters = {item: [count, error] for item, count, error in counters or []}
+
+    def __min_count(self) -> int:
+        """Count of the least counted item if the summary is full, the maximum count of an uncounted item."""
+        if len(self.__counters) < self.capacity:
+            return 0
+
+        return min(count for count, _ in self.__counters.values())
+
+    def update(self, item, count: int = 1):
+        """Counts `count` occurrences of an item.
+
+        Replacing the least counted item scans the counters, in O(capacity), only when a new item
+        arrives in a full summary.
+        """
+        self.nb_items += count
+        counter = self.__counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.__counters) < self.capacity:
+            self.__counters[item] = [count, 0]
+        else:
+            least_item = min(self.__counters, key=lambda other: self.__counters[other][0])
+            least_count = self.__counters.pop(least_item)[0]
+            self.__counters[item] = [least_count + count, least_count]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Merges another summary into this one, keeping the `capacity` most counted items.
+
+        An item missing from a full summary may have occurred up to its minimum count times: that
+        count is added to the count and to the error of the item.
+        """
+        counters = {}
+        for summary, missing_count in [(self, self.__min_count()), (other, other.__min_count())]:
+            for item in set(self.__counters) | set(other.__counters):
+                count, error = summary.__counters.get(item, (missing_count, missing_count))
+                counter = counters.setdefault(item, [0, 0])
+                counter[0] += count
+                counter[1] += error
+
+        kept_items = sorted(counters, key=lambda item: (-counters[item][0], _text_order(item)))[:self.capacity]
+        self.__counters = {item: counters[item] for item in kept_items}
+        self.nb_items += other.nb_items
+
+        return self
+
+    def max_error(self) -> int:
+        """Maximum overestimation of the count of any item, 0 while the counts are exact."""
+        return self.__min_count()
+
+    def top(self, k: int) -> list:
+        """The k most counted items, ties broken by item (by code point, NULL last).
+
+        Returns:
+            list: (item, count, error) tuples, the true count of the item being between count - error
+                and count.
+        """
+        items = sorted(self.__counters, key=lambda item: (-self.__counters[item][0], _text_order(item)))
+
+        return [(item, *self.__counters[item]) for item in items[:k]]
+
+    def to_dict(self) -> dict:
+        """JSON-serializable state of the summary, read back by `from_dict`."""
+        return {
+            "capacity": self.capacity,
+            "nb_items": self.nb_items,
+            "counters": [[item, count, error] for item, (count, error) in self.__counters.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "SpaceSaving":
+        return cls(state["capacity"], state["counters"], state["nb_items"])
@@ -1,13 +1,21 @@
+import math
+
+from lib.data_upload.data_status import data_status_conversion_sql
+
+# Airports of the live flights, keyed by IATA code: their last known details and their numbers of
+# live departures and arrivals, maintained by the triggers of flight_current (see ExaltAggregateHandler).
 AIRPORT_MAPPING = {
-    "id": "VARCHAR PRIMARY KEY DEFAULT gen_random_uuid()",
+    "iata": "VARCHAR(10) PRIMARY KEY",
     "creation_timestamp": "TIMESTAMP WITH TIME ZONE default NOW()",
-    "name": "VARCHAR NOT NULL",
-    "iata": "VARCHAR NOT NULL",
-    "icao": "VARCHAR NOT NULL",
-    "lat": "NUMERIC NOT NULL",
-    "lon": "NUMERIC NOT NULL",
-    "country": "VARCHAR NOT NULL",
-    "alt": "NUMERIC NOT NULL"
+    "name": "VARCHAR",
+    "icao": "VARCHAR",
+    "lat": "NUMERIC",
+    "lon": "NUMERIC",
+    "country": "VARCHAR",
+    "nb_departures": "BIGINT NOT NULL DEFAULT 0",
+    "nb_arrivals": "BIGINT NOT NULL DEFAULT 0",
+    "flights_difference": "BIGINT GENERATED ALWAYS AS (nb_departures - nb_arrivals) STORED",
+    "latest_update": "TIMESTAMP WITH TIME ZONE default NOW()"
 }
 
 AIRLINE_MAPPING = {
@@ -53,7 +61,7 @@ SUB_ZONE_MAPPING = {
 FLIGHT_MAPPING = {
     "id": "SERIAL PRIMARY KEY",
     "latest_update": "TIMESTAMP WITH TIME ZONE default NOW()",
-    "data_status": "JSONB",
+    "data_status": "INTEGER",
     "flight_id": "VARCHAR(255)",
     "callsign": "VARCHAR(255)",
     "live": "BOOLEAN",
@@ -84,11 +92,252 @@ FLIGHT_MAPPING = {
     "first_timestamp": "TIMESTAMP WITH TIME ZONE"
 }
 
+# Great-circle distance between the origin and destination airports of a flight, in km. Rounding
+# errors can take the cosine of the distance slightly out of [-1, 1] (e.g. same origin and
+# destination), which acos rejects: it is then divided by its absolute value, rather than clamped
+# with LEAST and GREATEST, which would ignore a NULL coordinate.
+ROUTE_COSINE_SQL = """
+    cos(radians(origin_airport_lat)) * cos(radians(destination_airport_lat)) *
+    cos(radians(destination_airport_long) - radians(origin_airport_long)) +
+    sin(radians(origin_airport_lat)) * sin(radians(destination_airport_lat))
+"""
+ROUTE_DISTANCE_SQL = f"6371 * acos(({ROUTE_COSINE_SQL}) / GREATEST(1.0, abs({ROUTE_COSINE_SQL})))"
+
+# Latest state of each live flight, maintained by the flight data upload. The distance of the route
+# is computed by Postgres once per written row (stored generated column), NULL if a coordinate is.
+FLIGHT_CURRENT_MAPPING = {
+    "flight_id": "VARCHAR(255) PRIMARY KEY",
+    "latest_update": "TIMESTAMP WITH TIME ZONE default NOW()",
+    "data_status": "INTEGER",
+    **{
+        field_name: field_type for field_name, field_type in FLIGHT_MAPPING.items()
+        if field_name not in ["id", "latest_update", "data_status", "flight_id"]
+    },
+    "route_distance_km": f"DOUBLE PRECISION GENERATED ALWAYS AS ({ROUTE_DISTANCE_SQL}) STORED"
+}
+
+# Uniform grid of the positions index: cells of POSITION_GRID_DEGREES degrees, numbered row by row
+# from the south-west corner (see position_grid.grid_cell, which must compute the same cells).
+POSITION_GRID_DEGREES = 1
+GRID_CELL_SQL = f"""
+    LEAST(floor((latitude + 90) / {POSITION_GRID_DEGREES}), {math.ceil(180 / POSITION_GRID_DEGREES) - 1})::integer
+    * {math.ceil(360 / POSITION_GRID_DEGREES)}
+    + LEAST(floor((longitude + 180) / {POSITION_GRID_DEGREES}), {math.ceil(360 / POSITION_GRID_DEGREES) - 1})::integer
+"""
+
+# Last position of each aircraft of the live feed, maintained by the position upload from the
+# get_flights feed alone (no flight details). The grid cell of the position is computed by Postgres
+# once per written row (stored generated column).
+FLIGHT_POSITION_MAPPING = {
+    "flight_id": "VARCHAR(255) PRIMARY KEY",
+    "latest_update": "TIMESTAMP WITH TIME ZONE default NOW()",
+    "icao_24bit": "VARCHAR(255)",
+    "callsign": "VARCHAR(255)",
+    "registration": "VARCHAR(255)",
+    "aircraft_code": "VARCHAR(255)",
+    "number": "VARCHAR(255)",
+    "airline_iata": "VARCHAR(255)",
+    "airline_icao": "VARCHAR(255)",
+    "origin_airport_iata": "VARCHAR(255)",
+    "destination_airport_iata": "VARCHAR(255)",
+    "latitude": "DOUBLE PRECISION NOT NULL",
+    "longitude": "DOUBLE PRECISION NOT NULL",
+    "altitude": "INTEGER",
+    "ground_speed": "INTEGER",
+    "heading": "INTEGER",
+    "vertical_speed": "INTEGER",
+    "squawk": "VARCHAR(255)",
+    "on_ground": "BOOLEAN",
+    "position_timestamp": "TIMESTAMP WITH TIME ZONE",
+    "grid_cell": f"INTEGER GENERATED ALWAYS AS ({GRID_CELL_SQL}) STORED"
+}
+
+# Counters of the live flights of flight_current, maintained by triggers (see ExaltAggregateHandler):
+# number of flights and of regional flights (same origin and destination continent) per aggregate
+# name and key, the JSON array of the values of the FLIGHT_AGGREGATES fields.
+FLIGHT_AGGREGATE_MAPPING = {
+    "name": "VARCHAR(255) NOT NULL",
+    "key": "JSONB NOT NULL",
+    "nb_flights": "BIGINT NOT NULL DEFAULT 0",
+    "nb_regional_flights": "BIGINT NOT NULL DEFAULT 0",
+    "latest_update": "TIMESTAMP WITH TIME ZONE default NOW()"
+}
+
+# Aggregates of the live flights: the flights are counted per value of "fields", "where" being an
+# optional predicate restricting the flights counted.
+FLIGHT_AGGREGATES = {
+    "airline": {
+        "fields": ["airline"]
+    },
+    "continent_airline": {
+        "fields": ["origin_airport_continent", "airline"]
+    },
+    "manufacturer": {
+        "fields": ["aircraft_manufacturer"],
+        "where": "aircraft_manufacturer IS NOT NULL"
+    },
+    "airline_model": {
+        "fields": ["airline", "aircraft_model_text"],
+        "where": "airline IS NOT NULL AND aircraft_model_text IS NOT NULL"
+    }
+}
+
+# Space-Saving summaries of the flights first seen each day (see ExaltSketchHandler): one summary per
+# day bucket, FLIGHT_SKETCHES name and key, the JSON array of the values of its "per" fields.
+FLIGHT_SKETCH_MAPPING = {
+    "bucket": "TIMESTAMP WITH TIME ZONE NOT NULL",
+    "name": "VARCHAR(255) NOT NULL",
+    "key": "JSONB NOT NULL",
+    "sketch": "JSONB NOT NULL",
+    "latest_update": "TIMESTAMP WITH TIME ZONE default NOW()"
+}
+
+# Summaries of the flights: the most frequent values of "item", per value of the "per" fields, the
+# flights with a NULL value of a "not_null" field being left out. "capacity" is the number of values
+# counted by each summary (see SpaceSaving).
+FLIGHT_SKETCHES = {
+    "airline": {
+        "item": "airline",
+        "capacity": 200
+    },
+    "manufacturer": {
+        "item": "aircraft_manufacturer",
+        "not_null": ["aircraft_manufacturer"],
+        "capacity": 100
+    },
+    "airline_model": {
+        "item": "aircraft_model_text",
+        "per": ["airline"],
+        "not_null": ["airline", "aircraft_model_text"],
+        "capacity": 20
+    }
+}
+
+# "watermark" and "nb_live_flights" identify the state of flight_current a result was computed from:
+# its latest update and its number of live flights (see IndicatorProcessor.get_watermark).
 INDICATOR_MAPPING = {
     "id": "SERIAL PRIMARY KEY",
     "computation_timestamp": "TIMESTAMP WITH TIME ZONE default NOW()",
     "name": "VARCHAR(255)",
     "result": "JSONB",
+    "watermark": "TIMESTAMP WITH TIME ZONE",
+    "nb_live_flights": "BIGINT",
+}
+
+# Last refresh of the materialized view of each indicator (see ExaltViewHandler), keyed by view name
+INDICATOR_VIEW_MAPPING = {
+    "name": "VARCHAR(255) PRIMARY KEY",
+    "refresh_timestamp": "TIMESTAMP WITH TIME ZONE default NOW()"
+}
+
+# Indicator results compacted per time bucket of a rollup tier (see ExaltRollupHandler): the last
+# result of the bucket, the minimum and maximum of its numeric fields over the bucket (JSON of the
+# shape of the results, holding only numbers), and the number of results compacted.
+INDICATOR_ROLLUP_MAPPING = {
+    "name": "VARCHAR(255) NOT NULL",
+    "tier": "VARCHAR(32) NOT NULL",
+    "bucket": "TIMESTAMP WITH TIME ZONE NOT NULL",
+    "result": "JSONB",
+    "minimum": "JSONB",
+    "maximum": "JSONB",
+    "nb_results": "INTEGER NOT NULL",
+    "last_computation_timestamp": "TIMESTAMP WITH TIME ZONE NOT NULL",
+    "latest_update": "TIMESTAMP WITH TIME ZONE default NOW()"
+}
+
+# Tiers of the indicator history, from the finest to the coarsest: "raw" is the indicator table,
+# each other tier compacts the previous one into buckets of "seconds" (a multiple of the bucket of
+# the previous tier, aligned on the Unix epoch). Results and rollups older than "retention_days"
+# are removed (kept forever with None), once compacted into the next tier.
+ROLLUP_TIERS = {
+    "raw": {"seconds": None, "retention_days": 7},
+    "hourly": {"seconds": 3600, "retention_days": 90},
+    "daily": {"seconds": 86400, "retention_days": None}
+}
+
+# Indexes of each table, named "<table>_<key>". "fields" are index elements (with their
+# ordering), "where" an optional predicate making the index partial, "unique" whether the index
+# is unique.
+FLIGHT_INDEXES = {
+    "flight_id_latest_update_live_idx": {
+        "fields": ["flight_id", "latest_update DESC"],
+        "where": "live = TRUE"
+    },
+    "latest_update_idx": {
+        "fields": ["latest_update DESC"]
+    }
+}
+
+FLIGHT_CURRENT_INDEXES = {
+    "latest_update_idx": {
+        "fields": ["latest_update"]
+    },
+    # Longest live flights first, ties broken by flight_id as in the indicator query
+    "route_distance_km_live_idx": {
+        "fields": ["route_distance_km DESC", 'flight_id COLLATE "C"'],
+        "where": "live = TRUE AND route_distance_km IS NOT NULL"
+    }
+}
+
+INDICATOR_INDEXES = {
+    "name_computation_timestamp_idx": {
+        "fields": ["name", "computation_timestamp DESC"]
+    }
+}
+
+FLIGHT_AGGREGATE_INDEXES = {
+    "name_key_idx": {
+        "fields": ["name", "key"],
+        "unique": True
+    }
+}
+
+# Airport with the largest difference between departures and arrivals first, ties broken by IATA code
+# as in the indicator query
+AIRPORT_INDEXES = {
+    "flights_difference_idx": {
+        "fields": ["flights_difference DESC", 'iata COLLATE "C"'],
+        "where": "nb_departures > 0 OR nb_arrivals > 0"
+    }
+}
+
+FLIGHT_POSITION_INDEXES = {
+    "grid_cell_idx": {
+        "fields": ["grid_cell"]
+    }
+}
+
+ZONE_INDEXES = {
+    "name_idx": {
+        "fields": ["name"],
+        "unique": True
+    }
+}
+
+INDICATOR_ROLLUP_INDEXES = {
+    "name_tier_bucket_idx": {
+        "fields": ["name", "tier", "bucket"],
+        "unique": True
+    }
+}
+
+FLIGHT_SKETCH_INDEXES = {
+    "name_bucket_key_idx": {
+        "fields": ["name", "bucket", "key"],
+        "unique": True
+    }
+}
+
+INDEXES = {
+    "airport": AIRPORT_INDEXES,
+    "flight": FLIGHT_INDEXES,
+    "flight_current": FLIGHT_CURRENT_INDEXES,
+    "flight_aggregate": FLIGHT_AGGREGATE_INDEXES,
+    "flight_sketch": FLIGHT_SKETCH_INDEXES,
+    "flight_position": FLIGHT_POSITION_INDEXES,
+    "zone": ZONE_INDEXES,
+    "indicator": INDICATOR_INDEXES,
+    "indicator_rollup": INDICATOR_ROLLUP_INDEXES
 }
 
 MAPPINGS = {
@@ -98,6 +347,33 @@ MAPPINGS = {
     "country": COUNTRY_MAPPING,
     "sub_zone": SUB_ZONE_MAPPING,
     "flight": FLIGHT_MAPPING,
-    "indicator": INDICATOR_MAPPING
+    "flight_current": FLIGHT_CURRENT_MAPPING,
+    "flight_aggregate": FLIGHT_AGGREGATE_MAPPING,
+    "flight_sketch": FLIGHT_SKETCH_MAPPING,
+    "flight_position": FLIGHT_POSITION_MAPPING,
+    "indicator": INDICATOR_MAPPING,
+    "indicator_view": INDICATOR_VIEW_MAPPING,
+    "indicator_rollup": INDICATOR_ROLLUP_MAPPING
+
+}
+
+# Columns whose type changed, converted in place on databases created with the former type:
+# data type of the former column (as in information_schema.columns) and SQL expression of the
+# converted value. The bitmask data_status replaced the JSONB one ({"flight_id": 1, ...}).
+COLUMN_CONVERSIONS = {
+    "flight": {"data_status": {"from": "jsonb", "using": data_status_conversion_sql("data_status")}}
+}
 
+# Tables created as partitioned by range on a timestamp field, with one partition per day.
+# The primary key of a partitioned table must include the partition field.
+# premake_days partitions are created ahead of time, partitions older than retention_days are
+# dropped (or only detached from the table when retention_action is "detach").
+PARTITIONS = {
+    "flight": {
+        "field": "latest_update",
+        "primary_key": ["id", "latest_update"],
+        "premake_days": 3,
+        "retention_days": 30,
+        "retention_action": "drop"
+    }
 }
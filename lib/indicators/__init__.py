@@ -1,9 +1,35 @@
-INDICATORS = [
-    "airline_with_most_live_flights",
-    "airline_with_most_regional_flights_per_continent",
-    "longest_ongoing_flight",
-    "average_flight_length_per_continent",
-    "manufacturer_with_most_active_flights",
-    "top_aircraft_models_per_airline",
-    "airport_with_largest_flights_difference"
-]
+# Indicators computed by IndicatorProcessor. "refresh_frequency" is the minimum number of seconds
+# between two computations of an indicator, None to compute it at each run where the flights changed.
+INDICATORS = {
+    "airline_with_most_live_flights": {"refresh_frequency": None},
+    "airline_with_most_regional_flights_per_continent": {"refresh_frequency": None},
+    "longest_ongoing_flight": {"refresh_frequency": None},
+    "average_flight_length_per_continent": {"refresh_frequency": None},
+    "manufacturer_with_most_active_flights": {"refresh_frequency": None},
+    "top_aircraft_models_per_airline": {"refresh_frequency": None},
+    "airport_with_largest_flights_difference": {"refresh_frequency": None}
+}
+
+# Indicators whose flights did not change since their last result (same watermark): "skip" stores
+# nothing, "restamp" stores their last result again with the date of the run, without computing it.
+INDICATOR_UNCHANGED = "skip"
+
+# Source of the indicator queries: "snapshot" materializes the live flights, with the distance of
+# their route, once per run into a temporary table read by all indicators; "direct" reads
+# flight_current again in each indicator query; "aggregates" reads the counters of flight_aggregate,
+# maintained incrementally on each write of flight_current, for the indicators counting flights;
+# "views" refreshes concurrently the materialized view of each indicator, then reads it (the views
+# are created by ExaltCreateHandler with this source); "sketches" ranks the airlines, manufacturers
+# and models of the flights first seen in the last INDICATOR_SKETCH_WINDOW_DAYS days with the
+# Space-Saving summaries of flight_sketch (see UPDATE_FLIGHT_SKETCHES), with error bounds.
+INDICATOR_SOURCE = "snapshot"
+INDICATOR_SKETCH_WINDOW_DAYS = 7
+
+# Engine computing the indicators: "sql" runs a query per indicator on INDICATOR_SOURCE; "vectorized"
+# loads the live flights once as numpy columns and computes all the indicators in memory, with the
+# same results (ties being broken by name in both engines).
+INDICATOR_ENGINE = "sql"
+
+# Maximum number of indicators computed at once by the "sql" engine, each on a connection of
+# ADMIN_POOL (1 computes them one after another on the connection of the processor).
+INDICATOR_CONCURRENCY = 1
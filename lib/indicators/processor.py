@@ -1,29 +1,343 @@
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 import psycopg2
+from psycopg2 import sql
 
 from db_toolkits.exalt_handler.get import ExaltGetHandler
-from indicators import INDICATORS
-from lib.db_toolkits.exalt_handler import ADMIN_CREDENTIAL
+from indicators import (
+    INDICATORS, INDICATOR_CONCURRENCY, INDICATOR_ENGINE, INDICATOR_SKETCH_WINDOW_DAYS, INDICATOR_SOURCE,
+    INDICATOR_UNCHANGED
+)
+from indicators.queries import INDICATOR_QUERIES, LIVE_FLIGHTS_QUERY, NB_TOP_MODELS
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
 from lib.db_toolkits.exalt_handler.add import ExaltAddHandler
-from lib.db_toolkits.utilities import create_connection
+from lib.db_toolkits.exalt_handler.sketch import ExaltSketchHandler, sketch_bucket
+from lib.db_toolkits.exalt_handler.view import ExaltViewHandler, view_name
 from lib.utilities.exceptions import ProcessingException, AddException
 
 
+SNAPSHOT_TABLE = "indicator_snapshot"
+
+
 class IndicatorProcessor:
-    def __init__(self):
+    def __init__(
+            self,
+            connection: psycopg2.extensions.connection = None,
+            source: str = INDICATOR_SOURCE,
+            engine: str = INDICATOR_ENGINE,
+            concurrency: int = INDICATOR_CONCURRENCY
+    ):
+        """Computes the indicators and stores their results in the indicator table.
+
+        Args:
+            connection (psycopg2.extensions.connection, optional): The connection used, left open by
+                `process`. Defaults to a connection checked out from the pool until the end of `process`.
+            source (str): "snapshot" to read the live flights once per run into a temporary table read by
+                all indicators, "direct" to read flight_current in each indicator query, "aggregates" to
+                read the counters of flight_aggregate when an indicator only counts flights (the other
+                indicators reading flight_current), "views" to read the materialized view of each
+                indicator, refreshed concurrently by `process`, "sketches" to rank the flights of the last
+                INDICATOR_SKETCH_WINDOW_DAYS days with the summaries of flight_sketch when an indicator
+                ranks airlines, manufacturers or models (the other indicators reading flight_current).
+                Defaults to INDICATOR_SOURCE.
+            engine (str): "sql" to compute the indicators with queries of the source, "vectorized" to
+                load the live flights once as columns and compute the indicators in memory, with the
+                same results. Defaults to INDICATOR_ENGINE.
+            concurrency (int): Maximum number of indicators computed at once by `process` with the
+                "sql" engine, each on a connection of the pool, 1 to compute them one after another.
+                Concurrent indicators read the live flights as of the start of the run, the "snapshot"
+                source sharing the snapshot of its transaction rather than a temporary table.
+                Defaults to INDICATOR_CONCURRENCY.
+
+        Raises:
+            ProcessingException: If there is no flight data.
+        """
+        if source not in ["snapshot", "direct", "aggregates", "views", "sketches"]:
+            raise ValueError(f"Indicator source '{source}' is not supported.")
+        if engine not in ["sql", "vectorized"]:
+            raise ValueError(f"Indicator engine '{engine}' is not supported.")
+        if concurrency < 1:
+            raise ValueError("The indicators concurrency must be at least 1.")
         self.__execution_date = datetime.utcnow().isoformat()
-        connection = create_connection(ADMIN_CREDENTIAL)
+        self.__owns_connection = connection is None
+        connection = ADMIN_POOL.getconn() if connection is None else connection
         self.__connection: psycopg2.extensions.connection = connection
         self.__cursor: psycopg2.extensions.cursor = connection.cursor()
         if not ExaltGetHandler(self.__connection, self.__cursor).get_last_data(
-                table_name="flight", timestamp_field="latest_update"
+                table_name="flight_current", timestamp_field="latest_update"
         ):
+            self.__close()
             raise ProcessingException("Unable to compute indicators: No flight data available.")
 
         self.__exalt_add = ExaltAddHandler(self.__connection, self.__cursor)
         self.__indicator_table = "indicator"
         self.__indicator_results = []
+        self.__source_mode = source
+        # Relation of the live flights read by the queries, the snapshot once it is created, and the
+        # one read by the index lookups
+        self.__live_flights = sql.SQL("({})").format(LIVE_FLIGHTS_QUERY)
+        self.__source = self.__live_flights
+        self.__engine_mode = engine
+        # In-memory indicators of the vectorized engine, once the live flights are loaded
+        self.__engine = None
+        self.__concurrency = concurrency if engine == "sql" else 1
+        # Cursor of the pooled connection of each thread computing indicators concurrently
+        self.__local = threading.local()
+
+    def __close(self):
+        self.__cursor.close()
+        if self.__owns_connection:
+            self.__connection.close()
+
+    def __query(self, indicator: str) -> sql.Composed:
+        """Reads the query of an indicator from the live flights, its `{live_flights}` relation.
+
+        The `{indexed_live_flights}` relation is always flight_current, for the queries answered by an
+        index lookup rather than by reading all the live flights.
+
+        With the "aggregates" source, the aggregate query of the indicator is used instead, if it has one.
+        With the "views" source, the rows of the indicator are read from its materialized view, after
+        their row number.
+        """
+        definition = INDICATOR_QUERIES[indicator]
+        if self.__source_mode == "views":
+            return sql.SQL("SELECT * FROM {} ORDER BY row_number").format(sql.Identifier(view_name(indicator)))
+        if self.__source_mode == "aggregates" and "aggregate_query" in definition:
+            return sql.SQL(definition["aggregate_query"])
+
+        return sql.SQL(definition["query"]).format(
+            live_flights=self.__source, indexed_live_flights=self.__live_flights
+        )
+
+    def create_snapshot(self):
+        """Materializes the live flights once into a temporary table, read by all the indicators of the run.
+
+        The snapshot is dropped at the end of the transaction, i.e. when the results are stored. The
+        transaction is REPEATABLE READ, so that the index lookups of flight_current see the same
+        flights as the snapshot.
+        """
+        self.__connection.commit()
+        self.__cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        self.__cursor.execute(
+            sql.SQL("CREATE TEMPORARY TABLE {} ON COMMIT DROP AS {}").format(
+                sql.Identifier(SNAPSHOT_TABLE), LIVE_FLIGHTS_QUERY
+            )
+        )
+        self.__source = sql.Identifier(SNAPSHOT_TABLE)
+
+    def load_flights(self):
+        """Loads the live flights once as columns, read by all the indicators of the vectorized engine."""
+        # The vectorized engine is only loaded with its first use
+        from indicators.vectorized import FLIGHT_FIELDS, VectorizedIndicators
+
+        flights = ExaltGetHandler(self.__connection, self.__cursor).get_columns(
+            table_name="flight_current", fields=FLIGHT_FIELDS, filters={"live": {"eq": True}}
+        )
+        self.__engine = VectorizedIndicators(flights)
+
+    def get_watermark(self) -> dict:
+        """Identifies the state of the flights the indicators are computed from.
+
+        The latest update of flight_current changes with every upload writing flights, and its number of
+        live flights with the flights removed from it. The watermark is read before the flights, so a
+        result is never stamped with flights newer than the ones it was computed from.
+
+        Returns:
+            dict: The "watermark" (latest update of flight_current) and "nb_live_flights".
+        """
+        self.__cursor.execute("SELECT MAX(latest_update), COUNT(*) FILTER (WHERE live = TRUE) FROM flight_current")
+        watermark, nb_live_flights = self.__cursor.fetchone()
+
+        return {"watermark": watermark, "nb_live_flights": nb_live_flights}
+
+    def __get_last_results(self) -> dict:
+        """Retrieves the last result of each indicator of INDICATORS, with its watermark and age in seconds.
+
+        The results are read under the name they are stored under with the source of the processor.
+        """
+        indicators = {self.__result_name(indicator): indicator for indicator in INDICATORS}
+        self.__cursor.execute(
+            """
+            SELECT
+                i.name,
+                last.result,
+                last.watermark,
+                last.nb_live_flights,
+                EXTRACT(EPOCH FROM %s::timestamptz - last.computation_timestamp) AS age
+            FROM unnest(%s::varchar[]) AS i(name)
+            CROSS JOIN LATERAL (
+                SELECT result, watermark, nb_live_flights, computation_timestamp
+                FROM indicator
+                WHERE indicator.name = i.name
+                ORDER BY computation_timestamp DESC
+                LIMIT 1
+            ) last
+            """,
+            (self.__execution_date, list(indicators))
+        )
+
+        return {
+            indicators[name]: {
+                "result": result, "watermark": watermark, "nb_live_flights": nb_live_flights, "age": age
+            }
+            for name, result, watermark, nb_live_flights, age in self.__cursor.fetchall()
+        }
+
+    def __plan(self, watermark: dict, force: bool) -> tuple:
+        """Selects the indicators computed by the run.
+
+        An indicator is computed if the flights changed since its last result (another watermark) and
+        its refresh frequency has elapsed. Otherwise, it is skipped or, with INDICATOR_UNCHANGED set to
+        "restamp" and its refresh frequency elapsed, its last result is stored again.
+
+        Args:
+            watermark (dict): The watermark of the run, see `get_watermark`.
+            force (bool): Whether all the indicators are computed.
+
+        Returns:
+            tuple: The names of the indicators computed, the records of the results stored again and
+                the names of the indicators skipped.
+        """
+        if force:
+            return list(INDICATORS), [], []
+
+        last_results = self.__get_last_results()
+        computed, restamped, skipped = [], [], []
+        for indicator, settings in INDICATORS.items():
+            last_result = last_results.get(indicator)
+            if last_result is None:
+                computed.append(indicator)
+                continue
+
+            frequency = settings.get("refresh_frequency")
+            due = frequency is None or last_result["age"] >= frequency
+            changed = (
+                last_result["watermark"] != watermark["watermark"]
+                or last_result["nb_live_flights"] != watermark["nb_live_flights"]
+            )
+            if changed and due:
+                computed.append(indicator)
+            elif due and INDICATOR_UNCHANGED == "restamp":
+                restamped.append({
+                    "computation_timestamp": self.__execution_date,
+                    "name": self.__result_name(indicator),
+                    "result": last_result["result"],
+                    **watermark
+                })
+            else:
+                skipped.append(indicator)
+
+        return computed, restamped, skipped
+
+    def __uses_sketches(self, indicator: str) -> bool:
+        """Returns whether an indicator is ranked with the summaries of flight_sketch by the processor."""
+        return (
+            self.__source_mode == "sketches" and "sketch" in INDICATOR_QUERIES[indicator]
+            and (self.__engine_mode == "sql" or INDICATOR_QUERIES[indicator].get("indexed", False))
+        )
+
+    def __result_name(self, indicator: str) -> str:
+        """Name the results of an indicator are stored under, its own name unless ranked with the summaries."""
+        if self.__uses_sketches(indicator):
+            return INDICATOR_QUERIES[indicator]["sketch"]["result_name"]
+
+        return indicator
+
+    def __rank_sketches(self, indicator: str, params: tuple = ()) -> tuple:
+        """Ranks the flights first seen in the last INDICATOR_SKETCH_WINDOW_DAYS days with flight_sketch summaries.
+
+        Args:
+            indicator (str): The name of the indicator, see INDICATOR_QUERIES.
+            params (tuple): The parameters of its query, the number of items of each top. Defaults to
+                no parameter, a top 1.
+
+        Returns:
+            tuple: The names of the columns and the rows: the columns of the query of the indicator,
+                followed by the maximum overestimation of the count ("max_error").
+        """
+        sketch = INDICATOR_QUERIES[indicator]["sketch"]
+        nb_tops = params[0] if params else 1
+        # The window ends with the day of the run, included
+        execution_date = datetime.fromisoformat(self.__execution_date).replace(tzinfo=timezone.utc)
+        start = sketch_bucket(execution_date) - timedelta(days=INDICATOR_SKETCH_WINDOW_DAYS - 1)
+
+        cursor = getattr(self.__local, "cursor", self.__cursor)
+        sketches = ExaltSketchHandler(self.__connection, cursor).get_sketches(sketch["name"], start)
+        rows = [
+            (*key, item, count, error)
+            for key in sorted(sketches)
+            for item, count, error in sketches[key].top(nb_tops)
+        ]
+
+        return sketch["columns"] + ["max_error"], rows
+
+    def __fetch(self, indicator: str, params: tuple = ()) -> tuple:
+        """Computes the rows of an indicator with the engine of the processor.
+
+        Args:
+            indicator (str): The name of the indicator, see INDICATOR_QUERIES.
+            params (tuple): The parameters of its query. Defaults to no parameter.
+
+        Returns:
+            tuple: The names of the columns and the rows.
+        """
+        if self.__engine_mode == "vectorized" and not INDICATOR_QUERIES[indicator].get("indexed"):
+            if self.__engine is None:
+                self.load_flights()
+            return getattr(self.__engine, indicator)(*params)
+
+        if self.__uses_sketches(indicator):
+            return self.__rank_sketches(indicator, params)
+
+        cursor = getattr(self.__local, "cursor", self.__cursor)
+        if self.__source_mode == "views":
+            # The rows of a view are the rows of its query, after their row number
+            cursor.execute(self.__query(indicator))
+            return [col.name for col in cursor.description][1:], [row[1:] for row in cursor.fetchall()]
+
+        cursor.execute(self.__query(indicator), params or None)
+        return [col.name for col in cursor.description], cursor.fetchall()
+
+    def __compute_concurrently(self, indicators: list) -> dict:
+        """Computes indicators concurrently, each on a connection of the pool.
+
+        All the connections read the data as of the start of the run: the REPEATABLE READ transaction
+        of the processor exports its snapshot, which the transactions of the other connections import.
+
+        Args:
+            indicators (list): The names of the indicators, see INDICATORS.
+
+        Returns:
+            dict: The duration of each indicator, in seconds.
+        """
+        self.__connection.commit()
+        self.__cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        self.__cursor.execute("SELECT pg_export_snapshot()")
+        snapshot_id = self.__cursor.fetchone()[0]
+
+        def compute(indicator: str) -> float:
+            with ADMIN_POOL.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+                self.__local.cursor = cursor
+                try:
+                    start = time.perf_counter()
+                    getattr(self, f"get_{indicator}")()
+                    return round(time.perf_counter() - start, 4)
+                finally:
+                    del self.__local.cursor
+                    cursor.close()
+
+        with ThreadPoolExecutor(max_workers=self.__concurrency, thread_name_prefix="indicator") as executor:
+            timings = dict(zip(indicators, executor.map(compute, indicators)))
+        # The results are stored in the order of INDICATORS, whatever the order of completion
+        self.__indicator_results.sort(key=lambda result: list(INDICATORS).index(result["name"]))
+
+        return timings
 
     def get_airline_with_most_live_flights(self):
         """
@@ -33,28 +347,16 @@ class IndicatorProcessor:
             dict: A dictionary containing the airline with the most live flights and the count of live flights.
         If an error occurs, returns a dictionary with an error message.
         """
-        # SQL query to get the airline with the most live flights
-        query = """
-            SELECT airline, COUNT(*) AS live_flights
-            FROM (
-                SELECT DISTINCT ON (flight_id) flight_id, airline
-                FROM flight
-                WHERE live = TRUE
-                ORDER BY flight_id, latest_update DESC
-            ) AS latest_flights
-            GROUP BY airline
-            ORDER BY live_flights DESC
-            LIMIT 1;
-        """
-
         try:
-            self.__cursor.execute(query)
-            result = self.__cursor.fetchone()
+            columns, results = self.__fetch("airline_with_most_live_flights")
+            result = results[0] if results else None
 
             airline_dict = {}
             if result:
-                airline, live_flights = result
+                airline, live_flights = result[:2]
                 airline_dict = {"airline": airline, "live_flights": live_flights}
+                # Error bounds of the counts estimated by the sketches
+                airline_dict.update(zip(columns[2:], result[2:]))
 
             self.__indicator_results.append(
                 {
@@ -78,43 +380,8 @@ class IndicatorProcessor:
                   containing the airline with the most regional flights and the count of those flights.
         If an error occurs, returns a dictionary with an error message.
         """
-        # SQL query to get the airline with the most regional flights per continent
-        query = """
-            WITH latest_flights AS (
-                SELECT DISTINCT ON (f.flight_id) 
-                    f.flight_id, 
-                    f.airline, 
-                    f.origin_airport_continent AS origin_zone, 
-                    f.destination_airport_continent AS destination_zone
-                FROM flight f
-                WHERE f.live = TRUE
-                ORDER BY f.flight_id, f.latest_update DESC
-            ), regional_flights AS (
-                SELECT 
-                    origin_zone,
-                    airline,
-                    COUNT(CASE WHEN origin_zone = destination_zone THEN 1 END) AS regional_flights_count
-                FROM latest_flights
-                GROUP BY origin_zone, airline
-            ), ranked_airlines AS (
-                SELECT 
-                    origin_zone,
-                    airline,
-                    regional_flights_count,
-                    ROW_NUMBER() OVER (PARTITION BY origin_zone ORDER BY regional_flights_count DESC) AS rn
-                FROM regional_flights
-            )
-            SELECT 
-                r.origin_zone AS continent,
-                r.airline,
-                r.regional_flights_count AS live_flights
-            FROM ranked_airlines r
-            WHERE rn = 1;
-        """
-
         try:
-            self.__cursor.execute(query)
-            results = self.__cursor.fetchall()
+            _, results = self.__fetch("airline_with_most_regional_flights_per_continent")
 
             # Process results into a dictionary
             continent_airline_dict = {}
@@ -148,54 +415,12 @@ class IndicatorProcessor:
             dict: A dictionary containing details of the longest ongoing flight.
         If an error occurs, returns a dictionary with an error message.
         """
-        # SQL query to get the longest ongoing flight
-        query = """
-            WITH latest_flights AS (
-                SELECT DISTINCT ON (f.flight_id)
-                    f.flight_id,
-                    f.callsign,
-                    f.airline,
-                    f.origin_airport_name,
-                    f.origin_airport_lat,
-                    f.origin_airport_long,
-                    f.destination_airport_name,
-                    f.destination_airport_lat,
-                    f.destination_airport_long,
-                    f.latest_update,
-                    (
-                        6371 * acos(
-                            cos(radians(f.origin_airport_lat)) * cos(radians(f.destination_airport_lat)) *
-                            cos(radians(f.destination_airport_long) - radians(f.origin_airport_long)) +
-                            sin(radians(f.origin_airport_lat)) * sin(radians(f.destination_airport_lat))
-                        )
-                    ) AS distance_km
-                FROM flight f
-                WHERE f.live = TRUE
-                AND f.origin_airport_lat IS NOT NULL
-                AND f.origin_airport_long IS NOT NULL
-                AND f.destination_airport_lat IS NOT NULL
-                AND f.destination_airport_long IS NOT NULL
-                ORDER BY f.flight_id, f.latest_update DESC
-            )
-            SELECT
-                flight_id,
-                callsign,
-                airline,
-                origin_airport_name,
-                destination_airport_name,
-                distance_km
-            FROM latest_flights
-            ORDER BY distance_km DESC
-            LIMIT 1;
-        """
-
         try:
-            self.__cursor.execute(query)
-            result = self.__cursor.fetchone()
+            columns, results = self.__fetch("longest_ongoing_flight")
             longest_flight = {}
-            if result:
+            if results:
                 longest_flight = {
-                    col.name: value for col, value in zip(self.__cursor.description, result)
+                    column: value for column, value in zip(columns, results[0])
                 }
 
             self.__indicator_results.append(
@@ -219,38 +444,9 @@ class IndicatorProcessor:
             dict: A dictionary where each key is a continent and the value is the average flight length in kilometers.
         If an error occurs, returns a dictionary with an error message.
         """
-        # SQL query for the average flight length by continent
-        query = """
-            WITH latest_flights AS (
-                SELECT DISTINCT ON (f.flight_id)
-                    f.flight_id,
-                    f.origin_airport_continent,
-                    f.destination_airport_continent,
-                    (
-                        6371 * acos(
-                            cos(radians(f.origin_airport_lat)) * cos(radians(f.destination_airport_lat)) *
-                            cos(radians(f.destination_airport_long) - radians(f.origin_airport_long)) +
-                            sin(radians(f.origin_airport_lat)) * sin(radians(f.destination_airport_lat))
-                        )
-                    ) AS distance_km
-                FROM flight f
-                WHERE f.live = TRUE
-                AND f.origin_airport_lat IS NOT NULL
-                AND f.origin_airport_long IS NOT NULL
-                AND f.destination_airport_lat IS NOT NULL
-                AND f.destination_airport_long IS NOT NULL
-                ORDER BY f.flight_id, f.latest_update DESC
-            )
-            SELECT
-                origin_airport_continent AS continent,
-                AVG(distance_km) AS average_flight_length_km
-            FROM latest_flights
-            GROUP BY origin_airport_continent;
-        """
         try:
 
-            self.__cursor.execute(query)
-            results = self.__cursor.fetchall()
+            _, results = self.__fetch("average_flight_length_per_continent")
             continent_avg_length_dict = {}
             for result in results:
                 continent, avg_length = result
@@ -277,33 +473,15 @@ class IndicatorProcessor:
             dict: A dictionary containing the manufacturer with the most active flights and the count of active flights.
                   If an error occurs, returns a dictionary with an error message.
         """
-        # SQL query for aircraft manufacturer with the most active flights
-
-        query = """
-            WITH latest_flights AS (
-                SELECT DISTINCT ON (f.flight_id)
-                    f.flight_id,
-                    f.aircraft_manufacturer
-                FROM flight f
-                WHERE f.live = TRUE
-                AND f.aircraft_manufacturer IS NOT NULL
-                ORDER BY f.flight_id, f.latest_update DESC
-            )
-            SELECT
-                lf.aircraft_manufacturer,
-                COUNT(*) AS active_flights
-            FROM latest_flights lf
-            GROUP BY lf.aircraft_manufacturer
-            ORDER BY active_flights DESC
-            LIMIT 1;
-        """
         try:
-            self.__cursor.execute(query)
-            result = self.__cursor.fetchone()
+            columns, results = self.__fetch("manufacturer_with_most_active_flights")
+            result = results[0] if results else None
             manufacturer_dict = {}
             if result:
-                manufacturer, active_flights = result
+                manufacturer, active_flights = result[:2]
                 manufacturer_dict = {"manufacturer": manufacturer, "active_flights": active_flights}
+                # Error bounds of the counts estimated by the sketches
+                manufacturer_dict.update(zip(columns[2:], result[2:]))
 
             self.__indicator_results.append(
                 {
@@ -318,7 +496,7 @@ class IndicatorProcessor:
         except psycopg2.Error as e:
             return ProcessingException(f"Error during indicator computation: {str(e)}")
 
-    def get_top_aircraft_models_per_airline(self, nb_tops: int = 3):
+    def get_top_aircraft_models_per_airline(self, nb_tops: int = NB_TOP_MODELS):
         """
         Retrieves the top n aircraft models in use for each airline.
 
@@ -326,53 +504,19 @@ class IndicatorProcessor:
             dict: A dictionary where each key is an airline and the value is a list of dictionaries,
               each containing an aircraft model and its usage count.
         """
-        # SQL query for top n aircraft models in use for each airline.
-        query = """
-            WITH latest_flights AS (
-                SELECT DISTINCT ON (f.flight_id)
-                    f.flight_id,
-                    f.aircraft_model_text,
-                    f.airline
-                FROM flight f
-                WHERE f.live = TRUE
-                AND f.airline IS NOT NULL
-                AND f.aircraft_model_text IS NOT NULL
-                ORDER BY f.flight_id, f.latest_update DESC
-            ), model_usage AS (
-                SELECT
-                    lf.airline,
-                    lf.aircraft_model_text,
-                    COUNT(*) AS usage_count
-                FROM latest_flights lf
-                GROUP BY lf.airline, lf.aircraft_model_text
-            ), ranked_models AS (
-                SELECT
-                    mu.airline,
-                    mu.aircraft_model_text,
-                    mu.usage_count,
-                    ROW_NUMBER() OVER (PARTITION BY mu.airline ORDER BY mu.usage_count DESC) AS rn
-                FROM model_usage mu
-            )
-            SELECT
-                rm.airline,
-                rm.aircraft_model_text,
-                rm.usage_count
-            FROM ranked_models rm
-            WHERE rm.rn <= %s;
-        """
-
         try:
-            self.__cursor.execute(query, (nb_tops,))
-            results = self.__cursor.fetchall()
+            columns, results = self.__fetch("top_aircraft_models_per_airline", (nb_tops,))
 
             airline_models_dict = {}
             for result in results:
-                airline, model, usage_count = result
+                airline, model, usage_count = result[:3]
                 if airline not in airline_models_dict:
                     airline_models_dict[airline] = []
                 airline_models_dict[airline].append({
                     "model": model,
-                    "usage_count": usage_count
+                    "usage_count": usage_count,
+                    # Error bounds of the counts estimated by the sketches
+                    **dict(zip(columns[3:], result[3:]))
                 })
 
             self.__indicator_results.append(
@@ -396,46 +540,12 @@ class IndicatorProcessor:
             dict: A dictionary containing details of the airport with the largest flights difference.
                   Includes airport name, IATA code, and the flights difference.
         """
-        # SQL query for airport with the largest difference between outgoing and incoming flight
-        query = """
-            WITH departures AS (
-            SELECT
-                origin_airport_iata AS airport_iata,
-                origin_airport_name AS airport_name,
-                COUNT(*) AS departure_count
-            FROM flight
-            WHERE live = TRUE
-            AND origin_airport_iata IS NOT NULL
-            GROUP BY origin_airport_iata, origin_airport_name
-        ), arrivals AS (
-            SELECT
-                destination_airport_iata AS airport_iata,
-                destination_airport_name AS airport_name,
-                COUNT(*) AS arrival_count
-            FROM flight
-            WHERE live = TRUE
-            AND destination_airport_iata IS NOT NULL
-            GROUP BY destination_airport_iata, destination_airport_name
-        )
-        SELECT
-            COALESCE(dep.airport_iata, arr.airport_iata) AS airport_iata,
-            COALESCE(dep.airport_name, arr.airport_name, 'Unknown') AS airport_name,
-            COALESCE(dep.departure_count, 0) AS departure_count,
-            COALESCE(arr.arrival_count, 0) AS arrival_count,
-            COALESCE(dep.departure_count, 0) - COALESCE(arr.arrival_count, 0) AS flights_difference
-        FROM departures dep
-        FULL OUTER JOIN arrivals arr ON dep.airport_iata = arr.airport_iata
-        ORDER BY flights_difference DESC
-        LIMIT 1;
-        """
-
         try:
-            self.__cursor.execute(query)
-            result = self.__cursor.fetchone()
+            columns, results = self.__fetch("airport_with_largest_flights_difference")
             airport = {}
-            if result:
+            if results:
                 airport = {
-                    col.name: value for col, value in zip(self.__cursor.description, result)
+                    column: value for column, value in zip(columns, results[0])
                 }
 
             self.__indicator_results.append(
@@ -451,28 +561,81 @@ class IndicatorProcessor:
         except psycopg2.Error as e:
             return {"error": f"Database error: {str(e)}"}
 
-    def process(self):
-        try:
-            [getattr(self, f"get_{indicator}")() for indicator in INDICATORS]
+    def process(self, force: bool = False):
+        """Computes the indicators of INDICATORS whose flights changed and stores their results.
 
-            result = self.__exalt_add.process("indicator", self.__indicator_results)
+        Each result is stored with the watermark of the flights it was computed from, see
+        `get_watermark`. The indicators whose flights did not change since their last result, or
+        whose refresh frequency has not elapsed, are not computed, see INDICATOR_UNCHANGED.
 
-            self.__cursor.close()
-            self.__connection.close()
+        Args:
+            force (bool): Whether all the indicators are computed, even if their flights did not
+                change. Defaults to False.
+
+        Returns:
+            dict: A dictionary containing the response status and message, the indicators computed,
+                stored again and skipped, the duration of each step in seconds (the snapshot creation,
+                the refresh of the views or the loading of the flights, and each indicator computed) and
+                the total duration of the run.
+        """
+        timings = {}
+        run_start = time.perf_counter()
+        try:
+            watermark = self.get_watermark()
+            indicators, restamped, skipped = self.__plan(watermark, force)
+
+            if self.__engine_mode == "vectorized" and any(
+                    not INDICATOR_QUERIES[indicator].get("indexed") for indicator in indicators
+            ):
+                start = time.perf_counter()
+                self.load_flights()
+                timings["load"] = round(time.perf_counter() - start, 4)
+            elif indicators and self.__source_mode == "snapshot" and self.__concurrency == 1:
+                start = time.perf_counter()
+                self.create_snapshot()
+                timings["snapshot"] = round(time.perf_counter() - start, 4)
+            elif indicators and self.__source_mode == "views":
+                start = time.perf_counter()
+                refresh = ExaltViewHandler(self.__connection, self.__cursor).refresh(indicators)
+                if refresh["status"] != "success":
+                    return refresh
+                timings["refresh"] = round(time.perf_counter() - start, 4)
+
+            if self.__concurrency > 1 and indicators:
+                timings.update(self.__compute_concurrently(indicators))
+            else:
+                for indicator in indicators:
+                    start = time.perf_counter()
+                    getattr(self, f"get_{indicator}")()
+                    timings[indicator] = round(time.perf_counter() - start, 4)
+
+            records = [
+                {**result, "name": self.__result_name(result["name"]), **watermark}
+                for result in self.__indicator_results
+            ] + restamped
+            result = self.__exalt_add.process("indicator", records) if records else {"status": "success"}
 
             if result.get("status") == "success":
                 return {
                     "status": "success",
-                    "message": "indicators successfully processed."
+                    "message": "indicators successfully processed." if indicators else "indicators are up to date.",
+                    "source": self.__source_mode,
+                    "engine": self.__engine_mode,
+                    "concurrency": self.__concurrency,
+                    "computed": indicators,
+                    "restamped": [record["name"] for record in restamped],
+                    "skipped": skipped,
+                    "timings": timings,
+                    "duration": round(time.perf_counter() - run_start, 4)
                 }
             else:
                 return {
                     "status": "error",
                     "message": "Error occurred during indicators processing."
                 }
-                
-        except AddException as e:
-            self.__cursor.close()
-            self.__connection.close()
 
+        except AddException as e:
             return {"status": "error", "message": str(e)}
+
+        finally:
+            self.__close()
@@ -0,0 +1,275 @@
+from psycopg2 import sql
+
+# Live flights read by the indicators, with the great-circle distance of their route (computed on write)
+LIVE_FLIGHTS_QUERY = sql.SQL("""
+    SELECT
+        flight_id,
+        callsign,
+        airline,
+        aircraft_model_text,
+        aircraft_manufacturer,
+        origin_airport_name,
+        origin_airport_iata,
+        origin_airport_lat,
+        origin_airport_long,
+        origin_airport_continent,
+        destination_airport_name,
+        destination_airport_iata,
+        destination_airport_lat,
+        destination_airport_long,
+        destination_airport_continent,
+        latest_update,
+        route_distance_km AS distance_km
+    FROM flight_current
+    WHERE live = TRUE
+""")
+
+# Number of aircraft models per airline of top_aircraft_models_per_airline
+NB_TOP_MODELS = 3
+
+# Queries of the indicators of INDICATORS. "query" reads the live flights from its `{live_flights}`
+# relation (or `{indexed_live_flights}`, always flight_current, when answered by an index lookup),
+# "aggregate_query" reads the counters of flight_aggregate instead, for the indicators counting
+# flights. "params" are the default parameters of the queries. "sketch" ranks the flights with the
+# summaries of flight_sketch instead: the name of the summaries (see FLIGHT_SKETCHES), the columns
+# of the rows (the values of its "per" fields, the item and its count), the number of items of each
+# top being the parameter of the query, 1 without parameter, and the name the results are stored
+# under, the flights of the last INDICATOR_SKETCH_WINDOW_DAYS days not being the live flights. "indexed" queries only read tables
+# maintained on write, by an index lookup: they are run as is by every engine and source.
+INDICATOR_QUERIES = {
+    # Query to get the airline with the most live flights
+    "airline_with_most_live_flights": {
+        "query": """
+            SELECT airline, COUNT(*) AS live_flights
+            FROM {live_flights} f
+            GROUP BY airline
+            ORDER BY live_flights DESC, airline COLLATE "C"
+            LIMIT 1;
+        """,
+        "aggregate_query": """
+            SELECT key->>0 AS airline, nb_flights AS live_flights
+            FROM flight_aggregate
+            WHERE name = 'airline'
+            ORDER BY live_flights DESC, (key->>0) COLLATE "C"
+            LIMIT 1;
+        """,
+        "sketch": {
+            "name": "airline",
+            "columns": ["airline", "live_flights"],
+            "result_name": "airline_with_most_recent_flights"
+        }
+    },
+    # Query to get the airline with the most regional flights per continent
+    "airline_with_most_regional_flights_per_continent": {
+        "query": """
+            WITH latest_flights AS (
+                SELECT
+                    f.flight_id,
+                    f.airline,
+                    f.origin_airport_continent AS origin_zone,
+                    f.destination_airport_continent AS destination_zone
+                FROM {live_flights} f
+            ), regional_flights AS (
+                SELECT 
+                    origin_zone,
+                    airline,
+                    COUNT(CASE WHEN origin_zone = destination_zone THEN 1 END) AS regional_flights_count
+                FROM latest_flights
+                GROUP BY origin_zone, airline
+            ), ranked_airlines AS (
+                SELECT 
+                    origin_zone,
+                    airline,
+                    regional_flights_count,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY origin_zone ORDER BY regional_flights_count DESC, airline COLLATE "C"
+                    ) AS rn
+                FROM regional_flights
+            )
+            SELECT 
+                r.origin_zone AS continent,
+                r.airline,
+                r.regional_flights_count AS live_flights
+            FROM ranked_airlines r
+            WHERE rn = 1;
+        """,
+        "aggregate_query": """
+            WITH ranked_airlines AS (
+                SELECT
+                    key->>0 AS origin_zone,
+                    key->>1 AS airline,
+                    nb_regional_flights AS regional_flights_count,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY key->0 ORDER BY nb_regional_flights DESC, (key->>1) COLLATE "C"
+                    ) AS rn
+                FROM flight_aggregate
+                WHERE name = 'continent_airline'
+            )
+            SELECT
+                r.origin_zone AS continent,
+                r.airline,
+                r.regional_flights_count AS live_flights
+            FROM ranked_airlines r
+            WHERE rn = 1;
+        """
+    },
+    # Query to get the longest ongoing flight, the first entry of the route distance index
+    "longest_ongoing_flight": {
+        "query": """
+            WITH latest_flights AS (
+                SELECT
+                    f.flight_id,
+                    f.callsign,
+                    f.airline,
+                    f.origin_airport_name,
+                    f.origin_airport_lat,
+                    f.origin_airport_long,
+                    f.destination_airport_name,
+                    f.destination_airport_lat,
+                    f.destination_airport_long,
+                    f.latest_update,
+                    f.distance_km
+                FROM {indexed_live_flights} f
+                WHERE f.distance_km IS NOT NULL
+            )
+            SELECT
+                flight_id,
+                callsign,
+                airline,
+                origin_airport_name,
+                destination_airport_name,
+                distance_km
+            FROM latest_flights
+            ORDER BY distance_km DESC, flight_id COLLATE "C"
+            LIMIT 1;
+        """
+    },
+    # Query for the average flight length by continent. The distances are summed by increasing
+    # distance, so that the rounding of the sum does not depend on the plan (parallel workers, row order)
+    "average_flight_length_per_continent": {
+        "query": """
+            WITH latest_flights AS (
+                SELECT
+                    f.flight_id,
+                    f.origin_airport_continent,
+                    f.destination_airport_continent,
+                    f.distance_km
+                FROM {live_flights} f
+                WHERE f.distance_km IS NOT NULL
+            )
+            SELECT
+                origin_airport_continent AS continent,
+                AVG(distance_km ORDER BY distance_km) AS average_flight_length_km
+            FROM latest_flights
+            GROUP BY origin_airport_continent;
+        """
+    },
+    # Query for aircraft manufacturer with the most active flights
+    "manufacturer_with_most_active_flights": {
+        "query": """
+            WITH latest_flights AS (
+                SELECT
+                    f.flight_id,
+                    f.aircraft_manufacturer
+                FROM {live_flights} f
+                WHERE f.aircraft_manufacturer IS NOT NULL
+            )
+            SELECT
+                lf.aircraft_manufacturer,
+                COUNT(*) AS active_flights
+            FROM latest_flights lf
+            GROUP BY lf.aircraft_manufacturer
+            ORDER BY active_flights DESC, lf.aircraft_manufacturer COLLATE "C"
+            LIMIT 1;
+        """,
+        "aggregate_query": """
+            SELECT key->>0 AS aircraft_manufacturer, nb_flights AS active_flights
+            FROM flight_aggregate
+            WHERE name = 'manufacturer'
+            ORDER BY active_flights DESC, (key->>0) COLLATE "C"
+            LIMIT 1;
+        """,
+        "sketch": {
+            "name": "manufacturer",
+            "columns": ["aircraft_manufacturer", "active_flights"],
+            "result_name": "manufacturer_with_most_recent_flights"
+        }
+    },
+    # Query for top n aircraft models in use for each airline.
+    "top_aircraft_models_per_airline": {
+        "query": """
+            WITH latest_flights AS (
+                SELECT
+                    f.flight_id,
+                    f.aircraft_model_text,
+                    f.airline
+                FROM {live_flights} f
+                WHERE f.airline IS NOT NULL
+                AND f.aircraft_model_text IS NOT NULL
+            ), model_usage AS (
+                SELECT
+                    lf.airline,
+                    lf.aircraft_model_text,
+                    COUNT(*) AS usage_count
+                FROM latest_flights lf
+                GROUP BY lf.airline, lf.aircraft_model_text
+            ), ranked_models AS (
+                SELECT
+                    mu.airline,
+                    mu.aircraft_model_text,
+                    mu.usage_count,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY mu.airline ORDER BY mu.usage_count DESC, mu.aircraft_model_text COLLATE "C"
+                    ) AS rn
+                FROM model_usage mu
+            )
+            SELECT
+                rm.airline,
+                rm.aircraft_model_text,
+                rm.usage_count
+            FROM ranked_models rm
+            WHERE rm.rn <= %s;
+        """,
+        "aggregate_query": """
+            WITH ranked_models AS (
+                SELECT
+                    key->>0 AS airline,
+                    key->>1 AS aircraft_model_text,
+                    nb_flights AS usage_count,
+                    ROW_NUMBER() OVER (PARTITION BY key->0 ORDER BY nb_flights DESC, (key->>1) COLLATE "C") AS rn
+                FROM flight_aggregate
+                WHERE name = 'airline_model'
+            )
+            SELECT
+                rm.airline,
+                rm.aircraft_model_text,
+                rm.usage_count
+            FROM ranked_models rm
+            WHERE rm.rn <= %s;
+        """,
+        "params": (NB_TOP_MODELS,),
+        "sketch": {
+            "name": "airline_model",
+            "columns": ["airline", "aircraft_model_text", "usage_count"],
+            "result_name": "top_aircraft_models_per_airline_recent"
+        }
+    },
+    # Query for airport with the largest difference between outgoing and incoming flight: the departures
+    # and arrivals of each airport are counted by the triggers of flight_current, the query reads the
+    # first entry of the airport_flights_difference_idx index.
+    "airport_with_largest_flights_difference": {
+        "query": """
+            SELECT
+                iata AS airport_iata,
+                COALESCE(name, 'Unknown') AS airport_name,
+                nb_departures AS departure_count,
+                nb_arrivals AS arrival_count,
+                flights_difference
+            FROM airport
+            WHERE nb_departures > 0 OR nb_arrivals > 0
+            ORDER BY flights_difference DESC, iata COLLATE "C"
+            LIMIT 1;
+        """,
+        "indexed": True
+    }
+}
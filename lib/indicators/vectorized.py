@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+# Fields of the live flights read by the vectorized engine
+FLIGHT_FIELDS = [
+    "flight_id",
+    "callsign",
+    "airline",
+    "aircraft_model_text",
+    "aircraft_manufacturer",
+    "origin_airport_name",
+    "origin_airport_continent",
+    "destination_airport_name",
+    "destination_airport_continent",
+    "route_distance_km",
+]
+
+
+def _text_order(value) -> tuple:
+    """Sort key of a text value as in Postgres with the "C" collation, NULL values last."""
+    return value is None, value or ""
+
+
+def _group(*columns: np.ndarray) -> tuple:
+    """Groups rows by the values of columns, NULL values (None or NaN) forming a group as with GROUP BY.
+
+    Returns:
+        tuple: The group of each row, numbered in the order of their first row, and the first row of
+            each group.
+    """
+    groups = np.zeros(len(columns[0]), dtype=np.int64)
+    for values in columns:
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        # Numbered again at each column, the groups stay below the number of rows
+        groups, _ = pd.factorize(groups * len(uniques) + codes)
+
+    # A group appears for the first time where the highest group number seen increases
+    first_rows = np.searchsorted(np.maximum.accumulate(groups), np.arange(groups.max() + 1 if len(groups) else 0))
+
+    return groups, first_rows
+
+
+class VectorizedIndicators:
+    def __init__(self, flights: dict) -> None:
+        """Computes the indicators in memory from the live flights loaded as columns.
+
+        Each method returns the column names and rows of the matching query of IndicatorProcessor,
+        the same rows in the same order: counts are computed with vectorized group-bys, ties are
+        broken by name like the queries (by code point, NULL values last) and the distances are
+        summed by increasing distance, whatever the order of the flights.
+
+        Args:
+            flights (dict): For each field of FLIGHT_FIELDS, a numpy array of the values of the live
+                flights, in the order of flight_current, see `ExaltGetHandler.get_columns`. NULL
+                values are None for texts and NaN for distances.
+        """
+        self.__flights = flights
+        self.__distances = None
+
+    def __column(self, field: str, rows: np.ndarray = None) -> np.ndarray:
+        values = self.__flights[field]
+        return values if rows is None else values[rows]
+
+    def __located_flights(self) -> tuple:
+        """Rows of the flights whose route distance is known (all airports coordinates are), and the distances."""
+        if self.__distances is None:
+            distances = np.asarray(self.__flights["route_distance_km"], dtype=np.float64)
+            rows = np.flatnonzero(~np.isnan(distances))
+            self.__distances = rows, distances[rows]
+
+        return self.__distances
+
+    def airline_with_most_live_flights(self) -> tuple:
+        if not len(self.__column("airline")):
+            return ["airline", "live_flights"], []
+
+        airlines = self.__column("airline")
+        groups, first_rows = _group(airlines)
+        airlines = airlines[first_rows]
+        counts = np.bincount(groups)
+        best = min(range(len(counts)), key=lambda i: (-counts[i], _text_order(airlines[i])))
+
+        return ["airline", "live_flights"], [(airlines[best], int(counts[best]))]
+
+    def airline_with_most_regional_flights_per_continent(self) -> tuple:
+        columns = ["continent", "airline", "live_flights"]
+        origins = self.__column("origin_airport_continent")
+        if not len(origins):
+            return columns, []
+
+        destinations = self.__column("destination_airport_continent")
+        airlines = self.__column("airline")
+        groups, first_rows = _group(origins, airlines)
+        continents, airlines = origins[first_rows], airlines[first_rows]
+        regional = np.not_equal(origins, None) & np.equal(origins, destinations)
+        counts = np.bincount(groups[regional], minlength=len(continents))
+
+        rows = {}
+        for i in sorted(range(len(counts)), key=lambda i: (-counts[i], _text_order(airlines[i]))):
+            rows.setdefault(continents[i], (continents[i], airlines[i], int(counts[i])))
+
+        return columns, [rows[continent] for continent in sorted(rows, key=_text_order)]
+
+    def longest_ongoing_flight(self) -> tuple:
+        columns = ["flight_id", "callsign", "airline", "origin_airport_name", "destination_airport_name"]
+        rows, distances = self.__located_flights()
+        if not len(rows):
+            return columns + ["distance_km"], []
+
+        longest = rows[distances == distances.max()]
+        best = min(longest, key=lambda row: self.__flights["flight_id"][row])
+
+        return columns + ["distance_km"], [
+            tuple(self.__flights[field][best] for field in columns) + (float(distances.max()),)
+        ]
+
+    def average_flight_length_per_continent(self) -> tuple:
+        columns = ["continent", "average_flight_length_km"]
+        rows, distances = self.__located_flights()
+        if not len(rows):
+            return columns, []
+
+        continents = self.__column("origin_airport_continent", rows)
+        groups, first_rows = _group(continents)
+        continents = continents[first_rows]
+        # bincount adds the distances one after the other: by increasing distance in each continent
+        order = np.lexsort((distances, groups))
+        averages = np.bincount(groups[order], weights=distances[order]) / np.bincount(groups)
+
+        return columns, [(continent, float(average)) for continent, average in zip(continents, averages)]
+
+    def manufacturer_with_most_active_flights(self) -> tuple:
+        columns = ["aircraft_manufacturer", "active_flights"]
+        manufacturers = self.__column("aircraft_manufacturer")
+        manufacturers = manufacturers[np.not_equal(manufacturers, None)]
+        if not len(manufacturers):
+            return columns, []
+
+        groups, first_rows = _group(manufacturers)
+        manufacturers = manufacturers[first_rows]
+        counts = np.bincount(groups)
+        best = min(range(len(counts)), key=lambda i: (-counts[i], _text_order(manufacturers[i])))
+
+        return columns, [(manufacturers[best], int(counts[best]))]
+
+    def top_aircraft_models_per_airline(self, nb_tops: int = 3) -> tuple:
+        columns = ["airline", "aircraft_model_text", "usage_count"]
+        airlines = self.__column("airline")
+        models = self.__column("aircraft_model_text")
+        rows = np.flatnonzero(np.not_equal(airlines, None) & np.not_equal(models, None))
+        if not len(rows):
+            return columns, []
+
+        airlines, models = airlines[rows], models[rows]
+        groups, first_rows = _group(airlines, models)
+        airlines, models = airlines[first_rows], models[first_rows]
+        counts = np.bincount(groups)
+
+        top_models = {}
+        for i in sorted(range(len(counts)), key=lambda i: (-counts[i], _text_order(models[i]))):
+            airline_models = top_models.setdefault(airlines[i], [])
+            if len(airline_models) < nb_tops:
+                airline_models.append((airlines[i], models[i], int(counts[i])))
+
+        return columns, [row for airline in sorted(top_models) for row in top_models[airline]]
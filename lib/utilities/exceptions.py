@@ -11,3 +11,13 @@ class ProcessingException(Exception):
 class JobException(Exception):
     """Exception raised when an error occurred during job scheduling"""
     pass
+
+
+class DeleteException(Exception):
+    """Exception raised when an error occurred during data deletion"""
+    pass
+
+
+class PoolException(Exception):
+    """Exception raised when no database connection could be checked out from the pool"""
+    pass
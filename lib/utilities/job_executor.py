@@ -1,19 +1,37 @@
 import logging
 from datetime import datetime
 
-from lib.data_upload.flight_data import FlightDataUploader
-from lib.indicators.processor import IndicatorProcessor
 from utilities.log_handler import setup_logger
 
 
 def job_executor(job_name: str):
+    # The jobs dependencies are loaded by the first job run, not when the scheduler is imported
+    from lib.data_upload.flight_data import FlightDataUploader
+    from lib.data_upload.flight_positions import FlightPositionUploader
+    from lib.db_toolkits.exalt_handler import ADMIN_POOL
+    from lib.db_toolkits.exalt_handler.aggregate import ExaltAggregateHandler
+    from lib.db_toolkits.exalt_handler.create import ExaltCreateHandler
+    from lib.db_toolkits.exalt_handler.rollup import ExaltRollupHandler
+    from lib.indicators.processor import IndicatorProcessor
+
     info_logger = setup_logger('job_result_logger', 'result.log')
     error_logger = setup_logger('job_error_logger', 'error.log', level=logging.ERROR)
     try:
         if job_name.lower() == "data_upload":
             result = FlightDataUploader().process()
+        elif job_name.lower() == "position_upload":
+            result = FlightPositionUploader().process()
         elif job_name.lower() == "indicator":
             result = IndicatorProcessor().process()
+        elif job_name.lower() == "partition_maintenance":
+            with ADMIN_POOL.connection() as connection:
+                result = ExaltCreateHandler(connection, connection.cursor()).maintain_partitions()
+        elif job_name.lower() == "aggregate_check":
+            with ADMIN_POOL.connection() as connection:
+                result = ExaltAggregateHandler(connection, connection.cursor()).process()
+        elif job_name.lower() == "indicator_rollup":
+            with ADMIN_POOL.connection() as connection:
+                result = ExaltRollupHandler(connection, connection.cursor()).process()
         else:
             result = {
                 "status": "error",
@@ -5,8 +5,9 @@ from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers.base import SchedulerAlreadyRunningError, SchedulerNotRunningError
 from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
 
-from lib.db_toolkits.exalt_handler import ADMIN_CREDENTIAL
+from lib.db_toolkits.exalt_handler import ADMIN_POOL
 from lib.utilities.exceptions import JobException
 from lib.utilities.job_executor import job_executor
 
@@ -19,12 +20,8 @@ class JobHandler:
         self.scheduler = BackgroundScheduler(
             jobstores={
                 self.job_store: SQLAlchemyJobStore(
-                    engine=create_engine(
-                        (
-                            f"postgresql://{ADMIN_CREDENTIAL['user']}:{ADMIN_CREDENTIAL['password']}"
-                            f"@{ADMIN_CREDENTIAL['host']}/{ADMIN_CREDENTIAL['name']}"
-                        )
-                    )
+                    # The engine borrows its connections from the shared pool: closing them gives them back
+                    engine=create_engine("postgresql+psycopg2://", creator=ADMIN_POOL.getconn, poolclass=NullPool)
                 )
             }
         )
@@ -0,0 +1,140 @@
+import struct
+
+import numpy as np
+import pytest
+
+from lib.db_toolkits.utilities.columnar_copy import (
+    BOOL_TYPE, COPY_SIGNATURE, COPY_TRAILER, DATE_TYPE, FIXED_WIDTH_TYPES, NULL_PLACEHOLDERS, NUMERIC_TYPE,
+    TIMESTAMPTZ_TYPE, BinaryCopyReader, TextCopyReader
+)
+
+# Struct format of the values of the fixed-width types in the binary COPY format
+BINARY_FORMATS = {BOOL_TYPE: "?", 20: ">q", 21: ">h", 23: ">i", 700: ">f", 701: ">d", DATE_TYPE: ">i",
+                  1114: ">q", TIMESTAMPTZ_TYPE: ">q"}
+TEXT_TYPE = 25
+# 2024-01-02 and 2024-01-02 03:04:05.5 UTC, from the Postgres and the Unix epochs
+DAYS_2024_01_02 = 8767
+MICROSECONDS_2024_01_02 = (DAYS_2024_01_02 * 86400 + 3 * 3600 + 4 * 60 + 5) * 1000000 + 500000
+UNIX_DAYS_2024_01_02 = DAYS_2024_01_02 + 10957
+
+
+def _binary_stream(type_codes: list, rows: list, extension: bytes = b"") -> bytes:
+    """Binary COPY stream of rows, as streamed by the query of `copy_query`: each value followed by its NULL flag.
+
+    The NULL values are written as the placeholder 0, as COALESCE does.
+    """
+    stream = COPY_SIGNATURE + struct.pack(">ii", 0, len(extension)) + extension
+    for row in rows:
+        stream += struct.pack(">h", 2 * len(type_codes))
+        for type_code, value in zip(type_codes, row):
+            value_format = BINARY_FORMATS[type_code]
+            stream += struct.pack(f">i{value_format.lstrip('>')}", struct.calcsize(value_format), value or 0)
+            stream += struct.pack(">i?", 1, value is None)
+
+    return stream + COPY_TRAILER
+
+
+def _read(reader, stream: bytes, write_size: int) -> list:
+    for start in range(0, len(stream), write_size):
+        reader.write(stream[start:start + write_size])
+
+    return reader.columns()
+
+
+def test_null_placeholders_are_of_the_type_of_their_column():
+    assert set(NULL_PLACEHOLDERS) == set(FIXED_WIDTH_TYPES)
+    assert all("::" in placeholder for type_code, placeholder in NULL_PLACEHOLDERS.items() if type_code != BOOL_TYPE)
+
+
+@pytest.mark.parametrize("write_size", [1, 7, 1000])
+def test_binary_reader_decodes_fixed_width_columns(write_size):
+    type_codes = [21, 23, 20, 700, 701, BOOL_TYPE, DATE_TYPE, TIMESTAMPTZ_TYPE]
+    rows = [
+        (-3, 70000, 2 ** 40, 1.5, -2.25, True, DAYS_2024_01_02, MICROSECONDS_2024_01_02),
+        (None, None, None, None, None, None, None, None),
+        (32000, -1, -(2 ** 40), -0.5, 1e300, False, -1, -1),
+    ]
+
+    columns = _read(BinaryCopyReader(type_codes, chunk_size=16), _binary_stream(type_codes, rows), write_size)
+
+    values = [values for values, _ in columns]
+    assert values[0].dtype == np.int16 and values[0][[0, 2]].tolist() == [-3, 32000]
+    assert values[1][[0, 2]].tolist() == [70000, -1]
+    assert values[2][[0, 2]].tolist() == [2 ** 40, -(2 ** 40)]
+    assert values[3].dtype == np.float32 and values[3][[0, 2]].tolist() == [1.5, -0.5]
+    assert values[4][[0, 2]].tolist() == [-2.25, 1e300]
+    assert values[5][[0, 2]].tolist() == [True, False]
+    assert values[6][[0, 2]].tolist() == [np.datetime64("2024-01-02"), np.datetime64("1999-12-31")]
+    assert values[7][[0, 2]].tolist() == [
+        np.datetime64("2024-01-02T03:04:05.500000"), np.datetime64("1999-12-31T23:59:59.999999")
+    ]
+    for _, mask in columns:
+        assert mask.tolist() == [False, True, False]
+
+
+def test_binary_reader_skips_the_header_extension():
+    columns = _read(BinaryCopyReader([23], chunk_size=4), _binary_stream([23], [(1,), (2,)], b"extension"), 3)
+
+    assert columns[0][0].tolist() == [1, 2]
+
+
+def test_binary_reader_of_an_empty_stream():
+    values, mask = _read(BinaryCopyReader([21, DATE_TYPE], chunk_size=16), _binary_stream([21, DATE_TYPE], []), 5)[0]
+
+    assert values.dtype == np.int16 and len(values) == 0 and len(mask) == 0
+
+
+def test_binary_reader_rejects_invalid_streams():
+    with pytest.raises(ValueError, match="not in the Postgres binary COPY format"):
+        BinaryCopyReader([23], chunk_size=1).write(b"COPY" + bytes(20))
+
+    # A row of another width than the columns read
+    with pytest.raises(ValueError, match="Unexpected row"):
+        _read(BinaryCopyReader([20], chunk_size=1), _binary_stream([23, 23], [(1, 2)]), 100)
+
+    with pytest.raises(ValueError, match="Truncated"):
+        _read(BinaryCopyReader([23], chunk_size=1000), _binary_stream([23], [(1,), (2,)])[:-5], 100)
+
+
+@pytest.mark.parametrize("write_size", [1, 5, 1000])
+def test_text_reader_decodes_columns(write_size):
+    type_codes = [21, 20, NUMERIC_TYPE, BOOL_TYPE, DATE_TYPE, TIMESTAMPTZ_TYPE, TEXT_TYPE]
+    lines = [
+        f"-3\t{2 ** 40}\t12.75\tt\t{UNIX_DAYS_2024_01_02}\t1704164645500000\tParis",
+        "\\N\t\\N\t\\N\t\\N\t\\N\t\\N\t\\N",
+        "32000\t-7\t-0.5\tf\t-1\t-1\t",
+    ]
+    stream = "\n".join(lines).encode() + b"\n"
+
+    columns = _read(TextCopyReader(type_codes, chunk_size=8), stream, write_size)
+
+    values = [values for values, _ in columns]
+    assert values[0].dtype == np.int16 and values[0][[0, 2]].tolist() == [-3, 32000]
+    assert values[1][[0, 2]].tolist() == [2 ** 40, -7]
+    assert values[2][[0, 2]].tolist() == [12.75, -0.5]
+    assert values[3][[0, 2]].tolist() == [True, False]
+    assert values[4][[0, 2]].tolist() == [np.datetime64("2024-01-02"), np.datetime64("1969-12-31")]
+    assert values[5][[0, 2]].tolist() == [
+        np.datetime64("2024-01-02T03:04:05.500000"), np.datetime64("1969-12-31T23:59:59.999999")
+    ]
+    assert values[6].tolist() == ["Paris", None, ""]
+    for _, mask in columns:
+        assert mask.tolist() == [False, True, False]
+
+
+def test_text_reader_unescapes_special_characters():
+    stream = b"1\tTab\\there\n2\tNew\\nline \\\\N\n3\t\\N\n4\tutf-8 \xc3\xa9\\r\\\\"
+
+    columns = _read(TextCopyReader([23, TEXT_TYPE], chunk_size=1), stream, 3)
+
+    assert columns[0][0].tolist() == [1, 2, 3, 4]
+    # An escaped backslash followed by N is not a NULL marker
+    assert columns[1][0].tolist() == ["Tab\there", "New\nline \\N", None, "utf-8 \u00e9\r\\"]
+    assert columns[1][1].tolist() == [False, False, True, False]
+
+
+def test_text_reader_of_an_empty_stream():
+    columns = TextCopyReader([21, BOOL_TYPE, TEXT_TYPE], chunk_size=8).columns()
+
+    assert [values.dtype for values, _ in columns] == [np.int16, bool, object]
+    assert all(len(values) == 0 and len(mask) == 0 for values, mask in columns)
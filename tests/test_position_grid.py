@@ -0,0 +1,137 @@
+import math
+import random
+
+import pytest
+
+from lib.db_toolkits.utilities.position_grid import (
+    EARTH_RADIUS_KM, bbox_cells, grid_cell, haversine_km, radius_bbox
+)
+
+
+def _brute_force_cells(south: float, west: float, north: float, east: float, degrees: float) -> set:
+    """Cells of the positions of a box, read at its bounds and at every grid line crossing it.
+
+    The cell of a position only changes on a grid line: these positions reach every cell of the box.
+    """
+    def coordinates(start: float, end: float, origin: float) -> list:
+        lines = [origin + index * degrees for index in range(math.ceil((end - origin) / degrees) + 1)]
+        return sorted({start, end, *[line for line in lines if start < line < end]})
+
+    return {
+        grid_cell(latitude, longitude, degrees)
+        for latitude in coordinates(south, north, -90)
+        for longitude in coordinates(west, east, -180)
+    }
+
+
+def _split(south: float, west: float, north: float, east: float) -> list:
+    """Parts of a box not crossing the antimeridian, as read by ExaltPositionHandler."""
+    if west > east:
+        return [(south, west, north, 180), (south, -180, north, east)]
+
+    return [(south, west, north, east)]
+
+
+def _in_bbox(latitude: float, longitude: float, bbox: tuple) -> bool:
+    return any(
+        south <= latitude <= north and west <= longitude <= east for south, west, north, east in _split(*bbox)
+    )
+
+
+def _destination(latitude: float, longitude: float, bearing: float, distance_km: float) -> tuple:
+    """Position at a distance from a point along a bearing, in degrees."""
+    latitude, longitude, bearing = math.radians(latitude), math.radians(longitude), math.radians(bearing)
+    angle = distance_km / EARTH_RADIUS_KM
+    other_latitude = math.asin(
+        math.sin(latitude) * math.cos(angle) + math.cos(latitude) * math.sin(angle) * math.cos(bearing)
+    )
+    other_longitude = longitude + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(latitude),
+        math.cos(angle) - math.sin(latitude) * math.sin(other_latitude)
+    )
+
+    return math.degrees(other_latitude), (math.degrees(other_longitude) + 180) % 360 - 180
+
+
+def test_grid_cell_clamps_the_poles_and_the_antimeridian():
+    assert grid_cell(-90, -180, 1) == 0
+    # The north pole and the antimeridian belong to the last row and column
+    assert grid_cell(90, 180, 1) == 179 * 360 + 359
+    assert grid_cell(90, -180, 1) == 179 * 360
+    assert grid_cell(-90, 180, 1) == 359
+    assert grid_cell(89.5, 179.5, 1) == grid_cell(90, 180, 1)
+    # Grids whose size does not divide the circle keep a last, smaller row and column
+    assert grid_cell(90, 180, 7) == grid_cell(89.9, 179.9, 7) == math.ceil(180 / 7) * math.ceil(360 / 7) - 1
+
+
+@pytest.mark.parametrize("degrees", [1, 5, 7])
+def test_bbox_cells_match_brute_force(degrees):
+    generator = random.Random(degrees)
+    boxes = [(-90, -180, 90, 180), (89, 179, 90, 180), (-90, -180, -89.5, -179.5), (10, 20, 10, 20)]
+    for _ in range(100):
+        south, north = sorted(generator.uniform(-90, 90) for _ in range(2))
+        west, east = sorted(generator.uniform(-180, 180) for _ in range(2))
+        boxes.append((south, west, north, east))
+    # Bounds on grid lines
+    boxes += [(0, 0, degrees, degrees), (-degrees, -180, 0, -180 + degrees)]
+
+    for box in boxes:
+        assert sorted(bbox_cells(*box, degrees)) == sorted(_brute_force_cells(*box, degrees)), box
+
+
+def test_radius_bbox_crosses_the_antimeridian():
+    south, west, north, east = radius_bbox(0, 179.5, 200)
+    assert west > east
+    assert west == pytest.approx(179.5 - 200 * 180 / (math.pi * EARTH_RADIUS_KM))
+    assert east == pytest.approx(-180 + (200 * 180 / (math.pi * EARTH_RADIUS_KM) - 0.5))
+
+    south, west, north, east = radius_bbox(0, -179.5, 200)
+    assert west > east
+
+
+@pytest.mark.parametrize("latitude", [90, 89.5, -89.9, -90])
+def test_radius_bbox_spans_all_longitudes_at_the_poles(latitude):
+    south, west, north, east = radius_bbox(latitude, 10, 100)
+
+    assert (west, east) == (-180, 180)
+    assert -90 <= south <= north <= 90
+    if latitude > 0:
+        assert north == 90
+    else:
+        assert south == -90
+
+
+def test_radius_bbox_is_clamped_to_the_globe():
+    assert radius_bbox(0, 0, math.pi * EARTH_RADIUS_KM) == (-90, -180, 90, 180)
+    south, west, north, east = radius_bbox(45, 0, 10000)
+    assert (west, north, east) == (-180, 90, 180)
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_radius_bbox_holds_every_position_of_the_circle(seed):
+    """Every position within the radius lies in the box and in one of its cells, compared with a brute-force scan."""
+    generator = random.Random(seed)
+    positions = [(generator.uniform(-90, 90), generator.uniform(-180, 180)) for _ in range(2000)]
+    centers = [(0, 179.9), (0, -179.9), (60, 180), (-60, -180), (88, 0), (-88, 90), (89.99, 45)]
+    centers += [(generator.uniform(-89, 89), generator.uniform(-180, 180)) for _ in range(20)]
+
+    for latitude, longitude in centers:
+        for radius_km in [50, 500, 3000]:
+            bbox = radius_bbox(latitude, longitude, radius_km)
+            cells = {cell for part in _split(*bbox) for cell in bbox_cells(*part, 1)}
+            # Positions on the circle, where the box is tightest, and random positions
+            circle = [
+                _destination(latitude, longitude, bearing, radius_km * (1 - 1e-9)) for bearing in range(0, 360, 3)
+            ]
+            for other_latitude, other_longitude in circle + positions:
+                if haversine_km(latitude, longitude, other_latitude, other_longitude) <= radius_km:
+                    assert _in_bbox(other_latitude, other_longitude, bbox), (latitude, longitude, radius_km)
+                    assert grid_cell(other_latitude, other_longitude, 1) in cells
+
+
+def test_haversine_km():
+    assert haversine_km(10, 20, 10, 20) == 0
+    assert haversine_km(0, 0, 0, 180) == pytest.approx(math.pi * EARTH_RADIUS_KM)
+    assert haversine_km(90, 0, -90, 0) == pytest.approx(math.pi * EARTH_RADIUS_KM)
+    # The antimeridian is crossed by the shortest path
+    assert haversine_km(0, 179.5, 0, -179.5) == pytest.approx(haversine_km(0, 0, 0, 1))
@@ -0,0 +1,124 @@
+import random
+from collections import Counter
+
+import pytest
+
+from lib.db_toolkits.utilities.space_saving import SpaceSaving
+
+
+def _stream(seed: int, nb_items: int, nb_values: int) -> list:
+    """Skewed stream of items: a few frequent values and a long tail of rare ones."""
+    generator = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(nb_values)]
+
+    return generator.choices([f"item_{value}" for value in range(nb_values)], weights, k=nb_items)
+
+
+def _summarize(items: list, capacity: int) -> SpaceSaving:
+    summary = SpaceSaving(capacity)
+    for item in items:
+        summary.update(item)
+
+    return summary
+
+
+def _check_bounds(summary: SpaceSaving, true_counts: Counter):
+    """Checks the guarantees of a summary against the true counts of its stream."""
+    counters = summary.top(summary.capacity)
+    assert len(counters) <= summary.capacity
+    assert summary.nb_items == sum(true_counts.values())
+    for item, count, error in counters:
+        # The count overestimates the true count by at most its error
+        assert count - error <= true_counts[item] <= count
+        assert error <= summary.max_error() <= summary.nb_items / summary.capacity
+
+    # An item occurring more than nb_items / capacity times is always counted
+    counted_items = {item for item, _, _ in counters}
+    for item, true_count in true_counts.items():
+        if true_count > summary.nb_items / summary.capacity:
+            assert item in counted_items
+        if item not in counted_items:
+            assert true_count <= summary.max_error()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_error_bound_of_each_item(seed):
+    items = _stream(seed, nb_items=5000, nb_values=300)
+    summary = _summarize(items, capacity=20)
+
+    assert summary.max_error() > 0
+    _check_bounds(summary, Counter(items))
+
+
+def test_counts_are_exact_until_full():
+    items = _stream(0, nb_items=1000, nb_values=15)
+    summary = _summarize(items, capacity=20)
+
+    assert summary.max_error() == 0
+    true_counts = sorted(Counter(items).items(), key=lambda counter: (-counter[1], counter[0]))
+    assert summary.top(20) == [(item, count, 0) for item, count in true_counts]
+
+
+def test_weighted_updates_match_unit_updates():
+    items = _stream(1, nb_items=2000, nb_values=50)
+    weighted = SpaceSaving(10)
+    for item, count in Counter(items).items():
+        weighted.update(item, count)
+
+    assert weighted.nb_items == len(items)
+    _check_bounds(weighted, Counter(items))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merge_of_two_full_summaries(seed):
+    first_items = _stream(seed, nb_items=3000, nb_values=200)
+    # The second stream favours other values than the first one
+    second_items = [f"other_{item}" if index % 3 else item for index, item in enumerate(_stream(seed + 100, 3000, 200))]
+    first, second = _summarize(first_items, 15), _summarize(second_items, 15)
+    assert first.max_error() > 0 and second.max_error() > 0
+
+    merged = first.merge(second)
+
+    assert merged.capacity == 15
+    assert len(merged.top(100)) == 15
+    _check_bounds(merged, Counter(first_items) + Counter(second_items))
+
+
+def test_merge_survives_serialization():
+    first_items, second_items = _stream(2, 2000, 100), _stream(3, 2000, 100)
+    first, second = _summarize(first_items, 10), _summarize(second_items, 10)
+
+    merged = SpaceSaving.from_dict(first.to_dict()).merge(SpaceSaving.from_dict(second.to_dict()))
+
+    assert merged.top(10) == _summarize(first_items, 10).merge(_summarize(second_items, 10)).top(10)
+    _check_bounds(merged, Counter(first_items) + Counter(second_items))
+
+
+def test_ties_are_broken_by_item():
+    summary = SpaceSaving(10)
+    for item in ["b", None, "a", "B", "c"]:
+        summary.update(item, 2)
+    summary.update("d", 3)
+
+    # Same count: code point order ("B" before "a"), NULL last
+    assert summary.top(6) == [("d", 3, 0), ("B", 2, 0), ("a", 2, 0), ("b", 2, 0), ("c", 2, 0), (None, 2, 0)]
+    assert [item for item, _, _ in summary.top(3)] == ["d", "B", "a"]
+
+
+def test_merge_keeps_tied_items_by_item():
+    first, second = SpaceSaving(2), SpaceSaving(2)
+    for item in ["c", "a"]:
+        first.update(item, 5)
+    for item in ["b", "d"]:
+        second.update(item, 5)
+
+    merged = first.merge(second)
+
+    # Every item may have occurred 10 times: the first two by item are kept
+    assert merged.top(2) == [("a", 10, 5), ("b", 10, 5)]
+    assert merged.nb_items == 20
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
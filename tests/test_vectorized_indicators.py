@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from lib.indicators.vectorized import FLIGHT_FIELDS, VectorizedIndicators
+
+
+def _flights(**columns) -> dict:
+    """Live flights as loaded by `ExaltGetHandler.get_columns`, the fields not given being NULL.
+
+    Texts are object arrays holding None for NULL values, distances float arrays holding NaN.
+    """
+    nb_flights = len(next(iter(columns.values())))
+    flights = {}
+    for field in FLIGHT_FIELDS:
+        values = columns.get(field, [None] * nb_flights)
+        if field == "route_distance_km":
+            flights[field] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        else:
+            flights[field] = np.array(values, dtype=object)
+
+    return flights
+
+
+def test_ties_are_broken_by_code_point_nulls_last():
+    indicators = VectorizedIndicators(_flights(
+        flight_id=["f2", "F1", "f1", "a0", "b0", "c0", "d0", "e0"],
+        callsign=["CS2", "CS1", "CS3", None, None, None, None, None],
+        airline=["b", "B", "a", None, "b", "B", "a", None],
+        aircraft_manufacturer=["airbus", "Boeing", "Airbus", None, "airbus", "Boeing", "Airbus", None],
+        route_distance_km=[100.0, 100.0, 100.0, 99.0, None, 50.0, None, 100.0 - 1e-9]
+    ))
+
+    # "B" sorts before "a" and "b" with the "C" collation, the NULL airline after them
+    assert indicators.airline_with_most_live_flights() == (["airline", "live_flights"], [("B", 2)])
+    assert indicators.manufacturer_with_most_active_flights() == (
+        ["aircraft_manufacturer", "active_flights"], [("Airbus", 2)]
+    )
+    assert indicators.longest_ongoing_flight() == (
+        ["flight_id", "callsign", "airline", "origin_airport_name", "destination_airport_name", "distance_km"],
+        [("F1", "CS1", "B", None, None, 100.0)]
+    )
+
+
+def test_top_models_ties_and_nulls():
+    indicators = VectorizedIndicators(_flights(
+        airline=["X", "X", "X", "X", "X", "X", "X", "x", None, None],
+        aircraft_model_text=["b", "B", "a", "a", "B", "b", None, "m", "a", "a"]
+    ))
+
+    # NULL airlines and models are left out, the airlines sorted by code point
+    assert indicators.top_aircraft_models_per_airline(2) == (
+        ["airline", "aircraft_model_text", "usage_count"], [("X", "B", 2), ("X", "a", 2), ("x", "m", 1)]
+    )
+    assert indicators.top_aircraft_models_per_airline(5)[1] == [
+        ("X", "B", 2), ("X", "a", 2), ("X", "b", 2), ("x", "m", 1)
+    ]
+
+
+def test_null_groups():
+    indicators = VectorizedIndicators(_flights(
+        airline=["AF", "AF", "BA", "BA", "LH", "LH", "LH", None, None, "AF", "BA", None],
+        origin_airport_continent=["EU", "EU", "EU", "EU", "EU", "EU", "EU", "EU", "EU", None, None, "AS"],
+        destination_airport_continent=["EU", "EU", "EU", "EU", "NA", "NA", "NA", "EU", "EU", None, "EU", "AS"],
+    ))
+
+    # A NULL continent forms a group whose flights are not regional, a NULL airline is ranked last
+    assert indicators.airline_with_most_regional_flights_per_continent() == (
+        ["continent", "airline", "live_flights"], [("AS", None, 1), ("EU", "AF", 2), (None, "AF", 0)]
+    )
+    # Four airlines with 3 flights, the NULL one included
+    assert indicators.airline_with_most_live_flights() == (["airline", "live_flights"], [("AF", 3)])
+    assert VectorizedIndicators(_flights(airline=["AF", None, None])).airline_with_most_live_flights() == (
+        ["airline", "live_flights"], [(None, 2)]
+    )
+
+
+def test_averages_of_null_continents_are_summed_by_increasing_distance():
+    indicators = VectorizedIndicators(_flights(
+        origin_airport_continent=["EU", "EU", None, "AS", "EU", "EU", None],
+        route_distance_km=[1e16, 1.0, 10.0, 5.0, None, 1.0, 20.0]
+    ))
+
+    # 1 + 1 + 1e16 is exact, while 1e16 + 1 rounds back to 1e16
+    assert indicators.average_flight_length_per_continent() == (
+        ["continent", "average_flight_length_km"], [("EU", (1e16 + 2) / 3), (None, 15.0), ("AS", 5.0)]
+    )
+
+
+@pytest.mark.parametrize("indicator, columns", [
+    ("airline_with_most_live_flights", ["airline", "live_flights"]),
+    ("airline_with_most_regional_flights_per_continent", ["continent", "airline", "live_flights"]),
+    (
+        "longest_ongoing_flight",
+        ["flight_id", "callsign", "airline", "origin_airport_name", "destination_airport_name", "distance_km"]
+    ),
+    ("average_flight_length_per_continent", ["continent", "average_flight_length_km"]),
+    ("manufacturer_with_most_active_flights", ["aircraft_manufacturer", "active_flights"]),
+    ("top_aircraft_models_per_airline", ["airline", "aircraft_model_text", "usage_count"]),
+])
+def test_empty_fleet(indicator, columns):
+    indicators = VectorizedIndicators(_flights(**{field: [] for field in FLIGHT_FIELDS}))
+
+    assert getattr(indicators, indicator)() == (columns, [])
+
+
+def test_fleet_without_located_flights_or_manufacturers():
+    indicators = VectorizedIndicators(_flights(airline=["AF", "BA"]))
+
+    assert indicators.longest_ongoing_flight()[1] == []
+    assert indicators.average_flight_length_per_continent()[1] == []
+    assert indicators.manufacturer_with_most_active_flights()[1] == []
+    assert indicators.top_aircraft_models_per_airline()[1] == []